@@ -8,20 +8,38 @@ AMQ related functionality.
 :license: BSD, see LICENSE for more details.
 
 """
+import errno
+import glob
+import os
+import sys
+import threading
+import time
+import zlib
+
+from collections import deque
 from datetime import datetime, timedelta
 from UserDict import UserDict
 
 
 from celery import routes
 from celery import signals
+from celery.exceptions import ImproperlyConfigured
+from celery.serialization import pickle
 from celery.utils import gen_unique_id, textindent
 
 from kombu import compat as messaging
+from kombu import compression
+from kombu import serialization
 from kombu import BrokerConnection
 
+try:
+    import bz2
+except ImportError:
+    bz2 = None  # Jython?
+
 MSG_OPTIONS = ("mandatory", "priority", "immediate",
                "routing_key", "serializer", "delivery_mode",
-               "compression")
+               "compression", "compression_threshold")
 QUEUE_FORMAT = """
 . %(name)s -> exchange:%(exchange)s (%(exchange_type)s) \
 binding:%(binding_key)s
@@ -36,11 +54,27 @@ _queues_declared = False
 #: Set of exchange names that has already been declared.
 _exchanges_declared = set()
 
+#: What :class:`PublishBuffer` can do with tasks sent when it is full.
+OVERFLOW_POLICIES = ("block", "drop", "journal")
+
+#: Compression functions accepting a compression level,
+#: by compression content type.
+LEVEL_ENCODERS = {"application/x-gzip": zlib.compress}
+if bz2 is not None:
+    LEVEL_ENCODERS["application/x-bz2"] = bz2.compress
+
 
 def extract_msg_options(options, keep=MSG_OPTIONS):
     return dict((name, options.get(name)) for name in keep)
 
 
+def check_task_arguments(task_args, task_kwargs):
+    if not isinstance(task_args, (list, tuple)):
+        raise ValueError("task args must be a list or tuple")
+    if not isinstance(task_kwargs, dict):
+        raise ValueError("task kwargs must be a dictionary")
+
+
 class Queues(UserDict):
 
     def __init__(self, queues):
@@ -92,20 +126,181 @@ class Queues(UserDict):
         return cls(queues)
 
 
+class MessageStats(object):
+    """Thread-safe counters of the task messages sent, and of their size
+    before and after compression."""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self.messages = 0
+        self.compressed = 0
+        self.bytes_uncompressed = 0
+        self.bytes_sent = 0
+
+    def update(self, size, sent_size, compressed=False):
+        """Count a message of `size` bytes, sent as `sent_size` bytes."""
+        self._mutex.acquire()
+        try:
+            self.messages += 1
+            self.compressed += compressed
+            self.bytes_uncompressed += size
+            self.bytes_sent += sent_size
+        finally:
+            self._mutex.release()
+
+    def info(self):
+        """Returns the counters as a dict, including the number of bytes
+        saved by compression."""
+        self._mutex.acquire()
+        try:
+            return {"messages": self.messages,
+                    "compressed": self.compressed,
+                    "bytes_uncompressed": self.bytes_uncompressed,
+                    "bytes_sent": self.bytes_sent,
+                    "bytes_saved": self.bytes_uncompressed - self.bytes_sent}
+        finally:
+            self._mutex.release()
+
+
 class TaskPublisher(messaging.Publisher):
     auto_declare = False
 
+    #: Message bodies smaller than this number of bytes are
+    #: never compressed.
+    compression_threshold = 0
+
+    #: Compression level, from 1 (fastest) to 9 (smallest).  The default
+    #: level of the compression method is used if not set.
+    compression_level = None
+
+    #: :class:`MessageStats` instance updated for every message sent.
+    stats = None
+
+    #: Number of messages handed to the connection by this publisher.
+    published = 0
+
+    def __init__(self, *args, **kwargs):
+        compression_threshold = kwargs.pop("compression_threshold", None)
+        if compression_threshold is not None:
+            self.compression_threshold = compression_threshold
+        self.compression_level = kwargs.pop("compression_level",
+                                            self.compression_level)
+        self.stats = kwargs.pop("stats", self.stats)
+        super(TaskPublisher, self).__init__(*args, **kwargs)
+
     def declare(self):
         if self.exchange not in _exchanges_declared:
             super(TaskPublisher, self).declare()
             _exchanges_declared.add(self.exchange)
 
+    def publish(self, body, routing_key=None, delivery_mode=None,
+            mandatory=False, immediate=False, priority=0, content_type=None,
+            content_encoding=None, serializer=None, headers=None,
+            compression=None, exchange=None, compression_threshold=None):
+        """Publish message, only compressing the body if it is at least
+        `compression_threshold` bytes long (default is
+        :attr:`compression_threshold`), and compressing it makes
+        it smaller."""
+        headers = headers or {}
+        if compression is None:
+            compression = self.compression
+        if compression_threshold is None:
+            compression_threshold = self.compression_threshold
+        body, content_type, content_encoding = self._prepare(
+                body, serializer, content_type, content_encoding,
+                headers=headers)
+        if isinstance(body, unicode):
+            content_encoding = content_encoding or "utf-8"
+            body = body.encode(content_encoding)
+        size = sent_size = len(body)
+        compressed = False
+        if compression and size >= compression_threshold:
+            zbody, content_type_z = self._compress(body, compression)
+            if len(zbody) < size:
+                body, sent_size, compressed = zbody, len(zbody), True
+                headers["compression"] = content_type_z
+        if self.stats is not None:
+            self.stats.update(size, sent_size, compressed)
+        self.published += 1
+        # The body is already serialized and compressed, so it's sent as is.
+        return super(TaskPublisher, self).publish(body, routing_key,
+                delivery_mode, mandatory, immediate, priority,
+                content_type=content_type, content_encoding=content_encoding,
+                headers=headers, compression=False, exchange=exchange)
+
+    def _compress(self, body, method):
+        encoder, content_type = compression.get_encoder(method)
+        if self.compression_level is not None and \
+                content_type in LEVEL_ENCODERS:
+            return (LEVEL_ENCODERS[content_type](body,
+                                                 self.compression_level),
+                    content_type)
+        return encoder(body), content_type
+
     def delay_task(self, task_name, task_args=None, task_kwargs=None,
             countdown=None, eta=None, task_id=None, taskset_id=None,
             expires=None, exchange=None, exchange_type=None,
             event_dispatcher=None, **kwargs):
         """Delay task for execution by the celery nodes."""
+        message_data = self._task_message(task_name, task_args, task_kwargs,
+                                          countdown=countdown, eta=eta,
+                                          task_id=task_id,
+                                          taskset_id=taskset_id,
+                                          expires=expires, **kwargs)
+        self._declare_exchange(exchange, exchange_type)
+        self.send(message_data, exchange=exchange,
+                  **extract_msg_options(kwargs))
+        self._on_sent(message_data, event_dispatcher)
+        return message_data["id"]
 
+    def delay_tasks(self, tasks, taskset_id=None, event_dispatcher=None):
+        """Send many tasks at once.
+
+        :param tasks: Iterable of ``(task_name, args, kwargs, options)``
+            tuples, where `options` are the keyword arguments accepted by
+            :meth:`delay_task`.
+
+        All the messages are prepared before any is sent, and are then
+        sent grouped by destination, so that exchanges are declared and
+        message options resolved once for every destination instead of
+        once for every task.  Messages for the same destination are sent
+        in order.
+
+        Returns the list of task ids, in the same order as `tasks`.
+
+        """
+        groups = {}
+        destinations = []
+        task_ids = []
+        for task_name, args, kwargs, options in tasks:
+            options = dict(options)
+            exchange = options.pop("exchange", None)
+            exchange_type = options.pop("exchange_type", None)
+            message_data = self._task_message(task_name, args, kwargs,
+                                              taskset_id=taskset_id,
+                                              **options)
+            task_ids.append(message_data["id"])
+            dest = (exchange, exchange_type) + tuple(
+                        options.get(name) for name in MSG_OPTIONS)
+            try:
+                groups[dest].append(message_data)
+            except KeyError:
+                groups[dest] = [message_data]
+                destinations.append(dest)
+
+        send = self.send
+        for dest in destinations:
+            exchange, exchange_type = dest[:2]
+            msg_options = dict(zip(MSG_OPTIONS, dest[2:]))
+            self._declare_exchange(exchange, exchange_type)
+            for message_data in groups[dest]:
+                send(message_data, exchange=exchange, **msg_options)
+                self._on_sent(message_data, event_dispatcher)
+        return task_ids
+
+    def _task_message(self, task_name, task_args=None, task_kwargs=None,
+            countdown=None, eta=None, task_id=None, taskset_id=None,
+            expires=None, retries=0, **kwargs):
         task_id = task_id or gen_unique_id()
         task_args = task_args or []
         task_kwargs = task_kwargs or {}
@@ -114,16 +309,12 @@ class TaskPublisher(messaging.Publisher):
             now = datetime.now()
             eta = now + timedelta(seconds=countdown)
 
-        if not isinstance(task_args, (list, tuple)):
-            raise ValueError("task args must be a list or tuple")
-        if not isinstance(task_kwargs, dict):
-            raise ValueError("task kwargs must be a dictionary")
+        check_task_arguments(task_args, task_kwargs)
 
         if isinstance(expires, int):
             now = now or datetime.now()
             expires = now + timedelta(seconds=expires)
 
-        retries = kwargs.get("retries", 0)
         eta = eta and eta.isoformat()
         expires = expires and expires.isoformat()
 
@@ -139,7 +330,9 @@ class TaskPublisher(messaging.Publisher):
 
         if taskset_id:
             message_data["taskset"] = taskset_id
+        return message_data
 
+    def _declare_exchange(self, exchange, exchange_type=None):
         # custom exchange passed, need to declare it.
         if exchange and exchange not in _exchanges_declared:
             exchange_type = exchange_type or self.exchange_type
@@ -147,30 +340,613 @@ class TaskPublisher(messaging.Publisher):
                                           type=exchange_type,
                                           durable=self.durable,
                                           auto_delete=self.auto_delete)
-        self.send(message_data, exchange=exchange,
-                  **extract_msg_options(kwargs))
-        signals.task_sent.send(sender=task_name, **message_data)
-
-        if event_dispatcher:
-            event_dispatcher.send("task-sent", uuid=task_id,
-                                               name=task_name,
-                                               args=repr(task_args),
-                                               kwargs=repr(task_kwargs),
-                                               retries=retries,
-                                               eta=eta,
-                                               expires=expires)
+            _exchanges_declared.add(exchange)
+
+    def _on_sent(self, message_data, event_dispatcher=None):
+        signals.task_sent.send(sender=message_data["task"], **message_data)
+
+        if event_dispatcher and \
+                event_dispatcher.should_send("task-sent", message_data["id"]):
+            event_dispatcher.send("task-sent", uuid=message_data["id"],
+                                    name=message_data["task"],
+                                    args=repr(message_data["args"]),
+                                    kwargs=repr(message_data["kwargs"]),
+                                    retries=message_data["retries"],
+                                    eta=message_data["eta"],
+                                    expires=message_data["expires"])
+
+
+class PublisherPool(object):
+    """Process-wide pool of task publishers, each with its own
+    broker connection, so that sending a task does not have to
+    establish a new connection every time.
+
+    :keyword limit: Max number of idle publishers kept in the pool,
+        publishers released when the pool is full are closed.
+        If :const:`0` or :const:`None` publishers are never reused.
+    :keyword idle_timeout: Idle publishers are closed after this
+        many seconds.
+
+    The pool is thread-safe.  Idle connections are not shared with
+    child processes: when used after a fork the pool forgets about the
+    connections of the parent and establishes new ones.
+
+    """
+
+    def __init__(self, app, limit=None, idle_timeout=None):
+        self.app = app
+        self.limit = limit
+        self.idle_timeout = idle_timeout
+        self._mutex = threading.Lock()
+        self._idle = deque()
+        self._pid = os.getpid()
+        self._in_use = 0
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+        self.discarded = 0
+        self.retried = 0
+
+    def acquire(self, connect_timeout=None):
+        """Get a publisher from the pool, or create a new one.
+        Must be returned to the pool using :meth:`release` (or
+        :meth:`discard` if the connection is broken)."""
+        return self._acquire(connect_timeout)[0]
+
+    def release(self, publisher):
+        """Return publisher to the pool."""
+        self._mutex.acquire()
+        try:
+            if self._pid != os.getpid():
+                # Acquired by the parent process, the connection
+                # belongs to the parent.
+                return
+            self._in_use -= 1
+            if self.limit and len(self._idle) < self.limit:
+                self._idle.append((publisher, time.time()))
+                return
+        finally:
+            self._mutex.release()
+        self._close(publisher)
+
+    def discard(self, publisher):
+        """Close publisher instead of returning it to the pool."""
+        self._mutex.acquire()
+        try:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            self.discarded += 1
+        finally:
+            self._mutex.release()
+        self._close(publisher)
+
+    def publish(self, fun, connect_timeout=None):
+        """Call ``fun(publisher)`` with a publisher from the pool,
+        and return its return value.
+
+        If a connection reused from the pool turns out to have been
+        closed by the broker before anything was published, the call is
+        retried once with a new connection.  Connection errors raised
+        after a message was handed to the connection are not retried,
+        as the message may have reached the broker: callers retrying
+        these get at-least-once delivery, i.e. possible duplicates.
+
+        """
+        publisher, reused = self._acquire(connect_timeout)
+        if not reused:
+            return self._call(fun, publisher)
+        published = publisher.published
+        try:
+            return self._call(fun, publisher)
+        except publisher.connection.connection_errors:
+            if publisher.published != published:
+                raise
+            self._mutex.acquire()
+            try:
+                self.retried += 1
+            finally:
+                self._mutex.release()
+            return self._call(fun, self._acquire(connect_timeout,
+                                                 reuse=False)[0])
+
+    def close(self):
+        """Close all idle publishers."""
+        self._mutex.acquire()
+        try:
+            self._after_fork()
+            idle, self._idle = self._idle, deque()
+        finally:
+            self._mutex.release()
+        for publisher, _ in idle:
+            self._close(publisher)
+
+    def stats(self):
+        """Returns the number of idle and in-use publishers, and
+        counters for publishers created, reused, expired, discarded
+        and retried."""
+        self._mutex.acquire()
+        try:
+            self._after_fork()
+            return {"limit": self.limit,
+                    "idle_timeout": self.idle_timeout,
+                    "idle": len(self._idle),
+                    "in_use": self._in_use,
+                    "created": self.created,
+                    "reused": self.reused,
+                    "expired": self.expired,
+                    "discarded": self.discarded,
+                    "retried": self.retried}
+        finally:
+            self._mutex.release()
+
+    def _acquire(self, connect_timeout=None, reuse=True):
+        publisher = None
+        expired = []
+        self._mutex.acquire()
+        try:
+            self._after_fork()
+            if self.idle_timeout:
+                stale = time.time() - self.idle_timeout
+                while self._idle and self._idle[0][1] < stale:
+                    expired.append(self._idle.popleft()[0])
+                self.expired += len(expired)
+            if reuse and self._idle:
+                publisher = self._idle.pop()[0]
+                self.reused += 1
+            self._in_use += 1
+        finally:
+            self._mutex.release()
+        for stale_publisher in expired:
+            self._close(stale_publisher)
+        if publisher is not None:
+            return publisher, True
+
+        try:
+            publisher = self.app.amqp.TaskPublisher(
+                    self.app.broker_connection(
+                        connect_timeout=connect_timeout))
+        except:
+            self._mutex.acquire()
+            try:
+                self._in_use -= 1
+            finally:
+                self._mutex.release()
+            raise
+        self._mutex.acquire()
+        try:
+            self.created += 1
+        finally:
+            self._mutex.release()
+        return publisher, False
+
+    def _call(self, fun, publisher):
+        try:
+            result = fun(publisher)
+        except publisher.connection.connection_errors:
+            self.discard(publisher)
+            raise
+        except:
+            self.release(publisher)
+            raise
+        self.release(publisher)
+        return result
+
+    def _after_fork(self):
+        # Must be called with the mutex held.
+        if self._pid != os.getpid():
+            # Never close the connections of the parent process,
+            # as that would also close them in the parent.
+            self._idle = deque()
+            self._in_use = 0
+            self._pid = os.getpid()
+
+    def _close(self, publisher):
+        try:
+            try:
+                publisher.close()
+            finally:
+                publisher.connection.close()
+        except Exception:
+            pass
+
+
+class PublishBuffer(threading.Thread):
+    """Sends tasks from a background thread, so that sending a task
+    does not have to wait for the broker.
+
+    Tasks are put in a bounded in-memory queue, and a background thread
+    sends them in batches of up to `batch_size` tasks using the app's
+    :class:`PublisherPool`.  The task ids are generated when the tasks
+    are put in the buffer, so results can be waited for right away.
+
+    A batch that fails to send because of a connection error is retried
+    until the connection is back.  A batch failing with any other error
+    is retried `max_retries` times, then its tasks are sent one by one,
+    and the tasks that still fail are logged and dropped.  The tasks of
+    a batch sent before the error are sent again when it's retried, so
+    a task may be sent twice.
+
+    :param app: The app used to send the tasks.
+    :keyword max_size: Max number of tasks waiting in memory.
+    :keyword batch_size: Max number of tasks sent at once.
+    :keyword overflow: What to do with tasks put in a full buffer,
+        one of :data:`OVERFLOW_POLICIES`: ``"block"`` waits until
+        there is room for the task, ``"drop"`` discards the task, and
+        ``"journal"`` appends it to the journal file.
+    :keyword journal: Path to the journal file.  Every process appends
+        to a journal of its own, the path suffixed with its pid.  Tasks in
+        the journal are sent when the in-memory queue is empty, including
+        tasks left by processes that are no longer running.  A task may be
+        sent twice if the process is killed after sending it, but before
+        it is removed from the journal.
+    :keyword interval: Time in seconds to wait before retrying when
+        sending fails.
+    :keyword logger: Logger used to report errors while sending.
+    :keyword max_retries: Max number of times in a row a batch failing
+        with an error other than a connection error is retried.
+    :keyword connection_errors: Tuple of the exceptions raised when the
+        connection to the broker is lost.
+
+    """
+
+    def __init__(self, app, max_size=1000, batch_size=100,
+            overflow="block", journal=None, interval=1.0, logger=None,
+            max_retries=3, connection_errors=()):
+        super(PublishBuffer, self).__init__()
+        if overflow not in OVERFLOW_POLICIES:
+            raise ImproperlyConfigured(
+                    "Unknown publish buffer overflow policy: %r" % (
+                        overflow, ))
+        if overflow == "journal" and not journal:
+            raise ImproperlyConfigured(
+                    "The journal overflow policy requires the path to "
+                    "the journal file to be set.")
+        self.app = app
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.journal = journal
+        self.interval = interval
+        self.logger = logger
+        self.max_retries = max_retries
+        self.connection_errors = connection_errors
+        self._failures = 0
+        self._queue = deque()
+        self._mutex = threading.Lock()
+        self._not_full = threading.Condition(self._mutex)
+        self._journal_mutex = threading.Lock()
+        self._journal_offset = 0
+        self._journal_pid = None
+        self._wakeup = threading.Event()
+        self._shutdown = threading.Event()
+        self._stopped = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.journaled = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.setDaemon(True)
+        self.setName(self.__class__.__name__)
+
+    def put(self, task_name, task_args=None, task_kwargs=None,
+            countdown=None, eta=None, task_id=None, expires=None,
+            **options):
+        """Add task to the buffer.  Takes the same arguments as
+        :meth:`TaskPublisher.delay_task`, and returns the task id."""
+        task_id = options["task_id"] = task_id or gen_unique_id()
+        task_args = task_args or []
+        task_kwargs = task_kwargs or {}
+        check_task_arguments(task_args, task_kwargs)
+        # Fail now, as sending the task right away would, instead of
+        # failing the batch it's sent with.
+        serialization.encode({"args": task_args, "kwargs": task_kwargs},
+                             serializer=options.get("serializer") or
+                                    self.app.conf.CELERY_TASK_SERIALIZER)
+        # Relative times are relative to now, not to when the task is sent.
+        if countdown:
+            eta = datetime.now() + timedelta(seconds=countdown)
+        if isinstance(expires, int):
+            expires = datetime.now() + timedelta(seconds=expires)
+        options["eta"] = eta
+        options["expires"] = expires
+        item = (time.time(), task_name, task_args, task_kwargs, options)
+
+        if self._shutdown.isSet():
+            # Buffer stopped, send the task right away.
+            self._send([item])
+            return task_id
+
+        self._not_full.acquire()
+        try:
+            while len(self._queue) >= self.max_size:
+                if self.overflow == "drop":
+                    self.dropped += 1
+                    return task_id
+                if self.overflow == "journal":
+                    self._write_journal(item)
+                    return task_id
+                self._not_full.wait(self.interval)
+            self._queue.append(item)
+            full = len(self._queue) >= self.batch_size
+        finally:
+            self._not_full.release()
+        if full:
+            self._wakeup.set()
         return task_id
 
+    def flush(self):
+        """Send all the tasks in the buffer and the journal, returns the
+        number of tasks sent."""
+        sent = 0
+        while 1:
+            count = self._send_batch()
+            if not count:
+                return sent
+            sent += count
+
+    def stats(self):
+        """Returns the number of tasks waiting, and counters for tasks
+        sent, dropped, journaled, and send errors, and the average and
+        max time in seconds between a task being put in the buffer and
+        it being sent."""
+        self._mutex.acquire()
+        try:
+            latency_avg = 0.0
+            if self.sent:
+                latency_avg = self.latency_total / self.sent
+            return {"max_size": self.max_size,
+                    "overflow": self.overflow,
+                    "depth": len(self._queue),
+                    "sent": self.sent,
+                    "dropped": self.dropped,
+                    "journaled": self.journaled,
+                    "errors": self.errors,
+                    "latency_avg": latency_avg,
+                    "latency_max": self.latency_max}
+        finally:
+            self._mutex.release()
+
+    def run(self):
+        while not self._shutdown.isSet():
+            if not self._send_batch():
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+        self.flush()
+        self._stopped.set()
+
+    def stop(self):
+        """Stop the thread, sending any tasks in the buffer."""
+        if not self.isAlive():
+            self._shutdown.set()
+            return self.flush()
+        self._shutdown.set()
+        self._wakeup.set()
+        self._stopped.wait()
+        self.join(1e100)
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _send_batch(self):
+        self._mutex.acquire()
+        try:
+            batch = [self._queue.popleft()
+                        for i in xrange(min(self.batch_size,
+                                            len(self._queue)))]
+            if batch:
+                self._not_full.notifyAll()
+        finally:
+            self._mutex.release()
+        offset = None
+        if not batch and self.journal:
+            batch, offset = self._read_journal()
+            if not batch and offset:
+                # Skipped a corrupt record.
+                self._commit_journal(offset)
+        if not batch:
+            return 0
+
+        try:
+            self._send(batch)
+        except Exception, exc:
+            if self.logger:
+                self.logger.error("Unable to send buffered tasks: %r" % (
+                                    exc, ), exc_info=sys.exc_info())
+            self._mutex.acquire()
+            try:
+                self.errors += 1
+                if not isinstance(exc, self.connection_errors):
+                    self._failures += 1
+                retry = self._failures <= self.max_retries
+                if not retry:
+                    self._failures = 0
+            finally:
+                self._mutex.release()
+            if retry:
+                self._retry(batch, offset)
+                return 0
+            sent, rest = self._send_each(batch)
+            if rest:
+                self._retry(rest, offset)
+            elif offset is not None:
+                self._commit_journal(offset)
+            return sent
+        self._failures = 0
+        if offset is not None:
+            self._commit_journal(offset)
+        return len(batch)
+
+    def _retry(self, batch, offset=None):
+        # Tasks read from the journal are retried by reading them again.
+        if offset is None:
+            self._mutex.acquire()
+            try:
+                # Put back in front, to be retried.
+                batch = list(batch)
+                batch.reverse()
+                self._queue.extendleft(batch)
+            finally:
+                self._mutex.release()
+
+    def _send_each(self, batch):
+        """Send the tasks of a batch one by one, dropping the tasks
+        that fail.  Returns the number of tasks sent, and the tasks
+        left to retry when the connection is lost."""
+        sent = 0
+        for index, item in enumerate(batch):
+            try:
+                self._send([item])
+            except self.connection_errors:
+                return sent, batch[index:]
+            except Exception, exc:
+                self._mutex.acquire()
+                try:
+                    self.dropped += 1
+                finally:
+                    self._mutex.release()
+                if self.logger:
+                    self.logger.error(
+                        "Dropped buffered task %s[%s]: %r" % (
+                            item[1], item[4]["task_id"], exc))
+            else:
+                sent += 1
+        return sent, []
+
+    def _send(self, batch):
+        conf = self.app.conf
+
+        def _send_tasks(publisher):
+            event_dispatcher = None
+            if conf.CELERY_SEND_TASK_SENT_EVENT:
+                event_dispatcher = self.app.events.Dispatcher(
+                                        channel=publisher.channel,
+                                        buffer_while_offline=False)
+            return publisher.delay_tasks([item[1:] for item in batch],
+                                         event_dispatcher=event_dispatcher)
+
+        self.app.pool.publish(_send_tasks)
+        now = time.time()
+        self._mutex.acquire()
+        try:
+            self.sent += len(batch)
+            for item in batch:
+                latency = now - item[0]
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+        finally:
+            self._mutex.release()
+
+    def _journal_path(self):
+        """Path to the journal of this process (the lock must be held).
+        A forked child starts with a journal of its own."""
+        pid = os.getpid()
+        if self._journal_pid != pid:
+            self._journal_pid = pid
+            self._journal_offset = 0
+        return "%s.%d" % (self.journal, pid)
+
+    def _claim_journal(self, path):
+        """Take over the journal left by a process that is no longer
+        running, by renaming it to `path`.  Returns :const:`True` if
+        a journal was claimed."""
+        for orphan in glob.glob("%s.*" % (self.journal, )):
+            pid = orphan[len(self.journal) + 1:]
+            if not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except OSError, exc:
+                if exc.errno != errno.ESRCH:
+                    continue
+            else:
+                continue
+            try:
+                # Atomic, so only one process gets to claim it.
+                os.rename(orphan, path)
+            except OSError:
+                continue
+            return True
+        return False
+
+    def _write_journal(self, item):
+        self._journal_mutex.acquire()
+        try:
+            fh = open(self._journal_path(), "ab")
+            try:
+                pickle.dump(item, fh, protocol=2)
+            finally:
+                fh.close()
+            self.journaled += 1
+        finally:
+            self._journal_mutex.release()
+
+    def _read_journal(self):
+        """Read the next batch from the journal, returns the batch and
+        the offset to commit when it has been sent."""
+        self._journal_mutex.acquire()
+        try:
+            path = self._journal_path()
+            if not os.path.exists(path) and not self._claim_journal(path):
+                return [], None
+            try:
+                fh = open(path, "rb")
+            except IOError:
+                return [], None
+            try:
+                fh.seek(self._journal_offset)
+                batch = []
+                offset = self._journal_offset
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(pickle.load(fh))
+                    except EOFError:
+                        break
+                    except Exception, exc:
+                        # Partially written record.
+                        if self.logger:
+                            self.logger.error(
+                                "Skipping corrupt publish journal %r: %r" % (
+                                    path, exc))
+                        fh.seek(0, 2)
+                        offset = fh.tell()
+                        break
+                    offset = fh.tell()
+                return batch, offset
+            finally:
+                fh.close()
+        finally:
+            self._journal_mutex.release()
+
+    def _commit_journal(self, offset):
+        self._journal_mutex.acquire()
+        try:
+            path = self._journal_path()
+            if offset >= os.path.getsize(path):
+                # Everything has been sent.
+                os.unlink(path)
+                offset = 0
+            self._journal_offset = offset
+        finally:
+            self._journal_mutex.release()
+
 
 class AMQP(object):
     BrokerConnection = BrokerConnection
     Publisher = messaging.Publisher
     Consumer = messaging.Consumer
     _queues = None
+    _router = None
+    _router_key = None
 
     def __init__(self, app):
         self.app = app
 
+        #: :class:`MessageStats` counters shared by all the task
+        #: publishers created by this app.
+        self.message_stats = MessageStats()
+
     def ConsumerSet(self, *args, **kwargs):
         return messaging.ConsumerSet(*args, **kwargs)
 
@@ -179,12 +955,58 @@ class AMQP(object):
                                     self.app.conf.CELERY_DEFAULT_EXCHANGE,
                                     self.app.conf.CELERY_DEFAULT_EXCHANGE_TYPE)
 
+    def PublisherPool(self, limit=None, idle_timeout=None):
+        conf = self.app.conf
+        if limit is None:
+            limit = conf.BROKER_POOL_LIMIT
+        if idle_timeout is None:
+            idle_timeout = conf.BROKER_POOL_IDLE_TIMEOUT
+        return PublisherPool(self.app, limit=limit, idle_timeout=idle_timeout)
+
+    def PublishBuffer(self, max_size=None, batch_size=None, overflow=None,
+            journal=None):
+        conf = self.app.conf
+        connection_errors = self.app.broker_connection().connection_errors
+        return PublishBuffer(self.app,
+                max_size=max_size or conf.CELERY_PUBLISH_BUFFER_SIZE,
+                batch_size=batch_size or conf.CELERY_PUBLISH_BUFFER_BATCH_SIZE,
+                overflow=overflow or conf.CELERY_PUBLISH_BUFFER_OVERFLOW,
+                journal=journal or conf.CELERY_PUBLISH_BUFFER_JOURNAL,
+                logger=self.app.log.get_default_logger(),
+                connection_errors=connection_errors)
+
     def Router(self, queues=None, create_missing=None):
-        return routes.Router(self.app.conf.CELERY_ROUTES,
-                             queues or self.app.conf.CELERY_QUEUES,
-                             self.app.either("CELERY_CREATE_MISSING_QUEUES",
-                                             create_missing),
-                             app=self.app)
+        """Get the task router.
+
+        Unless a custom set of `queues` is used, the router is
+        shared, so the routes it has looked up are remembered.  It is
+        replaced if the :setting:`CELERY_ROUTES` or :setting:`CELERY_QUEUES`
+        settings are changed, but changes made to these in place must be
+        followed by a call to :meth:`flush_routes`.
+
+        """
+        conf = self.app.conf
+        create_missing = self.app.either("CELERY_CREATE_MISSING_QUEUES",
+                                         create_missing)
+        if queues:
+            return routes.Router(conf.CELERY_ROUTES, queues, create_missing,
+                                 app=self.app)
+        # Compare the settings by identity: keeping references to them
+        # means their ids can't be reused by other objects.
+        key = (conf.CELERY_ROUTES, conf.CELERY_QUEUES, create_missing)
+        if self._router is None or not self._same_router_key(key):
+            self._router = routes.Router(conf.CELERY_ROUTES,
+                                         conf.CELERY_QUEUES, create_missing,
+                                         app=self.app)
+            self._router_key = key
+        return self._router
+
+    def _same_router_key(self, key):
+        return all(a is b for a, b in zip(key, self._router_key))
+
+    def flush_routes(self):
+        """Forget the routes remembered by the shared router."""
+        self._router = self._router_key = None
 
     def TaskConsumer(self, *args, **kwargs):
         default_queue_name, default_queue = self.get_default_queue()
@@ -198,7 +1020,12 @@ class AMQP(object):
         defaults = {"exchange": default_queue["exchange"],
                     "exchange_type": default_queue["exchange_type"],
                     "routing_key": self.app.conf.CELERY_DEFAULT_ROUTING_KEY,
-                    "serializer": self.app.conf.CELERY_TASK_SERIALIZER}
+                    "serializer": self.app.conf.CELERY_TASK_SERIALIZER,
+                    "compression_threshold":
+                        self.app.conf.CELERY_MESSAGE_COMPRESSION_THRESHOLD,
+                    "compression_level":
+                        self.app.conf.CELERY_MESSAGE_COMPRESSION_LEVEL,
+                    "stats": self.message_stats}
         publisher = TaskPublisher(*args,
                                   **self.app.merge(defaults, kwargs))
 
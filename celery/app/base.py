@@ -8,10 +8,12 @@ Application Base Class.
 :license: BSD, see LICENSE for more details.
 
 """
+import os
 import sys
 import platform as _platform
 
 from datetime import timedelta
+from multiprocessing.util import Finalize
 
 from celery import routes
 from celery.app.defaults import DEFAULTS
@@ -38,6 +40,9 @@ class BaseApp(object):
         self._loader = None
         self._log = None
         self._events = None
+        self._pool = None
+        self._publish_buffer = None
+        self._publish_buffer_pid = None
         self.set_as_current = set_as_current
         self.on_init()
 
@@ -104,15 +109,27 @@ class BaseApp(object):
         exchange = options.get("exchange")
         exchange_type = options.get("exchange_type")
 
+        def _send(publish):
+            return publish.delay_task(name, args, kwargs, task_id=task_id,
+                                      countdown=countdown, eta=eta,
+                                      expires=expires, **options)
+
+        if publisher is None and connection is None:
+            buffer = self.publish_buffer
+            if buffer is not None:
+                return result_cls(buffer.put(name, args, kwargs,
+                                             task_id=task_id,
+                                             countdown=countdown, eta=eta,
+                                             expires=expires, **options))
+            return result_cls(self.pool.publish(_send,
+                                    connect_timeout=connect_timeout))
+
         def _do_publish(connection=None, **_):
             publish = publisher or self.amqp.TaskPublisher(connection,
                                             exchange=exchange,
                                             exchange_type=exchange_type)
             try:
-                new_id = publish.delay_task(name, args, kwargs,
-                                            task_id=task_id,
-                                            countdown=countdown, eta=eta,
-                                            expires=expires, **options)
+                new_id = _send(publish)
             finally:
                 publisher or publish.close()
 
@@ -323,6 +340,35 @@ class BaseApp(object):
             self._log = Logging(app=self)
         return self._log
 
+    @property
+    def pool(self):
+        """Pool of task publishers used to send tasks.
+
+        See :class:`~celery.app.amqp.PublisherPool`.
+
+        """
+        if self._pool is None:
+            self._pool = self.amqp.PublisherPool()
+        return self._pool
+
+    @property
+    def publish_buffer(self):
+        """The :class:`~celery.app.amqp.PublishBuffer` used to send tasks
+        in the background in this process, or :const:`None` if disabled
+        (:setting:`CELERY_PUBLISH_BUFFER_SIZE`)."""
+        if not self.conf.CELERY_PUBLISH_BUFFER_SIZE:
+            return
+        # A thread started in the parent does not survive a fork,
+        # so every child process gets its own buffer.
+        pid = os.getpid()
+        if self._publish_buffer is None or self._publish_buffer_pid != pid:
+            self._publish_buffer = self.amqp.PublishBuffer()
+            self._publish_buffer_pid = pid
+            self._publish_buffer.start()
+            Finalize(self._publish_buffer, self._publish_buffer.stop,
+                     exitpriority=10)
+        return self._publish_buffer
+
     @property
     def events(self):
         if self._events is None:
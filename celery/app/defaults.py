@@ -51,6 +51,8 @@ NAMESPACES = {
         "CONNECTION_MAX_RETRIES": Option(100, type="int"),
         "INSIST": Option(False, type="bool"),
         "USE_SSL": Option(False, type="bool"),
+        "POOL_LIMIT": Option(10, type="int"),
+        "POOL_IDLE_TIMEOUT": Option(300.0, type="float"),
     },
     "CELERY": {
         "ACKS_LATE": Option(False, type="bool"),
@@ -69,18 +71,43 @@ NAMESPACES = {
         "DEFAULT_EXCHANGE_TYPE": Option("direct"),
         "DEFAULT_DELIVERY_MODE": Option(2, type="string"),
         "EAGER_PROPAGATES_EXCEPTIONS": Option(False, type="bool"),
+        "EVENT_ARCHIVE_PATH": Option("celery-events.sqlite"),
+        "EVENT_ARCHIVE_PARTITION": Option(3600, type="int"),
+        "EVENT_ARCHIVE_RETENTION": Option(7 * 24 * 3600.0, type="float"),
+        "EVENT_ARCHIVE_MAX_EVENTS": Option(100000, type="int"),
+        "EVENT_SAMPLE_RATES": Option(None, type="dict"),
         "EVENT_SERIALIZER": Option("json"),
+        "EVENT_TYPES": Option(None, type="tuple"),
         "IMPORTS": Option((), type="tuple"),
         "IGNORE_RESULT": Option(False, type="bool"),
         "MAX_CACHED_RESULTS": Option(5000, type="int"),
         "MESSAGE_COMPRESSION": Option(None, type="string"),
+        "MESSAGE_COMPRESSION_LEVEL": Option(None, type="int"),
+        "MESSAGE_COMPRESSION_THRESHOLD": Option(1024, type="int"),
+        "PUBLISH_BUFFER_SIZE": Option(0, type="int"),
+        "PUBLISH_BUFFER_BATCH_SIZE": Option(100, type="int"),
+        "PUBLISH_BUFFER_OVERFLOW": Option("block"),
+        "PUBLISH_BUFFER_JOURNAL": Option(),
         "RESULT_BACKEND": Option("amqp"),
+        "RESULT_BUFFER_LATENCY": Option(1.0, type="float"),
+        "RESULT_BUFFER_SIZE": Option(0, type="int"),
+        "RESULT_CACHE_MAX_BYTES": Option(None, type="int"),
+        "RESULT_CACHE_STATES": Option(("SUCCESS", ), type="tuple"),
+        "RESULT_CACHE_TTL": Option(None, type="float"),
+        "RESULT_CHUNK_SIZE": Option(None, type="int"),
+        "RESULT_CLEANUP_BATCH_SIZE": Option(1000, type="int"),
+        "RESULT_CLEANUP_INTERVAL": Option(3600, type="int"),
+        "RESULT_CLEANUP_PAUSE": Option(0.1, type="float"),
+        "RESULT_COMPRESSION": Option(None, type="string"),
+        "RESULT_COMPRESSION_THRESHOLD": Option(1024, type="int"),
         "RESULT_DBURI": Option(),
         "RESULT_ENGINE_OPTIONS": Option(None, type="dict"),
         "RESULT_EXCHANGE": Option("celeryresults"),
         "RESULT_EXCHANGE_TYPE": Option("direct"),
         "RESULT_SERIALIZER": Option("pickle"),
         "RESULT_PERSISTENT": Option(False, type="bool"),
+        "RESULT_SQLITE_PATH": Option("celery-results.sqlite"),
+        "RESULT_SQLITE_TIMEOUT": Option(30.0, type="float"),
         "SEND_EVENTS": Option(False, type="bool"),
         "SEND_TASK_ERROR_EMAILS": Option(False, type="bool"),
         "SEND_TASK_SENT_EVENT": Option(False, type="bool"),
@@ -98,6 +125,10 @@ NAMESPACES = {
         "CONCURRENCY": Option(0, type="int"),
         "ETA_SCHEDULER": Option("celery.utils.timer2.Timer"),
         "ETA_SCHEDULER_PRECISION": Option(1.0, type="float"),
+        "EVENT_BATCH_SIZE": Option(0, type="int"),
+        "EVENT_BATCH_INTERVAL": Option(0.1, type="float"),
+        "HEARTBEAT_INTERVAL": Option(120.0, type="float"),
+        "HEARTBEAT_STATS": Option(False, type="bool"),
         "CONSUMER": Option("celery.worker.consumer.Consumer"),
         "LOG_FORMAT": Option(DEFAULT_PROCESS_LOG_FMT),
         "LOG_COLOR": Option(type="bool"),
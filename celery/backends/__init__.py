@@ -9,6 +9,7 @@ BACKEND_ALIASES = {
     "tyrant": "celery.backends.tyrant.TyrantBackend",
     "database": "celery.backends.database.DatabaseBackend",
     "cassandra": "celery.backends.cassandra.CassandraBackend",
+    "sqlite": "celery.backends.sqlite.SQLiteBackend",
 }
 
 _backend_cache = {}
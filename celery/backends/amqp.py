@@ -10,6 +10,7 @@ from kombu.messaging import Consumer, Producer
 
 from celery import states
 from celery.backends.base import BaseDictBackend
+from celery.datastructures import LRUCache
 from celery.exceptions import TimeoutError
 from celery.utils import timeutils
 
@@ -36,6 +37,9 @@ class AMQPBackend(BaseDictBackend):
             expires=None, **kwargs):
         super(AMQPBackend, self).__init__(**kwargs)
         conf = self.app.conf
+        # Results are read-once, so the cache holds the only copy of the
+        # results consumed: don't let them expire or be evicted by size.
+        self._cache = LRUCache(limit=self._cache.limit)
         self._connection = connection
         self.queue_arguments = {}
         exchange = exchange or conf.CELERY_RESULT_EXCHANGE
@@ -108,9 +112,13 @@ class AMQPBackend(BaseDictBackend):
 
         return result
 
-    def get_task_meta(self, task_id, cache=True):
-        if cache and task_id in self._cache:
-            return self._cache[task_id]
+    def get_task_meta(self, task_id, cache=True, join_chunks=True):
+        # Results are never stored in chunks by this backend,
+        # so `join_chunks` has no effect.
+        if cache:
+            cached = self._cache.get(task_id)
+            if cached is not None:
+                return cached
 
         return self.poll(task_id)
 
@@ -139,9 +147,9 @@ class AMQPBackend(BaseDictBackend):
             binding.delete(if_unused=True, if_empty=True, nowait=True)
             payload = self._cache[task_id] = result.payload
             return payload
-        elif task_id in self._cache:
-            return self._cache[task_id]     # use previously received state.
-        return {"status": states.PENDING, "result": None}
+        # use previously received state.
+        return self._cache.get(task_id) or {"status": states.PENDING,
+                                            "result": None}
 
     def consume(self, task_id, timeout=None):
         results = []
@@ -1,11 +1,37 @@
 """celery.backends.base"""
+import os
+import sys
+import threading
 import time
 
+from multiprocessing.util import Finalize
+
+from kombu import compression
+from kombu import serialization
+from kombu.utils import partition
+
 from celery import states
+from celery.exceptions import ImproperlyConfigured
 from celery.exceptions import TimeoutError, TaskRevokedError
-from celery.serialization import pickle, get_pickled_exception
+from celery.exceptions import ResultChunkMissing
+from celery.serialization import get_pickled_exception
 from celery.serialization import get_pickleable_exception
-from celery.datastructures import LocalCache
+from celery.serialization import subclass_exception
+from celery.datastructures import LRUCache
+from celery.utils.compat import OrderedDict
+
+#: Serializers able to store exception instances as-is,
+#: for any other serializer exceptions are stored as a dict.
+EXCEPTION_ABLE_CODECS = frozenset(["pickle"])
+
+#: Prefix used to identify stored payloads that have been compressed,
+#: a sequence no serializer starts a payload with.  It's followed by the
+#: version of the header, and the compression content type terminated
+#: by a null byte.
+COMPRESSED_MAGIC = "\x00\xfe\xce"
+
+#: Version of the compressed payload header.
+COMPRESSED_VERSION = "\x01"
 
 
 class BaseBackend(object):
@@ -20,6 +46,60 @@ class BaseBackend(object):
     def __init__(self, *args, **kwargs):
         from celery.app import app_or_default
         self.app = app_or_default(kwargs.get("app"))
+        conf = self.app.conf
+        self.serializer = kwargs.get("serializer") or \
+                            conf.CELERY_RESULT_SERIALIZER
+        try:
+            self.content_type, self.content_encoding, _ = \
+                    serialization.encode(None, serializer=self.serializer)
+        except serialization.SerializerNotInstalled:
+            raise ImproperlyConfigured(
+                    "No encoder installed for result serializer %r" % (
+                        self.serializer, ))
+        self.compression = kwargs.get("compression") or \
+                            conf.CELERY_RESULT_COMPRESSION
+        self.compression_threshold = kwargs.get("compression_threshold")
+        if self.compression_threshold is None:
+            self.compression_threshold = \
+                    conf.CELERY_RESULT_COMPRESSION_THRESHOLD
+        self.chunk_size = kwargs.get("chunk_size") or \
+                            conf.CELERY_RESULT_CHUNK_SIZE
+
+    def encode(self, data):
+        """Serialize data for storage using the configured serializer.
+
+        If compression is enabled and the serialized payload is larger than
+        :attr:`compression_threshold`, the payload is also compressed.
+        The decision is made per value, so small results are never
+        compressed.
+
+        """
+        _, _, payload = serialization.encode(data,
+                                             serializer=self.serializer)
+        if isinstance(payload, unicode):
+            payload = payload.encode("utf-8")
+        if self.compression and \
+                len(payload) >= self.compression_threshold:
+            encoder, content_type = compression.get_encoder(self.compression)
+            payload = "".join([COMPRESSED_MAGIC, COMPRESSED_VERSION,
+                               content_type, "\x00", encoder(payload)])
+        return payload
+
+    def decode(self, payload):
+        """Deserialize data previously serialized by :meth:`encode`."""
+        payload = str(payload)
+        if payload.startswith(COMPRESSED_MAGIC):
+            header_size = len(COMPRESSED_MAGIC) + len(COMPRESSED_VERSION)
+            version = payload[len(COMPRESSED_MAGIC):header_size]
+            if version != COMPRESSED_VERSION:
+                raise ValueError(
+                    "Unknown compressed result version: %r" % (version, ))
+            content_type, _, payload = partition(payload[header_size:],
+                                                 "\x00")
+            payload = compression.get_decoder(content_type)(payload)
+        return serialization.decode(payload,
+                                    content_type=self.content_type,
+                                    content_encoding=self.content_encoding)
 
     def encode_result(self, result, status):
         if status in self.EXCEPTION_STATES:
@@ -57,11 +137,16 @@ class BaseBackend(object):
 
     def prepare_exception(self, exc):
         """Prepare exception for serialization."""
-        return get_pickleable_exception(exc)
+        if self.serializer in EXCEPTION_ABLE_CODECS:
+            return get_pickleable_exception(exc)
+        return {"exc_type": type(exc).__name__, "exc_message": str(exc)}
 
     def exception_to_python(self, exc):
         """Convert serialized exception to Python exception."""
-        return get_pickled_exception(exc)
+        if self.serializer in EXCEPTION_ABLE_CODECS:
+            return get_pickled_exception(exc)
+        return subclass_exception(str(exc["exc_type"]), Exception,
+                                  __name__)(exc["exc_message"])
 
     def prepare_value(self, result):
         """Prepare value for storage."""
@@ -83,25 +168,60 @@ class BaseBackend(object):
 
         """
 
+        if self._wait_until_ready(task_id, timeout) == states.SUCCESS:
+            return self.get_result(task_id)
+        raise self.get_result(task_id)
+
+    def _wait_until_ready(self, task_id, timeout=None):
+        """Wait for the task to be ready, and return its state."""
         sleep_inbetween = 0.5
         time_elapsed = 0.0
 
         while True:
             status = self.get_status(task_id)
-            if status == states.SUCCESS:
-                return self.get_result(task_id)
-            elif status in states.PROPAGATE_STATES:
-                raise self.get_result(task_id)
+            if status in self.READY_STATES:
+                return status
             # avoid hammering the CPU checking status.
             time.sleep(sleep_inbetween)
             time_elapsed += sleep_inbetween
             if timeout and time_elapsed >= timeout:
                 raise TimeoutError("The operation timed out.")
 
-    def cleanup(self):
+    def stream_result(self, task_id, timeout=None):
+        """Wait for the task and return an iterator over its result.
+
+        Backends storing large results in chunks yield string results
+        one chunk at a time, otherwise the whole result is yielded
+        as a single item.
+
+        """
+        return iter([self.wait_for(task_id, timeout=timeout)])
+
+    def cleanup(self, batch_size=None, pause=None):
         """Backend cleanup. Is run by
-        :class:`celery.task.DeleteExpiredTaskMetaTask`."""
-        pass
+        :class:`celery.task.builtins.backend_cleanup`.
+
+        Backends deleting expired results in batches will delete at most
+        `batch_size` results at a time (default is
+        :setting:`CELERY_RESULT_CLEANUP_BATCH_SIZE`), sleeping for `pause`
+        seconds between each batch (default is
+        :setting:`CELERY_RESULT_CLEANUP_PAUSE`).  A `batch_size` of zero
+        or less deletes all expired results at once.
+
+        Returns the number of results deleted.
+
+        """
+        return 0
+
+    def _cleanup_options(self, batch_size=None, pause=None):
+        conf = self.app.conf
+        if batch_size is None:
+            batch_size = conf.CELERY_RESULT_CLEANUP_BATCH_SIZE
+        if not batch_size or batch_size < 0:
+            batch_size = None   # no batching.
+        if pause is None:
+            pause = conf.CELERY_RESULT_CLEANUP_PAUSE
+        return batch_size, pause
 
     def process_cleanup(self):
         """Cleanup actions to do at the end of a task worker process."""
@@ -143,29 +263,246 @@ class BaseBackend(object):
                 "reload_taskset_result is not supported by this backend.")
 
 
+class ResultBuffer(threading.Thread):
+    """Write-behind buffer for task results.
+
+    Results are kept in memory and written to the backend in bulk
+    by a background thread.  The buffer is flushed when it holds
+    `max_size` results, when the oldest result has been buffered for
+    more than `max_latency` seconds, and when the buffer is stopped.
+
+    :param flush: Callback writing a list of
+        ``(task_id, result, status, traceback)`` tuples to the store.
+    :keyword max_size: Max number of results to buffer before flushing.
+    :keyword max_latency: Max time in seconds a result can be buffered.
+    :keyword logger: Logger used to report errors while flushing.
+    :keyword store: Callback writing a single result, called with the
+        arguments ``task_id, result, status, traceback``.
+
+    Results that fail to be written are kept and retried at the next
+    flush.  When the buffer is full, e.g. because the store is down,
+    new results are written synchronously using `store` (or `flush`
+    if there's no `store` callback) instead, so errors are raised to
+    the caller rather than results being lost.
+
+    """
+
+    def __init__(self, flush, max_size=100, max_latency=1.0, logger=None,
+            store=None):
+        super(ResultBuffer, self).__init__()
+        self._flush = flush
+        self._store = store
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.logger = logger
+        self._pending = OrderedDict()
+        self._first_put = None
+        self._mutex = threading.Lock()
+        # Held while results are taken from the buffer and written,
+        # so an older state can't be written after a newer one.
+        self._flush_mutex = threading.Lock()
+        self._wakeup = threading.Event()
+        self._shutdown = threading.Event()
+        self._stopped = threading.Event()
+        self.setDaemon(True)
+        self.setName(self.__class__.__name__)
+
+    def put(self, task_id, result, status, traceback=None):
+        """Add result to the buffer.  A later result for the same task
+        replaces any buffered result not yet written.
+
+        If the buffer is full the result is written synchronously.
+
+        """
+        item = (task_id, result, status, traceback)
+        self._mutex.acquire()
+        try:
+            overflow = (len(self._pending) >= self.max_size and
+                        task_id not in self._pending)
+            if not overflow:
+                if not self._pending:
+                    self._first_put = time.time()
+                self._pending[task_id] = item
+            full = len(self._pending) >= self.max_size
+        finally:
+            self._mutex.release()
+        if full:
+            self._wakeup.set()
+        if overflow:
+            self._write_through(item)
+
+    def _write_through(self, item):
+        self._flush_mutex.acquire()
+        try:
+            # A result for this task may have been buffered meanwhile.
+            self.discard(item[0])
+            if self._store is not None:
+                self._store(*item)
+            else:
+                self._flush([item])
+        finally:
+            self._flush_mutex.release()
+
+    def get(self, task_id):
+        """Get buffered result for task, or :const:`None` if the task
+        has no result waiting to be written."""
+        return self._pending.get(task_id)
+
+    def discard(self, task_id):
+        """Remove buffered result for task."""
+        self._mutex.acquire()
+        try:
+            self._pending.pop(task_id, None)
+        finally:
+            self._mutex.release()
+
+    def flush(self):
+        """Write all buffered results to the store.  Returns the number
+        of results written."""
+        self._flush_mutex.acquire()
+        try:
+            return self._flush_pending()
+        finally:
+            self._flush_mutex.release()
+
+    def _flush_pending(self):
+        self._mutex.acquire()
+        try:
+            pending, self._pending = self._pending, OrderedDict()
+            self._first_put = None
+        finally:
+            self._mutex.release()
+        if not pending:
+            return 0
+        try:
+            self._flush(pending.values())
+        except Exception, exc:
+            if self.logger:
+                self.logger.error("Unable to flush result buffer: %r" % (
+                                    exc, ), exc_info=sys.exc_info())
+            # Put back the results not already replaced by a newer state,
+            # so they are retried at the next flush.
+            self._mutex.acquire()
+            try:
+                for task_id, item in pending.items():
+                    self._pending.setdefault(task_id, item)
+                self._first_put = self._first_put or time.time()
+            finally:
+                self._mutex.release()
+            return 0
+        return len(pending)
+
+    def run(self):
+        while not self._shutdown.isSet():
+            first_put = self._first_put
+            if first_put is None:
+                timeout = self.max_latency
+            else:
+                timeout = first_put + self.max_latency - time.time()
+            if timeout > 0:
+                self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if self._pending:
+                self.flush()
+        self.flush()
+        self._stopped.set()
+
+    def stop(self):
+        """Stop the thread, flushing any buffered results."""
+        if not self.isAlive():
+            return self.flush()
+        self._shutdown.set()
+        self._wakeup.set()
+        self._stopped.wait()
+        self.join(1e100)
+
+    def __len__(self):
+        return len(self._pending)
+
+
 class BaseDictBackend(BaseBackend):
+    ResultBuffer = ResultBuffer
+
+    #: Set by backends able to store large results in chunks
+    #: (see :setting:`CELERY_RESULT_CHUNK_SIZE`).
+    supports_chunks = False
+
+    #: Set by backends able to read the state of many tasks in a
+    #: single request (see :meth:`get_many`).
+    supports_bulk_reads = False
 
     def __init__(self, *args, **kwargs):
         super(BaseDictBackend, self).__init__(*args, **kwargs)
-        self._cache = LocalCache(limit=kwargs.get("max_cached_results") or
-                                 self.app.conf.CELERY_MAX_CACHED_RESULTS)
+        conf = self.app.conf
+        self._cache = LRUCache(limit=kwargs.get("max_cached_results") or
+                                    conf.CELERY_MAX_CACHED_RESULTS,
+                               max_bytes=conf.CELERY_RESULT_CACHE_MAX_BYTES,
+                               ttl=conf.CELERY_RESULT_CACHE_TTL)
+        self.cache_states = frozenset(conf.CELERY_RESULT_CACHE_STATES)
+        self.buffer_size = kwargs.get("buffer_size")
+        if self.buffer_size is None:
+            self.buffer_size = conf.CELERY_RESULT_BUFFER_SIZE
+        self.buffer_latency = kwargs.get("buffer_latency") or \
+                                conf.CELERY_RESULT_BUFFER_LATENCY
+        self._buffer = None
+        self._buffer_pid = None
+
+    @property
+    def buffer(self):
+        """The write-behind :class:`ResultBuffer` for this process,
+        or :const:`None` if write-behind is disabled
+        (:setting:`CELERY_RESULT_BUFFER_SIZE`)."""
+        if not self.buffer_size:
+            return
+        # A thread started in the parent does not survive a fork,
+        # so every child process gets its own buffer.
+        pid = os.getpid()
+        if self._buffer is None or self._buffer_pid != pid:
+            self._buffer = self.ResultBuffer(self._store_many,
+                        max_size=self.buffer_size,
+                        max_latency=self.buffer_latency,
+                        logger=self.app.log.get_default_logger(),
+                        store=self._store_result)
+            self._buffer_pid = pid
+            self._buffer.start()
+            Finalize(self._buffer, self._buffer.stop, exitpriority=10)
+        return self._buffer
+
+    def flush_buffer(self):
+        """Write any buffered results to the store."""
+        if self._buffer is not None and self._buffer_pid == os.getpid():
+            return self._buffer.flush()
+        return 0
 
     def store_result(self, task_id, result, status, traceback=None):
         """Store task result and status."""
         result = self.encode_result(result, status)
+        buffer = self.buffer
+        if buffer is not None:
+            buffer.put(task_id, result, status, traceback)
+            return result
         return self._store_result(task_id, result, status, traceback)
 
+    def _store_many(self, results):
+        """Store a list of ``(task_id, result, status, traceback)``
+        tuples.  Backends supporting bulk writes should override this."""
+        for task_id, result, status, traceback in results:
+            self._store_result(task_id, result, status, traceback)
+
     def forget(self, task_id):
         self._cache.pop(task_id, None)
+        if self._buffer is not None:
+            self._buffer.discard(task_id)
         self._forget(task_id)
 
     def get_status(self, task_id):
         """Get the status of a task."""
-        return self.get_task_meta(task_id)["status"]
+        return self.get_task_meta(task_id, join_chunks=False)["status"]
 
     def get_traceback(self, task_id):
         """Get the traceback for a failed task."""
-        return self.get_task_meta(task_id).get("traceback")
+        meta = self.get_task_meta(task_id, join_chunks=False)
+        return meta.get("traceback")
 
     def get_result(self, task_id):
         """Get the result of a task."""
@@ -175,15 +512,159 @@ class BaseDictBackend(BaseBackend):
         else:
             return meta["result"]
 
-    def get_task_meta(self, task_id, cache=True):
-        if cache and task_id in self._cache:
-            return self._cache[task_id]
+    def get_task_meta(self, task_id, cache=True, join_chunks=True):
+        """Get the metadata for a task.
+
+        If the result has been stored in chunks the chunks are fetched
+        and joined, unless `join_chunks` is false, in which case the
+        result is :const:`None` and the ``"chunks"`` key holds the
+        chunk manifest.  Results stored in chunks are never cached.
+
+        """
+        if cache:
+            cached = self._cache.get(task_id)
+            if cached is not None:
+                return cached
+
+        if self._buffer is not None:
+            buffered = self._buffer.get(task_id)
+            if buffered is not None:
+                _, result, status, traceback = buffered
+                return {"status": status, "result": result,
+                        "traceback": traceback}
 
         meta = self._get_task_meta_for(task_id)
-        if cache and meta.get("status") == states.SUCCESS:
+        if meta.get("chunks"):
+            if not join_chunks:
+                return meta
+            return self._join_chunks(task_id, meta)
+        if cache and meta.get("status") in self.cache_states:
             self._cache[task_id] = meta
         return meta
 
+    def stream_result(self, task_id, timeout=None):
+        if self._wait_until_ready(task_id, timeout) != states.SUCCESS:
+            raise self.get_result(task_id)
+        chunks = self.get_task_meta(task_id, join_chunks=False).get("chunks")
+        if not chunks or chunks["encoded"]:
+            # Serialized results can only be decoded as a whole.
+            return iter([self.get_result(task_id)])
+        return self._iter_chunks(task_id, chunks)
+
+    def _chunk_result(self, task_id, result, status, payload=None):
+        """Store a large result in chunks of :attr:`chunk_size` bytes.
+
+        Returns the chunk manifest to store instead of the result,
+        or :const:`None` if the result is not to be split.
+
+        """
+        split = self._split_result(result, status, payload)
+        if split is not None:
+            manifest, chunks = split
+            self._store_chunks(task_id, chunks)
+            return manifest
+
+    def _split_result(self, result, status, payload=None):
+        """Split a large result in chunks of :attr:`chunk_size` bytes.
+
+        String results are split as-is, so they can be streamed, any
+        other result is serialized first (`payload` is the serialized
+        result, if the backend already has it).
+
+        Returns a tuple of the chunk manifest and the list of chunks,
+        or :const:`None` if the result is not to be split.
+
+        """
+        if not (self.supports_chunks and self.chunk_size) or \
+                status != states.SUCCESS:
+            return
+        encoded = not isinstance(result, str)
+        data = result
+        if encoded:
+            data = payload is not None and payload or self.encode(result)
+        size = len(data)
+        if size <= self.chunk_size:
+            return
+        chunks = [data[i:i + self.chunk_size]
+                    for i in xrange(0, size, self.chunk_size)]
+        return {"count": len(chunks), "size": size, "encoded": encoded}, chunks
+
+    def _join_chunks(self, task_id, meta):
+        """Replace the chunk manifest in `meta` with the joined result."""
+        meta = dict(meta)
+        chunks = meta.pop("chunks")
+        data = "".join(self._iter_chunks(task_id, chunks))
+        if chunks["encoded"]:
+            data = self.decode(data)
+        meta["result"] = data
+        return meta
+
+    def _iter_chunks(self, task_id, chunks):
+        for index in xrange(chunks["count"]):
+            chunk = self._get_chunk(task_id, index)
+            if chunk is None:
+                raise ResultChunkMissing(
+                        "Chunk %d of %d of the result for task %s "
+                        "is missing" % (index, chunks["count"], task_id))
+            yield chunk
+
+    def _store_chunks(self, task_id, chunks):
+        """Store the list of chunks of a large result."""
+        raise NotImplementedError(
+                "This backend does not support storing results in chunks.")
+
+    def _get_chunk(self, task_id, index):
+        """Get a chunk of a large result, or :const:`None`
+        if it does not exist."""
+        raise NotImplementedError(
+                "This backend does not support storing results in chunks.")
+
+    def get_many(self, task_ids, cache=True):
+        """Get the metadata for several tasks at once.
+
+        Returns a dict mapping each task id to its task metadata.
+        Results found in the local cache or the write-behind buffer
+        are not fetched from the store.
+
+        """
+        metas = {}
+        missing = []
+        for task_id in task_ids:
+            if cache:
+                cached = self._cache.get(task_id)
+                if cached is not None:
+                    metas[task_id] = cached
+                    continue
+            if self._buffer is not None:
+                buffered = self._buffer.get(task_id)
+                if buffered is not None:
+                    _, result, status, traceback = buffered
+                    metas[task_id] = {"status": status, "result": result,
+                                      "traceback": traceback}
+                    continue
+            missing.append(task_id)
+
+        if missing:
+            for task_id, meta in self._get_many_meta(missing).iteritems():
+                if meta.get("chunks"):
+                    meta = self._join_chunks(task_id, meta)
+                elif cache and meta.get("status") in self.cache_states:
+                    self._cache[task_id] = meta
+                metas[task_id] = meta
+        return metas
+
+    def _get_many_meta(self, task_ids):
+        """Get the metadata for a list of task ids from the store.
+        Backends supporting bulk reads should override this."""
+        return dict((task_id, self.get_task_meta(task_id, cache=False,
+                                                 join_chunks=False))
+                        for task_id in task_ids)
+
+    def cache_stats(self):
+        """Returns the hit/miss/eviction counters and the current size
+        of the local result cache."""
+        return self._cache.stats()
+
     def reload_task_result(self, task_id):
         self._cache[task_id] = self.get_task_meta(task_id, cache=False)
 
@@ -192,8 +673,10 @@ class BaseDictBackend(BaseBackend):
                                                         cache=False)
 
     def get_taskset_meta(self, taskset_id, cache=True):
-        if cache and taskset_id in self._cache:
-            return self._cache[taskset_id]
+        if cache:
+            cached = self._cache.get(taskset_id)
+            if cached is not None:
+                return cached
 
         meta = self._restore_taskset(taskset_id)
         if cache and meta is not None:
@@ -212,6 +695,8 @@ class BaseDictBackend(BaseBackend):
 
 
 class KeyValueStoreBackend(BaseDictBackend):
+    supports_chunks = True
+    supports_bulk_reads = True
 
     def get(self, key):
         raise NotImplementedError("Must implement the get method.")
@@ -230,17 +715,61 @@ class KeyValueStoreBackend(BaseDictBackend):
         """Get the cache key for a task by id."""
         return "celery-taskset-meta-%s" % task_id
 
+    def get_key_for_chunk(self, task_id, index):
+        """Get the cache key for a chunk of a task result."""
+        return "celery-task-meta-%s-chunk-%d" % (task_id, index)
+
     def _forget(self, task_id):
-        self.delete(self.get_key_for_task(task_id))
+        key = self.get_key_for_task(task_id)
+        meta = self.get(key)
+        if meta:
+            chunks = self.decode(meta).get("chunks")
+            for index in xrange(chunks and chunks["count"] or 0):
+                self.delete(self.get_key_for_chunk(task_id, index))
+        self.delete(key)
+
+    def mset(self, mapping):
+        """Set multiple keys at once.  Backends supporting bulk writes
+        should override this."""
+        for key, value in mapping.iteritems():
+            self.set(key, value)
+
+    def mget(self, keys):
+        """Get multiple keys at once, returns a list of values in the
+        same order as `keys`, with :const:`None` for missing keys.
+        Backends supporting bulk reads should override this."""
+        return [self.get(key) for key in keys]
+
+    def _encode_task_meta(self, task_id, result, status, traceback=None):
+        meta = {"status": status, "result": result, "traceback": traceback}
+        payload = self.encode(meta)
+        if self.chunk_size and len(payload) > self.chunk_size:
+            chunks = self._chunk_result(task_id, result, status)
+            if chunks:
+                payload = self.encode(dict(meta, result=None, chunks=chunks))
+        return payload
 
     def _store_result(self, task_id, result, status, traceback=None):
-        meta = {"status": status, "result": result, "traceback": traceback}
-        self.set(self.get_key_for_task(task_id), pickle.dumps(meta))
+        self.set(self.get_key_for_task(task_id),
+                 self._encode_task_meta(task_id, result, status, traceback))
         return result
 
+    def _store_many(self, results):
+        self.mset(dict((self.get_key_for_task(task_id),
+                        self._encode_task_meta(task_id, result,
+                                               status, traceback))
+                            for task_id, result, status, traceback in results))
+
+    def _store_chunks(self, task_id, chunks):
+        self.mset(dict((self.get_key_for_chunk(task_id, index), chunk)
+                            for index, chunk in enumerate(chunks)))
+
+    def _get_chunk(self, task_id, index):
+        return self.get(self.get_key_for_chunk(task_id, index))
+
     def _save_taskset(self, taskset_id, result):
         meta = {"result": result}
-        self.set(self.get_key_for_taskset(taskset_id), pickle.dumps(meta))
+        self.set(self.get_key_for_taskset(taskset_id), self.encode(meta))
         return result
 
     def _get_task_meta_for(self, task_id):
@@ -248,11 +777,17 @@ class KeyValueStoreBackend(BaseDictBackend):
         meta = self.get(self.get_key_for_task(task_id))
         if not meta:
             return {"status": states.PENDING, "result": None}
-        return pickle.loads(str(meta))
+        return self.decode(meta)
+
+    def _get_many_meta(self, task_ids):
+        values = self.mget([self.get_key_for_task(task_id)
+                                for task_id in task_ids])
+        return dict((task_id, value and self.decode(value) or
+                                {"status": states.PENDING, "result": None})
+                        for task_id, value in zip(task_ids, values))
 
     def _restore_taskset(self, taskset_id):
         """Get task metadata for a task by id."""
         meta = self.get(self.get_key_for_taskset(taskset_id))
         if meta:
-            meta = pickle.loads(str(meta))
-            return meta
+            return self.decode(meta)
@@ -37,6 +37,13 @@ class DummyClient(object):
     def set(self, key, value, *args, **kwargs):
         self.cache[key] = value
 
+    def set_multi(self, mapping, *args, **kwargs):
+        self.cache.update(mapping)
+
+    def get_multi(self, keys, *args, **kwargs):
+        return dict((key, self.cache[key])
+                        for key in keys if key in self.cache)
+
     def delete(self, key, *args, **kwargs):
         self.cache.pop(key, None)
 
@@ -77,6 +84,13 @@ class CacheBackend(KeyValueStoreBackend):
     def set(self, key, value):
         return self.client.set(key, value, self.expires)
 
+    def mset(self, mapping):
+        return self.client.set_multi(mapping, self.expires)
+
+    def mget(self, keys):
+        found = self.client.get_multi(keys)
+        return [found.get(key) for key in keys]
+
     def delete(self, key):
         return self.client.delete(key)
 
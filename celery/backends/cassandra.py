@@ -15,7 +15,6 @@ from datetime import datetime
 
 from celery.backends.base import BaseDictBackend
 from celery.exceptions import ImproperlyConfigured
-from celery.serialization import pickle
 from celery import states
 
 
@@ -111,21 +110,39 @@ class CassandraBackend(BaseDictBackend):
         if self._column_family is not None:
             self._column_family = None
 
-    @_retry_on_error
     def _store_result(self, task_id, result, status, traceback=None):
         """Store return value and status of an executed task."""
+        self._store_many([(task_id, result, status, traceback)])
+        return result
+
+    @_retry_on_error
+    def _store_many(self, results):
+        """Store a batch of results using a single batch mutation."""
         cf = self._get_column_family()
-        date_done = datetime.utcnow()
-        index_key = 'celery.results.index!%02x' % (
-                random.randrange(self._index_shards))
-        index_column_name = '%8x!%s' % (time.mktime(date_done.timetuple()),
-                                        task_id)
-        meta = {"status": status,
-                "result": pickle.dumps(result),
-                "date_done": date_done.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                "traceback": pickle.dumps(traceback)}
-        cf.insert(task_id, meta)
-        cf.insert(index_key, {index_column_name: status})
+        timestamp = int(time.time() * 1e6)
+        mutations = {}
+
+        def add(key, columns):
+            mutations.setdefault(key, {}).setdefault(
+                    cf.column_family, []).extend(
+                        C.Mutation(column_or_supercolumn=C.ColumnOrSuperColumn(
+                            column=C.Column(name, value, timestamp)))
+                                for name, value in columns.iteritems())
+
+        for task_id, result, status, traceback in results:
+            date_done = datetime.utcnow()
+            index_key = 'celery.results.index!%02x' % (
+                    random.randrange(self._index_shards))
+            index_column_name = '%8x!%s' % (
+                    time.mktime(date_done.timetuple()), task_id)
+            add(task_id, {"status": status,
+                          "result": self.encode(result),
+                          "date_done": date_done.strftime(
+                                            '%Y-%m-%dT%H:%M:%SZ'),
+                          "traceback": self.encode(traceback)})
+            add(index_key, {index_column_name: status})
+        cf.client.batch_mutate(cf.keyspace, mutations,
+                               cf.write_consistency_level)
 
     @_retry_on_error
     def _get_task_meta_for(self, task_id):
@@ -136,15 +153,15 @@ class CassandraBackend(BaseDictBackend):
             meta = {
                 "task_id": task_id,
                 "status": obj["status"],
-                "result": pickle.loads(str(obj["result"])),
+                "result": self.decode(obj["result"]),
                 "date_done": obj["date_done"],
-                "traceback": pickle.loads(str(obj["traceback"])),
+                "traceback": self.decode(obj["traceback"]),
             }
         except (KeyError, pycassa.NotFoundException):
             meta = {"status": states.PENDING, "result": None}
         return meta
 
-    def cleanup(self):
+    def cleanup(self, batch_size=None, pause=None):
         """Delete expired metadata."""
         self.logger.debug('Running cleanup...')
         expires = datetime.utcnow() - self.result_expires
@@ -169,3 +186,4 @@ class CassandraBackend(BaseDictBackend):
             cf.remove(k)
 
         self.logger.debug('Cleaned %i expired results' % len(task_ids))
+        return len(task_ids)
@@ -1,8 +1,12 @@
+import time
+
 from datetime import datetime
 
+from celery import states
 from celery.backends.base import BaseDictBackend
-from celery.db.models import Task, TaskSet
-from celery.db.session import ResultSession
+from celery.db.models import Task, TaskChunk, TaskSet, ChunkedResult
+from celery.db.models import Pickled
+from celery.db.session import ResultSession, get_engine, upgrade_results
 from celery.exceptions import ImproperlyConfigured
 
 
@@ -16,9 +20,17 @@ def _sqlalchemy_installed():
     return sqlalchemy
 _sqlalchemy_installed()
 
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
 
 class DatabaseBackend(BaseDictBackend):
     """The database result backend."""
+    supports_chunks = True
+
+    #: Number of times to retry storing a result if the row was
+    #: concurrently inserted by another process.
+    max_upsert_retries = 3
 
     def __init__(self, dburi=None, result_expires=None,
             engine_options=None, **kwargs):
@@ -36,22 +48,91 @@ class DatabaseBackend(BaseDictBackend):
     def ResultSession(self):
         return ResultSession(dburi=self.dburi, **self.engine_options)
 
+    def upgrade(self):
+        """Upgrade result tables created by earlier versions of celery,
+        adding any missing indexes.
+
+        See :func:`celery.db.session.upgrade_results`.
+
+        """
+        return upgrade_results(get_engine(self.dburi, **self.engine_options))
+
+    def _upsert(self, session, table, column, key, values):
+        """Update the row where `column` equals `key`, or insert a new
+        row if it does not exist."""
+        updated = session.execute(table.update()
+                                       .where(column == key)
+                                       .values(**values))
+        if not updated.rowcount:
+            session.execute(table.insert().values(values,
+                                                  **{column.name: key}))
+
+    def encode(self, data):
+        # Pickled like the result column, so a payload measured
+        # for chunking can be stored in the column as is.
+        type = Task.__table__.c.result.type
+        return Pickled(type.pickler.dumps(data, type.protocol))
+
+    def decode(self, payload):
+        return Task.__table__.c.result.type.pickler.loads(payload)
+
     def _store_result(self, task_id, result, status, traceback=None):
         """Store return value and status of an executed task."""
+        self._store_many([(task_id, result, status, traceback)])
+        return result
+
+    def _store_many(self, results):
+        """Store a batch of results, and the chunks of the large
+        results, using a single transaction."""
+        table = Task.__table__
+        chunk_table = TaskChunk.__table__
+        rows = []
+        chunk_rows = []
+        for task_id, result, status, traceback in results:
+            payload = None
+            if self.chunk_size and status == states.SUCCESS and \
+                    not isinstance(result, str):
+                # Pickled once, both to measure and to store it.
+                payload = self.encode(result)
+            split = self._split_result(result, status, payload)
+            if split is not None:
+                manifest, chunks = split
+                result = ChunkedResult(manifest)
+                chunk_rows.extend({"task_id": task_id, "chunk": index,
+                                   "data": chunk}
+                                    for index, chunk in enumerate(chunks))
+            elif payload is not None:
+                result = payload
+            rows.append((task_id, result, status, traceback))
+        task_ids = [row[0] for row in rows]
         session = self.ResultSession()
         try:
-            task = session.query(Task).filter(Task.task_id == task_id).first()
-            if not task:
-                task = Task(task_id)
-                session.add(task)
-                session.flush()
-            task.result = result
-            task.status = status
-            task.traceback = traceback
-            session.commit()
+            for retry in xrange(self.max_upsert_retries, -1, -1):
+                try:
+                    # Chunks of any earlier state are replaced.
+                    session.execute(chunk_table.delete().where(
+                                chunk_table.c.task_id.in_(task_ids)))
+                    if chunk_rows:
+                        session.execute(chunk_table.insert(), chunk_rows)
+                    for task_id, result, status, traceback in rows:
+                        self._upsert(session, table, table.c.task_id,
+                                     task_id, {"result": result,
+                                               "status": status,
+                                               "traceback": traceback})
+                    session.commit()
+                    break
+                except IntegrityError:
+                    # A task was inserted by another process since
+                    # we tried to update it, so it'll be updated on retry.
+                    session.rollback()
+                    if not retry:
+                        raise
+                except:
+                    # Don't leave the chunks of a result not stored.
+                    session.rollback()
+                    raise
         finally:
             session.close()
-        return result
 
     def _get_task_meta_for(self, task_id):
         """Get task metadata for a task by id."""
@@ -60,20 +141,36 @@ class DatabaseBackend(BaseDictBackend):
             task = session.query(Task).filter(Task.task_id == task_id).first()
             if not task:
                 task = Task(task_id)
-                session.add(task)
-                session.flush()
-                session.commit()
-            return task.to_dict()
+                task.status = states.PENDING
+            meta = task.to_dict()
+            if isinstance(meta["result"], ChunkedResult):
+                meta["chunks"] = dict(meta["result"])
+                meta["result"] = None
+            return meta
+        finally:
+            session.close()
+
+    def _get_chunk(self, task_id, index):
+        table = TaskChunk.__table__
+        session = self.ResultSession()
+        try:
+            row = session.execute(select([table.c.data])
+                                    .where((table.c.task_id == task_id) &
+                                           (table.c.chunk == index))
+                                    .limit(1)).fetchone()
+            if row is not None:
+                return str(row[0])
         finally:
             session.close()
 
     def _save_taskset(self, taskset_id, result):
         """Store the result of an executed taskset."""
+        table = TaskSet.__table__
         session = self.ResultSession()
         try:
-            taskset = TaskSet(taskset_id, result)
-            session.add(taskset)
-            session.flush()
+            self._upsert(session, table, table.c.taskset_id,
+                         taskset_id, {"result": result,
+                                      "date_done": datetime.now()})
             session.commit()
             return result
         finally:
@@ -95,19 +192,45 @@ class DatabaseBackend(BaseDictBackend):
         session = self.ResultSession()
         try:
             session.query(Task).filter(Task.task_id == task_id).delete()
+            session.query(TaskChunk).filter(
+                    TaskChunk.task_id == task_id).delete()
             session.commit()
         finally:
             session.close()
 
-    def cleanup(self):
-        """Delete expired metadata."""
-        session = self.ResultSession()
-        expires = self.result_expires
-        try:
-            session.query(Task).filter(
-                    Task.date_done < (datetime.now() - expires)).delete()
-            session.query(TaskSet).filter(
-                    TaskSet.date_done < (datetime.now() - expires)).delete()
-            session.commit()
-        finally:
-            session.close()
+    def cleanup(self, batch_size=None, pause=None):
+        """Delete expired metadata.
+
+        Rows are deleted in batches of `batch_size`, with each batch
+        committed separately so the tables are never locked for long.
+        If interrupted the next cleanup continues with the rows left.
+
+        Returns the number of rows deleted.
+
+        """
+        batch_size, pause = self._cleanup_options(batch_size, pause)
+        expires = datetime.now() - self.result_expires
+        return sum(self._cleanup_table(model.__table__, expires,
+                                       batch_size, pause)
+                        for model in (Task, TaskChunk, TaskSet))
+
+    def _cleanup_table(self, table, expires, batch_size, pause):
+        removed = 0
+        while 1:
+            session = self.ResultSession()
+            try:
+                ids = [row[0] for row in session.execute(
+                            select([table.c.id])
+                                .where(table.c.date_done < expires)
+                                .order_by(table.c.id)
+                                .limit(batch_size))]
+                if ids:
+                    session.execute(table.delete()
+                                         .where(table.c.id.in_(ids)))
+                    session.commit()
+            finally:
+                session.close()
+            removed += len(ids)
+            if not batch_size or len(ids) < batch_size:
+                return removed
+            time.sleep(pause)
@@ -1,4 +1,6 @@
 """MongoDB backend for celery."""
+import time
+
 from datetime import datetime
 
 try:
@@ -9,7 +11,7 @@ except ImportError:
 from celery import states
 from celery.backends.base import BaseDictBackend
 from celery.exceptions import ImproperlyConfigured
-from celery.serialization import pickle
+from celery.utils import timeutils
 
 
 class Bunch:
@@ -25,6 +27,9 @@ class MongoBackend(BaseDictBackend):
     mongodb_password = None
     mongodb_database = "celery"
     mongodb_taskmeta_collection = "celery_taskmeta"
+    mongodb_ttl_index = False
+    mongodb_write_concern = {"safe": True}
+    supports_chunks = True
 
     def __init__(self, *args, **kwargs):
         """Initialize MongoDB backend instance.
@@ -33,6 +38,7 @@ class MongoBackend(BaseDictBackend):
             module :mod:`pymongo` is not available.
 
         """
+        super(MongoBackend, self).__init__(*args, **kwargs)
         self.result_expires = kwargs.get("result_expires") or \
                                 self.app.conf.CELERY_TASK_RESULT_EXPIRES
 
@@ -56,10 +62,15 @@ class MongoBackend(BaseDictBackend):
                     "database", self.mongodb_database)
             self.mongodb_taskmeta_collection = config.get(
                 "taskmeta_collection", self.mongodb_taskmeta_collection)
+            self.mongodb_ttl_index = config.get(
+                    "ttl_index", self.mongodb_ttl_index)
+            self.mongodb_write_concern = config.get(
+                    "write_concern", self.mongodb_write_concern)
 
-        super(MongoBackend, self).__init__(*args, **kwargs)
         self._connection = None
         self._database = None
+        self._collection = None
+        self._chunk_collection = None
 
     def _get_connection(self):
         """Connect to the MongoDB server."""
@@ -85,53 +96,152 @@ class MongoBackend(BaseDictBackend):
 
         return self._database
 
+    def _get_collection(self):
+        """Get the task meta collection, creating the index
+        on `date_done` the first time."""
+        if self._collection is None:
+            self._collection = self._ensure_date_index(self._get_database()[
+                                    self.mongodb_taskmeta_collection])
+        return self._collection
+
+    def _get_chunk_collection(self):
+        """Get the collection storing the chunks of large results."""
+        if self._chunk_collection is None:
+            collection = self._get_database()[
+                            self.mongodb_taskmeta_collection + "_chunks"]
+            collection.ensure_index("task_id")
+            self._chunk_collection = self._ensure_date_index(collection)
+        return self._chunk_collection
+
+    def _ensure_date_index(self, collection):
+        """Index `date_done`, used by :meth:`cleanup`, or to expire
+        results if the TTL index is enabled."""
+        options = {}
+        if self.mongodb_ttl_index:
+            options["expireAfterSeconds"] = int(
+                    timeutils.timedelta_seconds(self.result_expires))
+        collection.ensure_index("date_done", **options)
+        return collection
+
     def process_cleanup(self):
         if self._connection is not None:
             # MongoDB connection will be closed automatically when object
             # goes out of scope
             self._connection = None
 
-    def _store_result(self, task_id, result, status, traceback=None):
-        """Store return value and status of an executed task."""
+    def _task_document(self, task_id, result, status, traceback=None):
         from pymongo.binary import Binary
 
+        payload = self.encode(result)
         meta = {"_id": task_id,
                 "status": status,
-                "result": Binary(pickle.dumps(result)),
-                "date_done": datetime.now(),
-                "traceback": Binary(pickle.dumps(traceback))}
-
-        db = self._get_database()
-        taskmeta_collection = db[self.mongodb_taskmeta_collection]
-        taskmeta_collection.save(meta, safe=True)
+                "result": Binary(payload),
+                "date_done": datetime.utcnow(),
+                "traceback": Binary(self.encode(traceback))}
+        chunks = self._chunk_result(task_id, result, status, payload)
+        if chunks:
+            meta.update(result=Binary(self.encode(None)), chunks=chunks)
+        return meta
 
+    def _store_result(self, task_id, result, status, traceback=None):
+        """Store return value and status of an executed task."""
+        self._get_collection().save(
+                self._task_document(task_id, result, status, traceback),
+                **self.mongodb_write_concern)
         return result
 
+    def _store_many(self, results):
+        """Store a batch of results using a single bulk insert.
+
+        Tasks already having a result stored (e.g. the task was marked
+        as started) can't be inserted, so these are saved one by one.
+
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        collection = self._get_collection()
+        documents = [self._task_document(*result) for result in results]
+        existing = set(obj["_id"] for obj in collection.find(
+                        {"_id": {"$in": [doc["_id"] for doc in documents]}},
+                        fields=["_id"]))
+        new = [doc for doc in documents if doc["_id"] not in existing]
+        if new:
+            try:
+                collection.insert(new, **self.mongodb_write_concern)
+            except DuplicateKeyError:
+                # Stored by another process since, saving is idempotent.
+                existing.update(doc["_id"] for doc in new)
+        for document in documents:
+            if document["_id"] in existing:
+                collection.save(document, **self.mongodb_write_concern)
+
     def _get_task_meta_for(self, task_id):
         """Get task metadata for a task by id."""
 
-        db = self._get_database()
-        taskmeta_collection = db[self.mongodb_taskmeta_collection]
-        obj = taskmeta_collection.find_one({"_id": task_id})
+        obj = self._get_collection().find_one({"_id": task_id})
         if not obj:
             return {"status": states.PENDING, "result": None}
 
         meta = {
             "task_id": obj["_id"],
             "status": obj["status"],
-            "result": pickle.loads(str(obj["result"])),
+            "result": self.decode(obj["result"]),
             "date_done": obj["date_done"],
-            "traceback": pickle.loads(str(obj["traceback"])),
+            "traceback": self.decode(obj["traceback"]),
         }
+        if obj.get("chunks"):
+            meta["chunks"] = obj["chunks"]
 
         return meta
 
-    def cleanup(self):
-        """Delete expired metadata."""
-        db = self._get_database()
-        taskmeta_collection = db[self.mongodb_taskmeta_collection]
-        taskmeta_collection.remove({
-                "date_done": {
-                    "$lt": datetime.now() - self.result_expires,
-                 }
-        })
+    def _store_chunks(self, task_id, chunks):
+        from pymongo.binary import Binary
+
+        collection = self._get_chunk_collection()
+        collection.remove({"task_id": task_id}, safe=True)
+        date_done = datetime.utcnow()
+        collection.insert([{"_id": "%s-%d" % (task_id, index),
+                            "task_id": task_id,
+                            "data": Binary(chunk),
+                            "date_done": date_done}
+                                for index, chunk in enumerate(chunks)],
+                          **self.mongodb_write_concern)
+
+    def _get_chunk(self, task_id, index):
+        obj = self._get_chunk_collection().find_one(
+                                {"_id": "%s-%d" % (task_id, index)})
+        if obj:
+            return str(obj["data"])
+
+    def cleanup(self, batch_size=None, pause=None):
+        """Delete expired metadata.
+
+        Results are deleted in batches of `batch_size`, the next
+        cleanup continues with the results left if interrupted.
+        Does nothing if the TTL index is enabled, as MongoDB then
+        expires the results by itself.
+
+        Returns the number of results deleted.
+
+        """
+        if self.mongodb_ttl_index:
+            return 0
+        batch_size, pause = self._cleanup_options(batch_size, pause)
+        expires = datetime.utcnow() - self.result_expires
+        return sum(self._cleanup_collection(collection, expires,
+                                            batch_size, pause)
+                        for collection in (self._get_collection(),
+                                           self._get_chunk_collection()))
+
+    def _cleanup_collection(self, collection, expires, batch_size, pause):
+        removed = 0
+        while 1:
+            ids = [obj["_id"] for obj in collection.find(
+                        {"date_done": {"$lt": expires}},
+                        fields=["_id"], limit=batch_size or 0)]
+            if ids:
+                collection.remove({"_id": {"$in": ids}}, safe=True)
+            removed += len(ids)
+            if not batch_size or len(ids) < batch_size:
+                return removed
+            time.sleep(pause)
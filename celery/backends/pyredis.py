@@ -120,5 +120,16 @@ class RedisBackend(KeyValueStoreBackend):
         if self.expires is not None:
             r.expire(key, self.expires)
 
+    def mset(self, mapping):
+        pipe = self.open().pipeline()
+        for key, value in mapping.iteritems():
+            pipe.set(key, value)
+            if self.expires is not None:
+                pipe.expire(key, self.expires)
+        pipe.execute()
+
+    def mget(self, keys):
+        return self.open().mget(keys)
+
     def delete(self, key):
         self.open().delete(key)
@@ -0,0 +1,151 @@
+"""celery.backends.sqlite"""
+import os
+import threading
+import time
+
+from datetime import timedelta
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from celery.backends.base import KeyValueStoreBackend
+from celery.exceptions import ImproperlyConfigured
+from celery.utils import timeutils
+
+# SQLite refuses statements with more than 999 host parameters.
+MAX_VARIABLES = 900
+
+
+class SQLiteBackend(KeyValueStoreBackend):
+    """Result backend storing results in a local SQLite database.
+
+    Meant for deployments where the workers and the clients reading the
+    results run on the same host, so the results never have to cross the
+    network.  The database is opened in write-ahead logging (WAL) mode,
+    so readers never block writers, and writers in different processes
+    wait for each other for at most :attr:`timeout` seconds.
+
+    Every process and thread uses its own connection, so the backend
+    can be shared by all the pool processes of a worker.
+
+    """
+    table = "celery_results"
+
+    #: Path to the database file
+    #: (default is :setting:`CELERY_RESULT_SQLITE_PATH`).
+    path = None
+
+    #: Max number of seconds to wait for a lock held by another writer
+    #: (default is :setting:`CELERY_RESULT_SQLITE_TIMEOUT`).
+    timeout = None
+
+    def __init__(self, path=None, timeout=None, expires=None, **kwargs):
+        if not sqlite3:
+            raise ImproperlyConfigured(
+                    "The SQLite result backend requires the sqlite3 module "
+                    "(or pysqlite) to be installed.")
+        super(SQLiteBackend, self).__init__(**kwargs)
+        conf = self.app.conf
+        self.path = path or conf.CELERY_RESULT_SQLITE_PATH
+        self.timeout = timeout
+        if self.timeout is None:
+            self.timeout = conf.CELERY_RESULT_SQLITE_TIMEOUT
+        self.expires = expires or conf.CELERY_TASK_RESULT_EXPIRES
+        if isinstance(self.expires, timedelta):
+            self.expires = timeutils.timedelta_seconds(self.expires)
+        self._local = threading.local()
+
+    def open(self):
+        """Get the connection for the current process and thread,
+        creating the database if it does not already exist."""
+        local = self._local
+        # Connections must not be shared with a forked child.
+        if getattr(local, "pid", None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Only fsync at checkpoints, a committed result can only
+        # be lost if the host (not the process) crashes.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS %s (
+                            key TEXT PRIMARY KEY,
+                            value BLOB NOT NULL,
+                            date_done REAL NOT NULL)""" % (self.table, ))
+        conn.execute("""CREATE INDEX IF NOT EXISTS %s_date_done
+                            ON %s (date_done)""" % (self.table, self.table))
+        return conn
+
+    def close(self):
+        """Close the connection used by the current thread."""
+        local = self._local
+        if getattr(local, "pid", None) == os.getpid():
+            local.connection.close()
+        local.connection = local.pid = None
+
+    def get(self, key):
+        row = self.open().execute(
+                "SELECT value FROM %s WHERE key = ?" % (self.table, ),
+                (key, )).fetchone()
+        if row is not None:
+            return str(row[0])
+
+    def mget(self, keys):
+        conn = self.open()
+        found = {}
+        for i in xrange(0, len(keys), MAX_VARIABLES):
+            chunk = keys[i:i + MAX_VARIABLES]
+            found.update(conn.execute(
+                    "SELECT key, value FROM %s WHERE key IN (%s)" % (
+                        self.table, ", ".join("?" * len(chunk))), chunk))
+        return [key in found and str(found[key]) or None for key in keys]
+
+    def set(self, key, value):
+        self.mset({key: value})
+
+    def mset(self, mapping):
+        conn = self.open()
+        now = time.time()
+        # Take the write lock up front, instead of failing with
+        # "database is locked" when upgrading a read lock.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO %s (key, value, date_done) "
+                "VALUES (?, ?, ?)" % (self.table, ),
+                [(key, sqlite3.Binary(value), now)
+                    for key, value in mapping.iteritems()])
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def delete(self, key):
+        self.open().execute("DELETE FROM %s WHERE key = ?" % (self.table, ),
+                            (key, ))
+
+    def cleanup(self, batch_size=None, pause=None):
+        """Delete expired task and taskset results."""
+        if not self.expires:
+            return 0
+        batch_size, pause = self._cleanup_options(batch_size, pause)
+        conn = self.open()
+        expires = time.time() - self.expires
+        deleted = 0
+        while 1:
+            removed = conn.execute(
+                "DELETE FROM %(table)s WHERE key IN ("
+                    "SELECT key FROM %(table)s WHERE date_done < ? "
+                    "LIMIT ?)" % {"table": self.table},
+                (expires, batch_size or -1)).rowcount
+            deleted += removed
+            if not batch_size or removed < batch_size:
+                break
+            time.sleep(pause)
+        return deleted
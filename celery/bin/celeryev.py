@@ -7,9 +7,16 @@ from celery.bin.base import Command, Option
 class EvCommand(Command):
 
     def run(self, dump=False, camera=None, frequency=1.0, maxrate=None,
-            loglevel="INFO", logfile=None, prog_name="celeryev", **kwargs):
+            loglevel="INFO", logfile=None, prog_name="celeryev",
+            record=None, replay=None, speed=None, **kwargs):
         self.prog_name = prog_name
 
+        if replay:
+            return self.run_evreplay(replay, camera=camera, dump=dump,
+                                     speed=speed, freq=frequency,
+                                     maxrate=maxrate)
+        if record:
+            return self.run_evrecord(record)
         if dump:
             return self.run_evdump()
         if camera:
@@ -22,6 +29,16 @@ class EvCommand(Command):
         self.set_process_status("dump")
         return evdump(app=self.app)
 
+    def run_evrecord(self, path):
+        from celery.events.recorder import evrecord
+        self.set_process_status("record")
+        return evrecord(path, app=self.app)
+
+    def run_evreplay(self, path, **kwargs):
+        from celery.events.recorder import evreplay
+        self.set_process_status("replay")
+        return evreplay(path, app=self.app, **kwargs)
+
     def run_evtop(self):
         from celery.events.cursesmon import evtop
         self.set_process_status("top")
@@ -53,6 +70,17 @@ class EvCommand(Command):
             Option('-r', '--maxrate',
                    action="store", dest="maxrate", default=None,
                    help="Recording: Shutter rate limit (e.g. 10/m)"),
+            Option('-w', '--record',
+                   action="store", dest="record", default=None,
+                   help="Record events to file."),
+            Option('--replay',
+                   action="store", dest="replay", default=None,
+                   help="Replay events recorded to file (no broker used). "
+                        "Dumps them with -d, takes snapshots with -c."),
+            Option('--speed',
+                   action="store", dest="speed", type="float", default=None,
+                   help="Replay: Speed relative to the recording "
+                        "(e.g. 1.0). Default is as fast as possible."),
             Option('-l', '--loglevel',
                    action="store", dest="loglevel", default="INFO",
                    help="Loglevel. Default is WARNING."),
@@ -125,3 +125,10 @@ class TaskPool(object):
                 "max-tasks-per-child": self._pool._maxtasksperchild,
                 "put-guarded-by-semaphore": self.putlocks,
                 "timeouts": (self._pool.soft_timeout, self._pool.timeout)}
+
+    @property
+    def num_processes(self):
+        """Number of processes in the pool (changes when autoscaling)."""
+        if self._pool is None:
+            return self.processes
+        return len(self._pool._pool)
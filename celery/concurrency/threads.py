@@ -66,3 +66,8 @@ class TaskPool(object):
             [errback(ret_value) for errback in errbacks]
         else:
             [callback(ret_value) for callback in callbacks]
+
+    @property
+    def num_processes(self):
+        """Number of threads in the pool."""
+        return self.processes
@@ -1,5 +1,6 @@
 from __future__ import generators
 
+import threading
 import time
 import traceback
 
@@ -7,6 +8,7 @@ from itertools import chain
 from UserList import UserList
 from Queue import Queue, Empty as QueueEmpty
 
+from celery.serialization import pickle
 from celery.utils.compat import OrderedDict
 
 
@@ -355,6 +357,166 @@ class LocalCache(OrderedDict):
         super(LocalCache, self).__setitem__(key, value)
 
 
+class LRUCache(object):
+    """Dictionary-like cache with a finite number of keys, where the least
+    recently used items are evicted first.
+
+    :keyword limit: Max number of items.
+    :keyword max_bytes: Max total size of the items in bytes,
+        as measured by `sizeof`.
+    :keyword ttl: Time in seconds an item is kept before it expires.
+    :keyword sizeof: Function returning the size of a value in bytes,
+        the default estimates it by the size of the value pickled.
+        Only used if `max_bytes` is set.
+
+    The number of :attr:`hits`, :attr:`misses`, :attr:`evictions` and
+    :attr:`expirations` are counted, see :meth:`stats`.
+
+    """
+
+    #: Number of lookups that found an item.
+    hits = 0
+
+    #: Number of lookups that did not find an item.
+    misses = 0
+
+    #: Number of items removed to stay within the limits.
+    evictions = 0
+
+    #: Number of items removed because they were too old.
+    expirations = 0
+
+    def __init__(self, limit=None, max_bytes=None, ttl=None, sizeof=None):
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or _pickled_size
+        self.bytes = 0
+        self.data = OrderedDict()
+        self.mutex = threading.Lock()
+
+    def __getitem__(self, key):
+        self.mutex.acquire()
+        try:
+            try:
+                value, expires, size = self.data.pop(key)
+            except KeyError:
+                self.misses += 1
+                raise
+            if self._expired(expires, size):
+                self.misses += 1
+                raise KeyError(key)
+            # Re-insert to mark as most recently used.
+            self.data[key] = value, expires, size
+            self.hits += 1
+            return value
+        finally:
+            self.mutex.release()
+
+    def __setitem__(self, key, value):
+        size = self.max_bytes and self.sizeof(value) or 0
+        expires = self.ttl and time.time() + self.ttl or None
+        self.mutex.acquire()
+        try:
+            if key in self.data:
+                self.bytes -= self.data.pop(key)[2]
+            if self.max_bytes and size > self.max_bytes:
+                return                      # would evict everything else.
+            self.data[key] = value, expires, size
+            self.bytes += size
+            self._evict()
+        finally:
+            self.mutex.release()
+
+    def _expired(self, expires, size):
+        """Returns true if an item expiring at `expires` has expired,
+        in which case the item is to be removed by the caller."""
+        if expires is not None and time.time() > expires:
+            self.bytes -= size
+            self.expirations += 1
+            return True
+        return False
+
+    def __delitem__(self, key):
+        self.mutex.acquire()
+        try:
+            self.bytes -= self.data.pop(key)[2]
+        finally:
+            self.mutex.release()
+
+    def _evict(self):
+        while self.data and (
+                (self.limit and len(self.data) > self.limit) or
+                (self.max_bytes and self.bytes > self.max_bytes)):
+            _, (_, _, size) = self.data.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        self.mutex.acquire()
+        try:
+            try:
+                value, _, size = self.data.pop(key)
+            except KeyError:
+                if default:
+                    return default[0]
+                raise
+            self.bytes -= size
+            return value
+        finally:
+            self.mutex.release()
+
+    def clear(self):
+        self.mutex.acquire()
+        try:
+            self.data.clear()
+            self.bytes = 0
+        finally:
+            self.mutex.release()
+
+    def keys(self):
+        return self.data.keys()
+
+    def __contains__(self, key):
+        self.mutex.acquire()
+        try:
+            try:
+                _, expires, size = self.data[key]
+            except KeyError:
+                return False
+            if self._expired(expires, size):
+                del self.data[key]
+                return False
+            return True
+        finally:
+            self.mutex.release()
+
+    def __len__(self):
+        return len(self.data)
+
+    def stats(self):
+        """Returns a dict with the cache counters and current size."""
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "items": len(self.data),
+                "bytes": self.bytes}
+
+
+def _pickled_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=-1))
+    except Exception:
+        return 0
+
+
 class TokenBucket(object):
     """Token Bucket Algorithm.
 
@@ -22,6 +22,12 @@ a collision.
 from sqlalchemy.types import PickleType as _PickleType
 
 
+class Pickled(str):
+    """A value that has already been pickled, stored as is
+    by :class:`PickleType`."""
+    pass
+
+
 class PickleType(_PickleType):
 
     def bind_processor(self, dialect):
@@ -30,13 +36,13 @@ class PickleType(_PickleType):
         protocol = self.protocol
         if impl_processor:
             def process(value):
-                if value is not None:
+                if value is not None and not isinstance(value, Pickled):
                     value = dumps(value, protocol)
                 return impl_processor(value)
 
         else:
             def process(value):
-                if value is not None:
+                if value is not None and not isinstance(value, Pickled):
                     value = dumps(value, protocol)
                 return value
         return process
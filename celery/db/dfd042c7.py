@@ -8,6 +8,8 @@ for an explanation of this workaround.
 from sqlalchemy.types import PickleType as _PickleType
 from sqlalchemy import util
 
+from celery.db.a805d4bd import Pickled
+
 
 class PickleType(_PickleType):
 
@@ -16,6 +18,8 @@ class PickleType(_PickleType):
         protocol = self.protocol
         if value is None:
             return None
+        if isinstance(value, Pickled):
+            return value
         return dumps(value, protocol)
 
     def process_result_value(self, value, dialect):
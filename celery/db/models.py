@@ -6,9 +6,17 @@ from celery import states
 from celery.db.session import ResultModelBase
 # See docstring of a805d4bd for an explanation for this workaround ;)
 if sa.__version__.startswith('0.5'):
-    from celery.db.dfd042c7 import PickleType
+    from celery.db.dfd042c7 import PickleType, Pickled
+    LargeBinary = sa.Binary
 else:
-    from celery.db.a805d4bd import PickleType
+    from celery.db.a805d4bd import PickleType, Pickled
+    LargeBinary = sa.LargeBinary
+
+
+class ChunkedResult(dict):
+    """Chunk manifest stored in place of a result that has been split
+    into :class:`TaskChunk` rows."""
+    pass
 
 
 class Task(ResultModelBase):
@@ -19,11 +27,11 @@ class Task(ResultModelBase):
     id = sa.Column(sa.Integer, sa.Sequence("task_id_sequence"),
                    primary_key=True,
                    autoincrement=True)
-    task_id = sa.Column(sa.String(255))
+    task_id = sa.Column(sa.String(255), unique=True, index=True)
     status = sa.Column(sa.String(50), default=states.PENDING)
     result = sa.Column(PickleType, nullable=True)
     date_done = sa.Column(sa.DateTime, default=datetime.now,
-                       onupdate=datetime.now, nullable=True)
+                       onupdate=datetime.now, nullable=True, index=True)
     traceback = sa.Column(sa.Text, nullable=True)
 
     def __init__(self, task_id):
@@ -39,6 +47,24 @@ class Task(ResultModelBase):
         return "<Task %s state: %s>" % (self.task_id, self.status)
 
 
+class TaskChunk(ResultModelBase):
+    """Chunk of a large task result."""
+    __tablename__ = "celery_taskchunk"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = sa.Column(sa.Integer, sa.Sequence("taskchunk_id_sequence"),
+                   primary_key=True,
+                   autoincrement=True)
+    task_id = sa.Column(sa.String(255), index=True)
+    chunk = sa.Column(sa.Integer)
+    data = sa.Column(LargeBinary)
+    date_done = sa.Column(sa.DateTime, default=datetime.now,
+                       nullable=True, index=True)
+
+    def __repr__(self):
+        return "<TaskChunk %s #%s>" % (self.task_id, self.chunk)
+
+
 class TaskSet(ResultModelBase):
     """TaskSet result"""
     __tablename__ = "celery_tasksetmeta"
@@ -46,10 +72,10 @@ class TaskSet(ResultModelBase):
 
     id = sa.Column(sa.Integer, sa.Sequence("taskset_id_sequence"),
                 autoincrement=True, primary_key=True)
-    taskset_id = sa.Column(sa.String(255))
+    taskset_id = sa.Column(sa.String(255), unique=True, index=True)
     result = sa.Column(sa.PickleType, nullable=True)
     date_done = sa.Column(sa.DateTime, default=datetime.now,
-                       nullable=True)
+                       nullable=True, index=True)
 
     def __init__(self, taskset_id, result):
         self.taskset_id = taskset_id
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy import func, select
+from sqlalchemy.engine.reflection import Inspector
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -8,6 +10,7 @@ ResultModelBase = declarative_base()
 
 _SETUP = defaultdict(lambda: False)
 _ENGINES = {}
+_SESSIONS = {}
 
 
 def get_engine(dburi, **kwargs):
@@ -18,13 +21,54 @@ def get_engine(dburi, **kwargs):
 
 def create_session(dburi, **kwargs):
     engine = get_engine(dburi, **kwargs)
-    return engine, sessionmaker(bind=engine)
+    if dburi not in _SESSIONS:
+        _SESSIONS[dburi] = sessionmaker(bind=engine)
+    return engine, _SESSIONS[dburi]
 
 
 def setup_results(engine):
-    if not _SETUP["results"]:
+    if not _SETUP[engine]:
         ResultModelBase.metadata.create_all(engine)
-        _SETUP["results"] = True
+        _SETUP[engine] = True
+
+
+def upgrade_results(engine):
+    """Upgrade result tables created by earlier versions.
+
+    Adds the unique indexes on `task_id` and `taskset_id` if they
+    are missing.  Duplicate rows must be removed before the unique
+    index can be created, so for each duplicated id only the most
+    recently inserted row is kept.
+
+    Returns the names of the indexes created.
+
+    """
+    setup_results(engine)
+    inspector = Inspector.from_engine(engine)
+    created = []
+    for table in ResultModelBase.metadata.sorted_tables:
+        existing = set(index["name"]
+                            for index in inspector.get_indexes(table.name))
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                for column in index.columns:
+                    _remove_duplicates(engine, table, column)
+            index.create(bind=engine)
+            created.append(index.name)
+    return created
+
+
+def _remove_duplicates(engine, table, column):
+    """Delete all but the most recent row for every duplicated value
+    of `column`."""
+    duplicates = engine.execute(select([column, func.max(table.c.id)])
+                                    .group_by(column)
+                                    .having(func.count(table.c.id) > 1))
+    for value, latest_id in duplicates.fetchall():
+        engine.execute(table.delete().where(
+            (column == value) & (table.c.id != latest_id)))
 
 
 def ResultSession(dburi, **kwargs):
@@ -1,18 +1,25 @@
 import time
 import socket
 import threading
+import zlib
 
 from collections import deque
+from fnmatch import fnmatch
 from itertools import count
+from random import random
 
 from kombu.entity import Exchange, Queue
 from kombu.messaging import Consumer, Producer
 
 from celery.app import app_or_default
 from celery.utils import gen_unique_id
+from celery.utils.compat import any
 
 event_exchange = Exchange("celeryev", type="topic")
 
+#: Type of the messages containing a batch of events.
+BATCH_TYPE = "batch"
+
 def create_event(type, fields):
     std = {"type": type,
            "timestamp": fields.get("timestamp") or time.time()}
@@ -46,21 +53,53 @@ class EventDispatcher(object):
        while the connection is down. :meth:`flush` must be called
        as soon as the connection is re-established.
 
+    :keyword batch_size: If set, events are not sent right away, but
+        collected and sent in batches of at most this many events.
+    :keyword batch_interval: Max number of seconds an event is kept
+        waiting for the batch to fill up.  Default is 0.1 seconds.
+        Events are only sent by the thread calling :meth:`send`, so a
+        batch waiting longer than this is sent with the next event, or
+        by :meth:`flush_batch`, which should be called regularly by the
+        thread owning the connection.
+
+    :keyword event_types: If set, only events of these types are sent,
+        see :meth:`set_filter`.  Default is the
+        :setting:`CELERY_EVENT_TYPES` setting.
+    :keyword sample_rates: Mapping of event types to the fraction of
+        the events of that type to send, see :meth:`set_filter`.
+        Default is the :setting:`CELERY_EVENT_SAMPLE_RATES` setting.
+
+    Batches are sent as one message for every kind of event in the
+    batch (e.g. `task` or `worker`), with the routing key ``<kind>.batch``,
+    and are unpacked by :class:`EventReceiver`.
+
     You need to :meth:`close` this after use.
 
     """
+    batch_interval = 0.1
 
     def __init__(self, connection=None, hostname=None, enabled=True,
-            channel=None, buffer_while_offline=True, app=None):
+            channel=None, buffer_while_offline=True, app=None,
+            batch_size=None, batch_interval=None, event_types=None,
+            sample_rates=None):
         self.app = app_or_default(app)
         self.connection = connection
         self.channel = channel
         self.hostname = hostname or socket.gethostname()
         self.enabled = enabled
         self.buffer_while_offline = buffer_while_offline
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval or self.batch_interval
         self._lock = threading.Lock()
         self.publisher = None
         self._outbound_buffer = deque()
+        self._batch = []
+        self._batch_started = None
+        conf = self.app.conf
+        if event_types is None:
+            event_types = conf.CELERY_EVENT_TYPES
+        self.set_filter(event_types, sample_rates or
+                                        conf.CELERY_EVENT_SAMPLE_RATES)
 
         if self.enabled:
             self.enable()
@@ -74,44 +113,141 @@ class EventDispatcher(object):
                                   serializer=conf.CELERY_EVENT_SERIALIZER)
 
     def disable(self):
+        self.flush_batch()
         self.enabled = False
         if self.publisher is not None:
             if not self.channel:  # close auto channel.
                 self.publisher.channel.close()
             self.publisher = None
 
+    def set_filter(self, event_types=None, sample_rates=None):
+        """Select the events to send.
+
+        :keyword event_types: List of the types of events to send, which
+            can also be patterns like ``"task-*"``.  If :const:`None`
+            events of all types are sent.
+        :keyword sample_rates: Mapping of event types to the fraction of
+            events of that type to send, e.g. ``{"task-succeeded": 0.1}``
+            sends one in ten `task-succeeded` events.
+
+        Task events are sampled by task id, so the events sent for a
+        task are never a random subset of its events: a task with its
+        `task-succeeded` event sampled has its `task-received` event
+        sent too if that is sampled at the same or a higher rate.
+
+        """
+        self.event_types = event_types and tuple(event_types) or None
+        self.sample_rates = dict(sample_rates or {})
+        self._rates = {}
+
+    def should_send(self, type, uuid=None):
+        """Returns :const:`True` if an event of this type (and for the task
+        with this `uuid`) would be sent.
+
+        Can be used to avoid preparing the fields of events that are
+        filtered out.  The decision is the same as the one made by
+        :meth:`send` for the same event.
+
+        """
+        if not self.enabled:
+            return False
+        try:
+            rate = self._rates[type]
+        except KeyError:
+            rate = self._rates[type] = self._rate_for(type)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        if uuid is not None:
+            return (zlib.crc32(str(uuid)) & 0xffffffff) < rate * 0x100000000
+        return random() < rate
+
+    def _rate_for(self, type):
+        if self.event_types is not None and \
+                not any(fnmatch(type, pattern)
+                            for pattern in self.event_types):
+            return 0.0
+        return float(self.sample_rates.get(type, 1.0))
+
     def send(self, type, **fields):
         """Send event.
 
         :param type: Kind of event.
         :keyword \*\*fields: Event arguments.
 
+        Events filtered out by :meth:`set_filter` are not sent.
+
         """
-        if not self.enabled:
+        if not self.should_send(type, fields.get("uuid")):
             return
 
         self._lock.acquire()
         event = Event(type, hostname=self.hostname, **fields)
         try:
-            try:
-                self.publisher.publish(event,
-                                       routing_key=type.replace("-", "."))
-            except Exception, exc:
-                if not self.buffer_while_offline:
-                    raise
-                self._outbound_buffer.append((event, exc))
+            if self.batch_size:
+                if not self._batch:
+                    self._batch_started = time.time()
+                self._batch.append(event)
+                if len(self._batch) >= self.batch_size or time.time() >= \
+                        self._batch_started + self.batch_interval:
+                    self._send_batch()
+            else:
+                self._publish(event, type.replace("-", "."))
+        finally:
+            self._lock.release()
+
+    def flush_batch(self):
+        """Send the events waiting for the current batch to fill up."""
+        self._lock.acquire()
+        try:
+            if self._batch and self.publisher is not None:
+                self._send_batch()
         finally:
             self._lock.release()
 
     def flush(self):
-        while self._outbound_buffer:
-            event, _ = self._outbound_buffer.popleft()
-            self.publisher.send(event)
+        """Send the events buffered while the connection was down."""
+        self._lock.acquire()
+        try:
+            while self._outbound_buffer:
+                event, routing_key, _ = self._outbound_buffer.popleft()
+                self.publisher.publish(event, routing_key=routing_key)
+        finally:
+            self._lock.release()
 
     def close(self):
         """Close the event dispatcher."""
         self._lock.locked() and self._lock.release()
-        self.publisher and self.publisher.channel.close()
+        try:
+            self.flush_batch()
+        finally:
+            self.publisher and self.publisher.channel.close()
+
+    def _publish(self, event, routing_key):
+        # Must be called with the lock held.
+        try:
+            self.publisher.publish(event, routing_key=routing_key)
+        except Exception, exc:
+            if not self.buffer_while_offline:
+                raise
+            self._outbound_buffer.append((event, routing_key, exc))
+
+    def _send_batch(self):
+        # Must be called with the lock held.
+        batch, self._batch = self._batch, []
+        kinds = []
+        by_kind = {}
+        for event in batch:
+            kind = event["type"].split("-", 1)[0]
+            try:
+                by_kind[kind].append(event)
+            except KeyError:
+                by_kind[kind] = [event]
+                kinds.append(kind)
+        for kind in kinds:
+            self._publish({"type": BATCH_TYPE, "events": by_kind[kind]},
+                          "%s.%s" % (kind, BATCH_TYPE))
 
 
 class EventReceiver(object):
@@ -208,7 +344,12 @@ class EventReceiver(object):
 
     def _receive(self, message_data, message):
         type = message_data.pop("type").lower()
-        self.process(type, create_event(type, message_data))
+        if type == BATCH_TYPE:
+            for fields in message_data["events"]:
+                type = fields.pop("type").lower()
+                self.process(type, create_event(type, fields))
+        else:
+            self.process(type, create_event(type, message_data))
 
 
 
@@ -224,11 +365,17 @@ class Events(object):
                              app=self.app)
 
     def Dispatcher(self, connection=None, hostname=None, enabled=True,
-            channel=None, buffer_while_offline=True):
+            channel=None, buffer_while_offline=True, batch_size=None,
+            batch_interval=None, event_types=None, sample_rates=None):
         return EventDispatcher(connection,
                                hostname=hostname,
                                enabled=enabled,
                                channel=channel,
+                               buffer_while_offline=buffer_while_offline,
+                               batch_size=batch_size,
+                               batch_interval=batch_interval,
+                               event_types=event_types,
+                               sample_rates=sample_rates,
                                app=self.app)
 
     def State(self):
@@ -0,0 +1,307 @@
+import os
+import sys
+import threading
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from kombu.utils import partition
+
+from celery.app import app_or_default
+from celery.datastructures import LocalCache
+from celery.events.metrics import EVENT_STATES
+from celery.events.snapshot import Polaroid
+from celery.exceptions import ImproperlyConfigured
+
+#: Fields of the events stored in columns of their own.
+COLUMNS = ("timestamp", "type", "uuid", "name", "hostname", "state")
+
+#: Columns the events are indexed by, all but uuid ordered by timestamp.
+INDEXES = {"timestamp": "timestamp",
+           "name": "name, timestamp",
+           "hostname": "hostname, timestamp",
+           "state": "state, timestamp",
+           "uuid": "uuid"}
+
+
+class EventArchive(object):
+    """Stores events in a local SQLite database.
+
+    The events are stored in one table for every :attr:`partition_size`
+    seconds, so events older than :attr:`retention` seconds are expired
+    by dropping their tables, and queries by time range only read the
+    tables in range.  The events are inserted in batches, every batch in
+    a single transaction.
+
+    The task name, worker hostname, state and timestamp of the events
+    are stored in indexed columns, and the other fields are pickled.
+    Task events other than `task-received` don't include the name of
+    the task, so it is taken from the last `task-received` event of the
+    task archived.
+
+    """
+
+    #: Path to the database file
+    #: (default is :setting:`CELERY_EVENT_ARCHIVE_PATH`).
+    path = None
+
+    #: Number of seconds of events stored in each table
+    #: (default is :setting:`CELERY_EVENT_ARCHIVE_PARTITION`).
+    partition_size = None
+
+    #: Number of seconds events are kept for
+    #: (default is :setting:`CELERY_EVENT_ARCHIVE_RETENTION`).
+    retention = None
+
+    #: Max number of seconds to wait for a lock held by another writer.
+    timeout = 30.0
+
+    def __init__(self, path=None, partition_size=None, retention=None,
+            app=None):
+        if not sqlite3:
+            raise ImproperlyConfigured(
+                    "The event archive requires the sqlite3 module "
+                    "(or pysqlite) to be installed.")
+        self.app = app_or_default(app)
+        conf = self.app.conf
+        self.path = path or conf.CELERY_EVENT_ARCHIVE_PATH
+        self.partition_size = int(partition_size or
+                                  conf.CELERY_EVENT_ARCHIVE_PARTITION)
+        self.retention = retention or conf.CELERY_EVENT_ARCHIVE_RETENTION
+        self.task_names = LocalCache(0xFFFF)
+        self._partitions = set()
+        self._local = threading.local()
+
+    def open(self):
+        """Get the connection for the current process and thread,
+        creating the database if it does not already exist."""
+        local = self._local
+        # Connections must not be shared with a forked child.
+        if getattr(local, "pid", None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def close(self):
+        """Close the connection used by the current thread."""
+        local = self._local
+        if getattr(local, "pid", None) == os.getpid():
+            local.connection.close()
+        local.connection = local.pid = None
+
+    def partitions(self):
+        """Returns the start times of the partitions in the
+        database, oldest first."""
+        rows = self.open().execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name GLOB 'events_[0-9]*'")
+        return sorted(int(name[len("events_"):]) for name, in rows)
+
+    def _create_partition(self, conn, table):
+        conn.execute("""CREATE TABLE IF NOT EXISTS %s (
+                            timestamp REAL NOT NULL,
+                            type TEXT NOT NULL,
+                            uuid TEXT,
+                            name TEXT,
+                            hostname TEXT,
+                            state TEXT,
+                            fields BLOB NOT NULL)""" % (table, ))
+        for index, columns in INDEXES.iteritems():
+            conn.execute("CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)" % (
+                table, index, table, columns))
+
+    def partition_for(self, timestamp):
+        """Returns the start time of the partition `timestamp`
+        belongs to."""
+        return int(timestamp // self.partition_size) * self.partition_size
+
+    def _row(self, event):
+        fields = dict(event)
+        type = fields.pop("type")
+        timestamp = fields.pop("timestamp", None) or time.time()
+        uuid = fields.pop("uuid", None)
+        name = fields.pop("name", None)
+        if uuid is not None:
+            if name is not None:
+                self.task_names[uuid] = name
+            else:
+                name = self.task_names.get(uuid)
+        group, _, kind = partition(type, "-")
+        state = group == "task" and EVENT_STATES.get(kind) or None
+        return (timestamp, type, uuid, name, fields.pop("hostname", None),
+                state, sqlite3.Binary(pickle.dumps(fields, 2)))
+
+    def store(self, events):
+        """Store a batch of events.  Returns the number of events
+        stored."""
+        if not events:
+            return 0
+        by_partition = {}
+        for event in events:
+            row = self._row(event)
+            start = self.partition_for(row[0])
+            try:
+                by_partition[start].append(row)
+            except KeyError:
+                by_partition[start] = [row]
+
+        conn = self.open()
+        # Take the write lock up front, instead of failing with
+        # "database is locked" when upgrading a read lock.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for start, rows in by_partition.iteritems():
+                table = "events_%d" % (start, )
+                if start not in self._partitions:
+                    self._create_partition(conn, table)
+                    self._partitions.add(start)
+                conn.executemany(
+                    "INSERT INTO %s VALUES (?, ?, ?, ?, ?, ?, ?)" % (
+                        table, ), rows)
+        except:
+            conn.execute("ROLLBACK")
+            # Tables created in the transaction are rolled back too.
+            self._partitions.clear()
+            raise
+        conn.execute("COMMIT")
+        return len(events)
+
+    def query(self, start=None, end=None, name=None, hostname=None,
+            state=None, type=None, uuid=None, limit=None, reverse=False):
+        """Get the archived events matching all of the arguments given.
+
+        :keyword start: Only events sent at or after this time.
+        :keyword end: Only events sent before this time.
+        :keyword name: Only events of tasks with this name.
+        :keyword hostname: Only events sent by this worker.
+        :keyword state: Only events of tasks entering this state.
+        :keyword type: Only events of this type (e.g. `"task-failed"`).
+        :keyword uuid: Only events of the task with this id.
+        :keyword limit: Max number of events to return.
+        :keyword reverse: Return the most recent events first.
+            Default is to return the oldest events first.
+
+        Returns a list of events (dicts).  The `name` field is included
+        in all task events with a known name.
+
+        """
+        where, params = [], []
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("timestamp < ?")
+            params.append(end)
+        for column, value in (("name", name), ("hostname", hostname),
+                              ("state", state), ("type", type),
+                              ("uuid", uuid)):
+            if value is not None:
+                where.append("%s = ?" % (column, ))
+                params.append(value)
+        where = where and "WHERE %s" % (" AND ".join(where), ) or ""
+        order = reverse and "DESC" or "ASC"
+
+        partitions = [p for p in self.partitions()
+                        if (start is None or p + self.partition_size > start)
+                            and (end is None or p < end)]
+        if reverse:
+            partitions.reverse()
+
+        conn = self.open()
+        events = []
+        for p in partitions:
+            remaining = -1                      # no limit
+            if limit is not None:
+                remaining = limit - len(events)
+                if remaining <= 0:
+                    break
+            rows = conn.execute(
+                    "SELECT * FROM events_%d %s ORDER BY timestamp %s "
+                    "LIMIT ?" % (p, where, order), params + [remaining])
+            events.extend(self._event(row) for row in rows)
+        return events
+
+    def _event(self, row):
+        event = pickle.loads(str(row[-1]))
+        for key, value in zip(COLUMNS, row):
+            if value is not None and key != "state":
+                event[key] = value
+        return event
+
+    def expire(self, now=None):
+        """Drop the partitions of events older than :attr:`retention`.
+        Returns the number of partitions dropped."""
+        expires = (now or time.time()) - self.retention
+        conn = self.open()
+        dropped = 0
+        for p in self.partitions():
+            if p + self.partition_size <= expires:
+                conn.execute("DROP TABLE events_%d" % (p, ))
+                self._partitions.discard(p)
+                dropped += 1
+        return dropped
+
+
+class ArchiveCamera(Polaroid):
+    """Camera storing all events received in an :class:`EventArchive`.
+
+    The events received since the last shutter are stored without
+    holding the lock on the state, so events are processed meanwhile,
+    and expired events are dropped at every cleanup.  Events that could
+    not be stored are retried at the next shutter, keeping at most
+    `max_events` events (default is
+    :setting:`CELERY_EVENT_ARCHIVE_MAX_EVENTS`).
+
+    Use it with :program:`celeryev`::
+
+        $ celeryev -c celery.events.archive.ArchiveCamera
+
+    """
+
+    def __init__(self, state, path=None, partition_size=None,
+            retention=None, max_events=None, **kwargs):
+        super(ArchiveCamera, self).__init__(state, **kwargs)
+        self.archive = EventArchive(path, partition_size, retention,
+                                    app=self.app)
+        state.log_events(max_events or
+                         self.app.conf.CELERY_EVENT_ARCHIVE_MAX_EVENTS)
+
+    def capture(self):
+        self.store()
+        super(ArchiveCamera, self).capture()
+
+    def store(self):
+        """Store the events received since they were last stored.
+        Returns the number of events stored."""
+        events = self.state.take_events()
+        try:
+            return self.archive.store(events)
+        except Exception, exc:
+            self.state.return_events(events)
+            if self.logger:
+                self.logger.error("Unable to archive %d events: %r" % (
+                                    len(events), exc),
+                                  exc_info=sys.exc_info())
+            return 0
+
+    def on_cleanup(self):
+        self.archive.expire()
+
+    def cancel(self):
+        super(ArchiveCamera, self).cancel()
+        self.store()
@@ -14,6 +14,18 @@ from celery.utils import abbr, abbrtask
 
 
 class CursesMonitor(object):
+    """Curses monitor displaying the most recent tasks.
+
+    The screen is only redrawn when a key is pressed, or when events
+    have been received and at least :attr:`refresh_interval` seconds
+    have passed since the last redraw, and only the rows that changed
+    are redrawn.  If redrawing is slow (e.g. on a slow terminal), the
+    interval is increased so redrawing takes at most
+    :attr:`max_draw_load` of the time.  The rows shown are copied from
+    the state while holding its lock, so events are processed while
+    the screen is drawn.
+
+    """
     keymap = {}
     win = None
     screen_width = None
@@ -22,6 +34,23 @@ class CursesMonitor(object):
     selected_position = 0
     selected_str = "Selected: "
     limit = 20
+
+    #: Min number of seconds between redraws caused by new events.
+    refresh_interval = 0.5
+
+    #: Max fraction of the time spent redrawing the screen.
+    max_draw_load = 0.1
+
+    #: Redraw at least this often (in seconds), even if there
+    #: are no new events, as workers may have gone offline.
+    idle_refresh = 5.0
+
+    _rows = None            # rows drawn, by line number.
+    _screen_size = None
+    _visible = ()           # ids of the tasks shown.
+    _last_draw = 0
+    _draw_time = 0
+    _drawn_event_count = None
     foreground = curses.COLOR_BLACK
     background = curses.COLOR_WHITE
     online_str = "Workers online: "
@@ -60,10 +89,8 @@ class CursesMonitor(object):
         return row[:mx]
 
     def find_position(self):
-        if not self.tasks:
-            return 0
-        for i, e in enumerate(self.tasks):
-            if self.selected_task == e[0]:
+        for i, uuid in enumerate(self._visible):
+            if self.selected_task == uuid:
                 return i
         return 0
 
@@ -74,27 +101,30 @@ class CursesMonitor(object):
         self.move_selection(1)
 
     def move_selection(self, direction=1):
-        if not self.tasks:
+        if not self._visible:
             return
         pos = self.find_position()
         try:
-            self.selected_task = self.tasks[pos + direction][0]
+            self.selected_task = self._visible[pos + direction]
         except IndexError:
-            self.selected_task = self.tasks[0][0]
+            self.selected_task = self._visible[0]
 
     keyalias = {curses.KEY_DOWN: "J",
                 curses.KEY_UP: "K",
                 curses.KEY_ENTER: "I"}
 
     def handle_keypress(self):
+        """Handle the key pressed, if any.  Returns :const:`True`
+        if a key was pressed."""
         try:
             key = self.win.getkey().upper()
         except:
-            return
+            return False
         key = self.keyalias.get(key) or key
         handler = self.keymap.get(key)
         if handler is not None:
             handler()
+        return True
 
     def alert(self, callback, title=None):
         self.win.erase()
@@ -241,87 +271,145 @@ class CursesMonitor(object):
                 "Task Result for %s" % self.selected_task)
 
     def draw(self):
+        if self.handle_keypress():
+            # The key handler may have drawn over the screen.
+            self._rows = None
+        if self.needs_redraw():
+            time_start = time.time()
+            self.redraw()
+            self._last_draw = time.time()
+            self._draw_time = self._last_draw - time_start
+
+    def needs_redraw(self, now=None):
+        since = (now or time.time()) - self._last_draw
+        if self._rows is None or since >= self.idle_refresh:
+            return True
+        if self.state.event_count == self._drawn_event_count:
+            return False
+        return since >= max(self.refresh_interval,
+                            self._draw_time / self.max_draw_load)
+
+    def collect(self, limit):
+        """Copy what is shown on the screen from the state.
+        Called with the state locked."""
+        now = time.time()
+        rows = []
+        for uuid, task in self.state.tasks_by_timestamp(limit):
+            if task.uuid:
+                rows.append((uuid, task.name,
+                             task.worker and task.worker.hostname,
+                             task.timestamp, task.state))
+                if task.ready:
+                    task.visited = now
+        selection = None
+        if self.selected_task:
+            try:
+                task = self.state.tasks[self.selected_task]
+            except KeyError:
+                pass
+            else:
+                selection = task.info(["args", "kwargs",
+                                       "result", "runtime", "eta"])
+        workers = self.state.workers.values()
+        return {"rows": rows,
+                "selection": selection,
+                "workers": [w.hostname for w in workers if w.alive],
+                "worker_count": len(workers),
+                "event_count": self.state.event_count,
+                "task_count": self.state.task_count}
+
+    def addline(self, y, x, text, attr=curses.A_NORMAL):
+        """Write `text` at `y, x`, clearing the rest of the line
+        (up to the border)."""
+        my, mx = self.win.getmaxyx()
+        self.win.addstr(y, x, text[:mx - x - 1].ljust(mx - x - 1), attr)
+
+    def redraw(self):
         win = self.win
-        self.handle_keypress()
         x = 3
-        y = blank_line = count(2).next
         my, mx = win.getmaxyx()
-        win.erase()
-        win.bkgd(" ", curses.color_pair(1))
-        win.border()
-        win.addstr(1, x, self.greet, curses.A_DIM | curses.color_pair(5))
-        blank_line()
-        win.addstr(y(), x, self.format_row("UUID", "TASK",
-                                           "WORKER", "TIME", "STATE"),
-                curses.A_BOLD | curses.A_UNDERLINE)
-        tasks = self.tasks
-        if tasks:
-            for uuid, task in tasks:
-                if task.uuid:
-                    state_color = self.state_colors.get(task.state)
-                    attr = curses.A_NORMAL
-                    if task.uuid == self.selected_task:
-                        attr = curses.A_STANDOUT
-                    timestamp = datetime.fromtimestamp(
-                                    task.timestamp or time.time())
-                    timef = timestamp.strftime("%H:%M:%S")
-                    line = self.format_row(uuid, task.name,
-                                           task.worker.hostname,
-                                           timef, task.state)
-                    lineno = y()
-                    win.addstr(lineno, x, line, attr)
-                    if state_color:
-                        win.addstr(lineno, len(line) - len(task.state) + 1,
-                                task.state, state_color | attr)
-                    if task.ready:
-                        task.visited = time.time()
+        limit = max(0, min(self.limit, my - 10))
+        view = self.state.freeze_while(self.collect, limit)
+        self._drawn_event_count = view["event_count"]
+
+        if self._rows is None or self._screen_size != (my, mx):
+            win.erase()
+            win.bkgd(" ", curses.color_pair(1))
+            win.border()
+            win.addstr(1, x, self.greet, curses.A_DIM | curses.color_pair(5))
+            win.addstr(3, x, self.format_row("UUID", "TASK",
+                                             "WORKER", "TIME", "STATE"),
+                    curses.A_BOLD | curses.A_UNDERLINE)
+            win.hline(my - 6, x, curses.ACS_HLINE, self.screen_width)
+            win.addstr(my - 2, x, self.help_title, curses.A_BOLD)
+            win.addstr(my - 2, x + len(self.help_title), self.help,
+                       curses.A_DIM)
+            self._rows = {}
+            self._screen_size = (my, mx)
+
+        # -- Tasks: only rows that changed are redrawn.
+        rows = view["rows"]
+        self._visible = [row[0] for row in rows]
+        for i in xrange(limit):
+            lineno = 4 + i
+            try:
+                row = rows[i]
+            except IndexError:
+                row = None
+            else:
+                row = row + (row[0] == self.selected_task, )
+            if self._rows.get(lineno) == row:
+                continue
+            self._rows[lineno] = row
+            if row is None:
+                self.addline(lineno, x, "")
+                continue
+            uuid, name, hostname, timestamp, state, selected = row
+            attr = curses.A_NORMAL
+            if selected:
+                attr = curses.A_STANDOUT
+            timef = datetime.fromtimestamp(
+                        timestamp or time.time()).strftime("%H:%M:%S")
+            line = self.format_row(uuid, name, hostname, timef, state)
+            self.addline(lineno, x, line, attr)
+            state_color = self.state_colors.get(state)
+            if state_color:
+                win.addstr(lineno, len(line) - len(state) + 1,
+                           state, state_color | attr)
 
         # -- Footer
-        blank_line()
-        win.hline(my - 6, x, curses.ACS_HLINE, self.screen_width)
-
         # Selected Task Info
         if self.selected_task:
             win.addstr(my - 5, x, self.selected_str, curses.A_BOLD)
-            info = "Missing extended info"
-            try:
-                selection = self.state.tasks[self.selected_task]
-            except KeyError:
-                pass
+            info = view["selection"]
+            if info is None:
+                info = "Missing extended info"
             else:
-                info = selection.info(["args", "kwargs",
-                                       "result", "runtime", "eta"])
                 if "runtime" in info:
                     info["runtime"] = "%.2fs" % info["runtime"]
                 if "result" in info:
                     info["result"] = abbr(info["result"], 16)
                 info = " ".join("%s=%s" % (key, value)
                             for key, value in info.items())
-            win.addstr(my - 5, x + len(self.selected_str), info)
+            self.addline(my - 5, x + len(self.selected_str), info)
         else:
-            win.addstr(my - 5, x, "No task selected", curses.A_NORMAL)
+            self.addline(my - 5, x, "No task selected")
 
         # Workers
-        if self.workers:
+        if view["workers"]:
             win.addstr(my - 4, x, self.online_str, curses.A_BOLD)
-            win.addstr(my - 4, x + len(self.online_str),
-                    ", ".join(sorted(self.workers)), curses.A_NORMAL)
+            self.addline(my - 4, x + len(self.online_str),
+                         ", ".join(sorted(view["workers"])))
         else:
-            win.addstr(my - 4, x, "No workers discovered.")
+            self.addline(my - 4, x, "No workers discovered.")
 
         # Info
         win.addstr(my - 3, x, self.info_str, curses.A_BOLD)
-        win.addstr(my - 3, x + len(self.info_str),
+        self.addline(my - 3, x + len(self.info_str),
                 "events:%s tasks:%s workers:%s/%s" % (
-                    self.state.event_count, self.state.task_count,
-                    len([w for w in self.state.workers.values()
-                            if w.alive]),
-                    len(self.state.workers)),
+                    view["event_count"], view["task_count"],
+                    len(view["workers"]), view["worker_count"]),
                 curses.A_DIM)
-
-        # Help
-        win.addstr(my - 2, x, self.help_title, curses.A_BOLD)
-        win.addstr(my - 2, x + len(self.help_title), self.help, curses.A_DIM)
         win.refresh()
 
     def init_screen(self):
@@ -360,7 +448,7 @@ class CursesMonitor(object):
 
     @property
     def tasks(self):
-        return self.state.tasks_by_timestamp()[:self.limit]
+        return self.state.tasks_by_timestamp(self.limit)
 
     @property
     def workers(self):
@@ -0,0 +1,226 @@
+import math
+import time
+
+from collections import deque
+
+from celery import states
+
+#: Sliding windows (in seconds) success and failure rates are
+#: reported for.
+WINDOWS = (60, 300, 900)
+
+#: The task state each task event type records.
+EVENT_STATES = {"sent": states.PENDING,
+                "received": states.RECEIVED,
+                "started": states.STARTED,
+                "succeeded": states.SUCCESS,
+                "failed": states.FAILURE,
+                "retried": states.RETRY,
+                "revoked": states.REVOKED}
+
+
+class RuntimeSketch(object):
+    """Sketch of a distribution of runtimes.
+
+    Values are counted in buckets with logarithmically growing
+    boundaries, so any quantile is estimated within `accuracy` relative
+    error using a number of buckets logarithmic to the range of the
+    values, and two sketches with the same accuracy are merged by
+    adding their bucket counts.
+
+    """
+
+    #: Values below this are counted as zero.
+    min_value = 1e-9
+
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value < self.min_value:
+            self.zero += 1
+        else:
+            key = int(math.ceil(math.log(value) / self._log_gamma))
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add the values counted by `other` to this sketch."""
+        if other.accuracy != self.accuracy:
+            raise ValueError("Can't merge sketches of different accuracy")
+        for key, count in other.buckets.iteritems():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        for value in other.min, other.max:
+            if value is not None:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+
+    def quantile(self, q):
+        """Estimate the value below which a fraction `q` of the
+        values are, or :const:`None` if there are no values."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # The middle of the bucket has the least relative error.
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return max(self.min, min(value, self.max))
+        return self.max
+
+    def info(self):
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count,
+                "mean": self.sum / self.count,
+                "min": self.min,
+                "max": self.max,
+                "p50": self.quantile(0.5),
+                "p90": self.quantile(0.9),
+                "p99": self.quantile(0.99)}
+
+
+class WindowCounter(object):
+    """Counts of successes and failures over a sliding window.
+
+    The counts are kept in buckets of `resolution` seconds, so the
+    memory used is bounded by `window / resolution` buckets.
+    Events older than the newest bucket are counted in the newest
+    bucket.
+
+    """
+
+    def __init__(self, window=max(WINDOWS), resolution=5):
+        self.window = window
+        self.resolution = resolution
+        self.buckets = deque()          # [start, succeeded, failed]
+
+    def add(self, timestamp, failed=False):
+        start = int(timestamp // self.resolution) * self.resolution
+        buckets = self.buckets
+        if not buckets or buckets[-1][0] < start:
+            buckets.append([start, 0, 0])
+            while buckets[0][0] <= start - self.window:
+                buckets.popleft()
+        buckets[-1][failed and 2 or 1] += 1
+
+    def counts(self, window, now=None):
+        """Returns the number of successes and failures in the last
+        `window` seconds as a tuple."""
+        since = (now or time.time()) - window
+        succeeded = failed = 0
+        for start, s, f in reversed(self.buckets):
+            if start + self.resolution <= since:
+                break
+            succeeded += s
+            failed += f
+        return succeeded, failed
+
+    def rates(self, windows=WINDOWS, now=None):
+        """Returns the successes and failures per second, and the
+        fraction of tasks that failed, for every window."""
+        now = now or time.time()
+        rates = {}
+        for window in windows:
+            succeeded, failed = self.counts(window, now)
+            ready = succeeded + failed
+            rates[window] = {"succeeded": float(succeeded) / window,
+                             "failed": float(failed) / window,
+                             "failure_ratio": ready and
+                                    float(failed) / ready or 0.0}
+        return rates
+
+
+class Aggregate(object):
+    """Metrics of a group of tasks, e.g. all tasks of a type.
+
+    :attr:`counts` is the number of events seen for every task state,
+    :attr:`window` counts the successes and failures over the last
+    :attr:`windows` and :attr:`runtime` sketches the runtime of the
+    tasks that succeeded.
+
+    """
+    windows = WINDOWS
+
+    def __init__(self, windows=None, accuracy=0.01):
+        self.windows = windows or self.windows
+        self.counts = {}
+        self.window = WindowCounter(max(self.windows))
+        self.runtime = RuntimeSketch(accuracy)
+
+    def on_event(self, type, timestamp=None, runtime=None):
+        state = EVENT_STATES.get(type)
+        if state is None:
+            return
+        self.counts[state] = self.counts.get(state, 0) + 1
+        if state in (states.SUCCESS, states.FAILURE) and timestamp:
+            self.window.add(timestamp, failed=state == states.FAILURE)
+        if runtime is not None:
+            self.runtime.add(runtime)
+
+    def info(self, now=None):
+        return {"counts": dict(self.counts),
+                "rates": self.window.rates(self.windows, now),
+                "runtime": self.runtime.info()}
+
+
+class Metrics(object):
+    """Aggregates of all tasks, and by task type and worker."""
+
+    def __init__(self, windows=None, accuracy=0.01):
+        self.windows = windows
+        self.accuracy = accuracy
+        self.clear()
+
+    def clear(self):
+        self.total = self.Aggregate()
+        self.by_type = {}
+        self.by_worker = {}
+
+    def Aggregate(self):
+        return Aggregate(self.windows, self.accuracy)
+
+    def on_task_event(self, type, name=None, hostname=None,
+            timestamp=None, runtime=None):
+        aggregates = [self.total]
+        for group, key in ((self.by_type, name),
+                           (self.by_worker, hostname)):
+            if key is not None:
+                try:
+                    aggregates.append(group[key])
+                except KeyError:
+                    aggregate = group[key] = self.Aggregate()
+                    aggregates.append(aggregate)
+        for aggregate in aggregates:
+            aggregate.on_event(type, timestamp, runtime)
+
+    def info(self, now=None):
+        now = now or time.time()
+        return {"total": self.total.info(now),
+                "types": dict((name, aggregate.info(now))
+                        for name, aggregate in self.by_type.iteritems()),
+                "workers": dict((hostname, aggregate.info(now))
+                        for hostname, aggregate in
+                            self.by_worker.iteritems())}
@@ -0,0 +1,189 @@
+import struct
+import sys
+import time
+import zlib
+
+from cStringIO import StringIO
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from celery import platforms
+from celery.app import app_or_default
+from celery.utils import instantiate
+
+#: Header of every block: the size of the compressed block.
+BLOCK_HEADER = ">I"
+BLOCK_HEADER_SIZE = struct.calcsize(BLOCK_HEADER)
+
+
+class Recorder(object):
+    """Appends events to a recording file.
+
+    Events are written in blocks of up to `block_size` events, every
+    block compressed on its own, so the file is compact and can be
+    appended to by later recordings.  A block is also written when an
+    event arrives more than `flush_interval` seconds after the first
+    event of the block.  If the recorder is killed, only the events
+    of the last (unwritten) block are lost.
+
+    """
+    block_size = 1000
+    flush_interval = 1.0
+
+    def __init__(self, path, block_size=None, flush_interval=None):
+        self.path = path
+        self.block_size = block_size or self.block_size
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        self.file = open(path, "ab")
+        self.event_count = 0
+        self._buffer = StringIO()
+        self._pickler = None
+        self._pending = 0
+        self._first_pending = None
+
+    def on_event(self, event):
+        if self._pickler is None:
+            self._pickler = pickle.Pickler(self._buffer, 2)
+            self._first_pending = time.time()
+        self._pickler.dump(event)
+        self._pickler.clear_memo()
+        self._pending += 1
+        self.event_count += 1
+        if self._pending >= self.block_size or \
+                time.time() - self._first_pending >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the events buffered to the file."""
+        if self._pending:
+            block = zlib.compress(self._buffer.getvalue())
+            self.file.write(struct.pack(BLOCK_HEADER, len(block)) + block)
+            self.file.flush()
+            self._buffer = StringIO()
+            self._pickler = None
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def _read_block(fh):
+    header = fh.read(BLOCK_HEADER_SIZE)
+    if len(header) == BLOCK_HEADER_SIZE:
+        size, = struct.unpack(BLOCK_HEADER, header)
+        block = fh.read(size)
+        if len(block) == size:
+            return zlib.decompress(block)
+
+
+def read_events(path):
+    """Iterate over the events in a recording file.
+
+    A block cut short at the end of the file (e.g. because the
+    recorder was killed while writing it) is ignored.
+
+    """
+    fh = open(path, "rb")
+    while 1:
+        block = _read_block(fh)
+        if block is None:
+            break
+        unpickler = pickle.Unpickler(StringIO(block))
+        while 1:
+            try:
+                event = unpickler.load()
+            except EOFError:
+                break
+            yield event
+    fh.close()
+
+
+def replay(path, handler, speed=None):
+    """Feed the events in a recording to `handler`.
+
+    :keyword speed: If set, the events are replayed at `speed` times
+        the rate they were recorded at (e.g. ``1.0`` for the original
+        rate), otherwise they are replayed as fast as possible.
+
+    Returns the number of events replayed.
+
+    """
+    count = 0
+    first = started = None
+    for event in read_events(path):
+        if speed:
+            timestamp = event.get("timestamp")
+            if timestamp is not None:
+                if first is None:
+                    first, started = timestamp, time.time()
+                delay = started + (timestamp - first) / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+        handler(event)
+        count += 1
+    return count
+
+
+def install_recorder_term_handler():
+    """Stop recording on SIGTERM, so the recorder is closed and the
+    buffered events are written."""
+
+    def _stop(signum, frame):
+        raise SystemExit()
+
+    platforms.install_signal_handler("SIGTERM", _stop)
+
+
+def evrecord(path, app=None):
+    sys.stderr.write("-> evrecord: recording events to %s...\n" % (path, ))
+    app = app_or_default(app)
+    recorder = Recorder(path)
+    install_recorder_term_handler()
+    conn = app.broker_connection()
+    recv = app.events.Receiver(conn, handlers={"*": recorder.on_event})
+    try:
+        try:
+            recv.capture(limit=None)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+    finally:
+        recorder.close()
+        conn.close()
+        sys.stderr.write("-> evrecord: %d events recorded.\n" % (
+            recorder.event_count, ))
+
+
+def evreplay(path, camera=None, dump=False, speed=None, freq=1.0,
+        maxrate=None, app=None):
+    """Replay a recording into a state (and `camera` taking snapshots
+    of it), or to the event dumper, and report the rate of events
+    processed."""
+    app = app_or_default(app)
+    cam = None
+    if dump:
+        from celery.events.dumper import Dumper
+        handler = Dumper().on_event
+    else:
+        state = app.events.State()
+        handler = state.event
+        if camera:
+            cam = instantiate(camera, state, app=app,
+                              freq=freq, maxrate=maxrate)
+            cam.install()
+    time_start = time.time()
+    try:
+        count = replay(path, handler, speed=speed)
+        if cam is not None:
+            cam.capture()
+    finally:
+        if cam is not None:
+            cam.cancel()
+    elapsed = time.time() - time_start
+    sys.stderr.write("-> evreplay: %d events in %.3fs (%.1f events/s)\n" % (
+        count, elapsed, count / (elapsed or 1e-9)))
+    return count
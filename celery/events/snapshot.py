@@ -12,7 +12,13 @@ class Polaroid(object):
     cleanup_signal = Signal()
     clear_after = False
 
+    #: If set, the camera is given a :class:`~celery.events.state.Snapshot`
+    #: of the workers and tasks changed since the last shutter, instead of
+    #: the state itself, so events are processed while the camera runs.
+    incremental = False
+
     _tref = None
+    _ctref = None
 
     def __init__(self, state, freq=1.0, maxrate=None,
             cleanup_freq=3600.0, logger=None, app=None):
@@ -45,15 +51,35 @@ class Polaroid(object):
         if self.logger:
             self.logger.debug(msg)
 
-    def shutter(self):
+    def shutter(self, state=None):
+        if state is None:
+            state = self.state
         if self.maxrate is None or self.maxrate.can_consume():
-            self.debug("Shutter: %s" % (self.state, ))
-            self.shutter_signal.send(self.state)
-            self.on_shutter(self.state)
+            self._shutter(state)
+
+    def _shutter(self, state):
+        self.debug("Shutter: %s" % (state, ))
+        self.shutter_signal.send(state)
+        self.on_shutter(state)
 
     def capture(self):
+        if self.incremental:
+            return self._capture_incremental()
         self.state.freeze_while(self.shutter, clear_after=self.clear_after)
 
+    def _capture_incremental(self):
+        # Taking a snapshot resets the changes, so only take it
+        # if the shutter is not rate limited.
+        if self.maxrate is not None and not self.maxrate.can_consume():
+            return
+        snapshot = self.state.snapshot(clear_after=self.clear_after)
+        try:
+            self._shutter(snapshot)
+        except:
+            # The changes are in the next snapshot instead.
+            self.state.restore_snapshot(snapshot)
+            raise
+
     def cancel(self):
         if self._tref:
             self._tref()
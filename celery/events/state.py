@@ -1,33 +1,134 @@
 import time
 import heapq
 
+from collections import deque
+from itertools import islice
 from threading import Lock
 
 from kombu.utils import partition
 
 from celery import states
-from celery.datastructures import AttributeDict, LocalCache
+from celery.datastructures import LocalCache
+from celery.events.metrics import Metrics
 from celery.utils import kwdict
 
 HEARTBEAT_EXPIRE = 150                      # 2 minutes, 30 seconds
 
 
-class Element(AttributeDict):
-    """Base class for types."""
-    visited = False
+class Element(object):
+    """Base class for types.
+
+    The fields listed in :attr:`_defaults` are stored in slots, so
+    a record takes a fraction of the memory of a dict.  Other fields
+    are kept in a dict created the first time one is set.
+
+    Fields can be read as attributes or items, and missing fields
+    have their value in :attr:`_defaults`.
+
+    """
+    __slots__ = ("_extra", )
+
+    #: Fields stored in slots, and their default values.
+    _defaults = {}
 
     def __init__(self, **fields):
-        dict.__init__(self, fields)
+        for key, value in fields.iteritems():
+            setattr(self, key, value)
+
+    def __getattr__(self, key):
+        # Only called if the field has not been set.
+        try:
+            return self._defaults[key]
+        except KeyError:
+            if key != "_extra":
+                try:
+                    return self._extra[key]
+                except (AttributeError, KeyError):
+                    pass
+        raise AttributeError("'%s' object has no attribute '%s'" % (
+                self.__class__.__name__, key))
+
+    def __setattr__(self, key, value):
+        try:
+            object.__setattr__(self, key, value)
+        except AttributeError:
+            try:
+                self._extra[key] = value
+            except AttributeError:
+                object.__setattr__(self, "_extra", {key: value})
+
+    def update(self, fields):
+        for key, value in fields.iteritems():
+            setattr(self, key, value)
+
+    def keys(self):
+        try:
+            extra = self._extra.keys()
+        except AttributeError:
+            extra = []
+        return self._defaults.keys() + extra
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._defaults or key in getattr(self, "_extra", ())
+
+    def copy(self):
+        """Returns a shallow copy of the record."""
+        other = object.__new__(self.__class__)
+        for key, value in self.items():
+            setattr(other, key, value)
+        return other
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state):
+        Element.update(self, state)     # Task.update takes a state.
 
 
 class Worker(Element):
-    """Worker State."""
+    """Worker State.
+
+    If the worker sends its load with the heartbeats (see
+    :setting:`CELERYD_HEARTBEAT_STATS`), the fields in :attr:`load_fields`
+    are the values sent with the last heartbeat.
+
+    """
     heartbeat_max = 4
 
+    #: Load summary fields sent with heartbeats.
+    load_fields = ("active", "reserved", "pool", "loadavg", "processed")
+
+    _defaults = dict(hostname=None,
+                     heartbeats=None,
+                     visited=False,
+                     active=None,
+                     reserved=None,
+                     pool=None,
+                     loadavg=None,
+                     processed=None)
+    __slots__ = tuple(_defaults)
+
     def __init__(self, **fields):
         super(Worker, self).__init__(**fields)
         self.heartbeats = []
 
+    def copy(self):
+        other = super(Worker, self).copy()
+        other.heartbeats = list(self.heartbeats)
+        return other
+
     def on_online(self, timestamp=None, **kwargs):
         self._heartpush(timestamp)
 
@@ -36,6 +137,16 @@ class Worker(Element):
 
     def on_heartbeat(self, timestamp=None, **kwargs):
         self._heartpush(timestamp)
+        for key in self.load_fields:
+            if key in kwargs:
+                setattr(self, key, kwargs[key])
+
+    @property
+    def load(self):
+        """The load summary sent with the last heartbeat, or an empty
+        dict if the worker does not send its load."""
+        return dict((key, getattr(self, key)) for key in self.load_fields
+                        if getattr(self, key) is not None)
 
     def _heartpush(self, timestamp):
         if timestamp:
@@ -82,10 +193,9 @@ class Task(Element):
                      exception=None,
                      timestamp=None,
                      runtime=None,
-                     traceback=None)
-
-    def __init__(self, **fields):
-        super(Task, self).__init__(**dict(self._defaults, **fields))
+                     traceback=None,
+                     visited=False)
+    __slots__ = tuple(_defaults)
 
     def info(self, fields=None, extra=[]):
         if fields is None:
@@ -148,11 +258,110 @@ class Task(Element):
         return self.state in states.READY_STATES
 
 
+class _Node(object):
+    __slots__ = ("prev", "next", "key", "timestamp")
+
+
+class TaskIndex(object):
+    """Set of task ids ordered by timestamp.
+
+    Events mostly arrive in order, so a task is inserted by walking
+    back from the newest task until a task with an older timestamp is
+    found, which is O(1) for tasks updated in order.  Iterating over the
+    tasks newest first (using :func:`reversed`) costs O(1) per task.
+
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._root = root = _Node()
+        root.prev = root.next = root
+        root.key = root.timestamp = None
+
+    def add(self, key, timestamp):
+        """Add `key`, or move it if its timestamp has changed."""
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = _Node()
+            node.key = key
+        elif node.timestamp == timestamp:
+            return
+        else:
+            self._unlink(node)
+        node.timestamp = timestamp
+        root = self._root
+        if timestamp is None:
+            # Tasks without a timestamp are older than any other task.
+            after = root
+        else:
+            after = root.prev
+            while after is not root and after.timestamp > timestamp:
+                after = after.prev
+        node.prev, node.next = after, after.next
+        after.next.prev = node
+        after.next = node
+
+    def discard(self, key):
+        node = self._nodes.pop(key, None)
+        if node is not None:
+            self._unlink(node)
+
+    def _unlink(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        root = self._root
+        node = root.next
+        while node is not root:
+            yield node.key
+            node = node.next
+
+    def __reversed__(self):
+        root = self._root
+        node = root.prev
+        while node is not root:
+            yield node.key
+            node = node.prev
+
+
 class State(object):
-    """Records clusters state."""
+    """Records clusters state.
+
+    Tasks are indexed by time, type, worker and state, so listing
+    the latest tasks of any of these costs O(number of tasks listed)
+    and not O(number of tasks in memory).
+
+    Aggregate metrics of the tasks (see :meth:`metrics`) are updated
+    as the events arrive, and are kept when the state is cleared.
+
+    """
     event_count = 0
     task_count = 0
 
+    #: Events received since they were last taken, if enabled
+    #: by :meth:`log_events`.
+    event_log = None
+
+    #: Max number of events kept by :meth:`log_events`, when there are
+    #: more the oldest events are dropped.
+    max_logged_events = None
+
+    #: Number of logged events dropped.
+    dropped_events = 0
+
+    # Ids of the tasks and hostnames of the workers changed since the
+    # last snapshot, tracked from the first snapshot on.
+    _changed_tasks = None
+    _changed_workers = None
+    _snapshot_counts = (0, 0)
+
     def __init__(self, callback=None,
             max_workers_in_memory=5000, max_tasks_in_memory=10000):
         self.workers = LocalCache(max_workers_in_memory)
@@ -161,6 +370,14 @@ class State(object):
         self.group_handlers = {"worker": self.worker_event,
                                "task": self.task_event}
         self._mutex = Lock()
+        self._reset_indexes()
+        self._metrics = Metrics()
+
+    def _reset_indexes(self):
+        self._by_time = TaskIndex()
+        self._by_name = {}
+        self._by_worker = {}
+        self._by_state = {}
 
     def freeze_while(self, fun, *args, **kwargs):
         clear_after = kwargs.pop("clear_after", False)
@@ -181,17 +398,19 @@ class State(object):
 
     def _clear_tasks(self, ready=True):
         if ready:
-            self.tasks = dict((uuid, task)
-                                for uuid, task in self.tasks.items()
-                                    if task.state not in states.READY_STATES)
+            for state in states.READY_STATES:
+                for uuid in list(self._by_state.get(state, ())):
+                    self._unindex(uuid, self.tasks.pop(uuid))
         else:
             self.tasks.clear()
+            self._reset_indexes()
 
     def _clear(self, ready=True):
         self.workers.clear()
         self._clear_tasks(ready)
         self.event_count = 0
         self.task_count = 0
+        self._snapshot_counts = (0, 0)
 
     def clear(self, ready=True):
         self._mutex.acquire()
@@ -215,13 +434,19 @@ class State(object):
         try:
             return self.tasks[uuid]
         except KeyError:
-            task = self.tasks[uuid] = Task(uuid=uuid)
+            tasks = self.tasks
+            while tasks.limit and len(tasks) >= tasks.limit:
+                self._unindex(*tasks.popitem(last=False))
+            task = tasks[uuid] = Task(uuid=uuid)
+            self._reindex(uuid, task)
             return task
 
     def worker_event(self, type, fields):
         """Process worker event."""
         hostname = fields.pop("hostname", None)
         if hostname:
+            if self._changed_workers is not None:
+                self._changed_workers.add(hostname)
             worker = self.get_or_create_worker(hostname)
             handler = getattr(worker, "on_%s" % type, None)
             if handler:
@@ -231,14 +456,56 @@ class State(object):
         """Process task event."""
         uuid = fields.pop("uuid")
         hostname = fields.pop("hostname")
+        if self._changed_tasks is not None:
+            self._changed_tasks.add(uuid)
+            self._changed_workers.add(hostname)
         worker = self.get_or_create_worker(hostname)
         task = self.get_or_create_task(uuid)
+        previous = self._index_keys(task)
         handler = getattr(task, "on_%s" % type, None)
         if type == "received":
             self.task_count += 1
         if handler:
             handler(**fields)
         task.worker = worker
+        self._reindex(uuid, task, previous)
+        self._metrics.on_task_event(type, task.name, hostname,
+                                    fields.get("timestamp"),
+                                    fields.get("runtime"))
+
+    def _index_keys(self, task):
+        return (task.name, task.worker and task.worker.hostname, task.state)
+
+    def _reindex(self, uuid, task, previous=(None, None, None)):
+        timestamp = task.timestamp
+        self._by_time.add(uuid, timestamp)
+        for index, old_key, key in zip((self._by_name, self._by_worker,
+                                        self._by_state),
+                                       previous, self._index_keys(task)):
+            if old_key is not None and old_key != key:
+                self._discard(index, old_key, uuid)
+            if key is not None:
+                try:
+                    index[key].add(uuid, timestamp)
+                except KeyError:
+                    index[key] = TaskIndex()
+                    index[key].add(uuid, timestamp)
+
+    def _unindex(self, uuid, task):
+        if self._changed_tasks is not None:
+            self._changed_tasks.discard(uuid)
+        self._by_time.discard(uuid)
+        for index, key in zip((self._by_name, self._by_worker,
+                               self._by_state), self._index_keys(task)):
+            if key is not None:
+                self._discard(index, key, uuid)
+
+    def _discard(self, index, key, uuid):
+        tasks = index.get(key)
+        if tasks is not None:
+            tasks.discard(uuid)
+            if not tasks:
+                del index[key]
 
     def event(self, event):
         self._mutex.acquire()
@@ -249,48 +516,190 @@ class State(object):
 
     def _dispatch_event(self, event):
         self.event_count += 1
+        if self.event_log is not None:
+            self.event_log.append(event)
+            if self.max_logged_events and \
+                    len(self.event_log) > self.max_logged_events:
+                self._trim_event_log()
         event = kwdict(event)
         group, _, type = partition(event.pop("type"), "-")
         self.group_handlers[group](type, event)
         if self.event_callback:
             self.event_callback(self, event)
 
+    def snapshot(self, clear_after=False):
+        """Returns a :class:`Snapshot` of the workers and tasks changed
+        since the last snapshot (the first snapshot has all of them).
+
+        The lock is only held while copying the changed records, so the
+        snapshot can be used while events are processed.
+
+        :keyword clear_after: Clear the state after the snapshot is
+            taken, like :meth:`freeze_while`.
+
+        """
+        self._mutex.acquire()
+        try:
+            try:
+                return self._snapshot()
+            finally:
+                if clear_after:
+                    self._clear()
+        finally:
+            self._mutex.release()
+
+    def _snapshot(self):
+        if self._changed_tasks is None:
+            uuids, hostnames = self.tasks.keys(), self.workers.keys()
+        else:
+            uuids, hostnames = self._changed_tasks, self._changed_workers
+        self._changed_tasks, self._changed_workers = set(), set()
+
+        workers = {}
+        for hostname in hostnames:
+            worker = self.workers.get(hostname)
+            if worker is not None:
+                workers[hostname] = worker.copy()
+        tasks = []
+        for uuid in uuids:
+            task = self.tasks.get(uuid)
+            if task is not None:
+                task = task.copy()
+                if task.worker is not None:
+                    task.worker = workers.get(task.worker.hostname) or \
+                                    task.worker.copy()
+                tasks.append((uuid, task))
+
+        event_count, task_count = self._snapshot_counts
+        self._snapshot_counts = (self.event_count, self.task_count)
+        return Snapshot(workers, tasks,
+                        event_count=self.event_count - event_count,
+                        task_count=self.task_count - task_count)
+
+    def restore_snapshot(self, snapshot):
+        """Mark the workers and tasks in a snapshot taken by
+        :meth:`snapshot` as changed again, e.g. because the snapshot
+        could not be used, so they are in the next snapshot."""
+        self._mutex.acquire()
+        try:
+            if self._changed_tasks is None:
+                return
+            self._changed_tasks.update(snapshot.tasks.keys())
+            self._changed_workers.update(snapshot.workers.keys())
+            event_count, task_count = self._snapshot_counts
+            self._snapshot_counts = (event_count - snapshot.event_count,
+                                     task_count - snapshot.task_count)
+        finally:
+            self._mutex.release()
+
+    def log_events(self, max_events=None):
+        """Keep the events received, until taken by :meth:`take_events`.
+        Used by cameras storing the events themselves.
+
+        :keyword max_events: Max number of events kept, when there are
+            more the oldest events are dropped.
+
+        """
+        if self.event_log is None:
+            self.event_log = deque()
+        self.max_logged_events = max_events
+
+    def take_events(self):
+        """Returns the events received since the events were last
+        taken, see :meth:`log_events`."""
+        self._mutex.acquire()
+        try:
+            if self.event_log is None:
+                return []
+            events = list(self.event_log)
+            self.event_log.clear()
+            return events
+        finally:
+            self._mutex.release()
+
+    def return_events(self, events):
+        """Put back events taken by :meth:`take_events`, e.g. because
+        they could not be stored, before the events received since."""
+        self._mutex.acquire()
+        try:
+            if self.event_log is not None:
+                self.event_log.extendleft(reversed(events))
+                self._trim_event_log()
+        finally:
+            self._mutex.release()
+
+    def _trim_event_log(self):
+        if self.max_logged_events:
+            log = self.event_log
+            while len(log) > self.max_logged_events:
+                log.popleft()
+                self.dropped_events += 1
+
+    def _latest(self, index, limit=None):
+        if index is None:
+            return []
+        tasks = self.tasks
+        return [(uuid, tasks[uuid])
+                    for uuid in islice(reversed(index), limit)]
+
     def tasks_by_timestamp(self, limit=None):
-        """Get tasks by timestamp.
+        """Get tasks by timestamp, the most recent first.
 
         Returns a list of `(uuid, task)` tuples.
 
         """
-        return self._sort_tasks_by_time(self.tasks.items()[:limit])
-
-    def _sort_tasks_by_time(self, tasks):
-        """Sort task items by time."""
-        return sorted(tasks, key=lambda t: t[1].timestamp,
-                      reverse=True)
+        return self._latest(self._by_time, limit)
 
     def tasks_by_type(self, name, limit=None):
-        """Get all tasks by type.
+        """Get all tasks by type, the most recent first.
 
         Returns a list of `(uuid, task)` tuples.
 
         """
-        return self._sort_tasks_by_time([(uuid, task)
-                for uuid, task in self.tasks.items()[:limit]
-                    if task.name == name])
+        return self._latest(self._by_name.get(name), limit)
 
     def tasks_by_worker(self, hostname, limit=None):
-        """Get all tasks by worker.
+        """Get all tasks by worker, the most recent first.
 
         Returns a list of `(uuid, task)` tuples.
 
         """
-        return self._sort_tasks_by_time([(uuid, task)
-                for uuid, task in self.tasks.items()[:limit]
-                    if task.worker.hostname == hostname])
+        return self._latest(self._by_worker.get(hostname), limit)
+
+    def tasks_by_state(self, state, limit=None):
+        """Get all tasks in a state, the most recent first.
+
+        Returns a list of `(uuid, task)` tuples.
+
+        """
+        return self._latest(self._by_state.get(state), limit)
 
     def task_types(self):
         """Returns a list of all seen task types."""
-        return list(sorted(set(task.name for task in self.tasks.values())))
+        return sorted(self._by_name.keys())
+
+    def metrics(self, now=None):
+        """Returns the aggregate metrics of all tasks, and by task type
+        and worker.
+
+        The metrics of a group are the number of events seen for every
+        task state (``"counts"``), the successes and failures per second
+        over sliding windows (``"rates"``), and estimated percentiles of
+        the runtime of the tasks that succeeded (``"runtime"``).
+
+        """
+        self._mutex.acquire()
+        try:
+            return self._metrics.info(now)
+        finally:
+            self._mutex.release()
+
+    def clear_metrics(self):
+        self._mutex.acquire()
+        try:
+            self._metrics.clear()
+        finally:
+            self._mutex.release()
 
     def alive_workers(self):
         """Returns a list of (seemingly) alive workers."""
@@ -301,4 +710,33 @@ class State(object):
                                                        self.task_count)
 
 
+class Snapshot(State):
+    """Copy of the workers and tasks changed in a :class:`State` since
+    the previous snapshot, see :meth:`State.snapshot`.
+
+    :attr:`event_count` and :attr:`task_count` are the number of events
+    and tasks received since the previous snapshot, and :attr:`timestamp`
+    is the time the snapshot was taken.  The aggregate metrics are not
+    copied, use the metrics of the state instead.
+
+    """
+
+    def __init__(self, workers, tasks, event_count=0, task_count=0,
+            timestamp=None):
+        super(Snapshot, self).__init__(
+                max_workers_in_memory=len(workers) + 1,
+                max_tasks_in_memory=len(tasks) + 1)
+        self.workers.update(workers)
+        for uuid, task in tasks:
+            self.tasks[uuid] = task
+            self._reindex(uuid, task)
+        self.event_count = event_count
+        self.task_count = task_count
+        self.timestamp = timestamp or time.time()
+
+    def __repr__(self):
+        return "<Snapshot: events=%s tasks=%s>" % (self.event_count,
+                                                   len(self.tasks))
+
+
 state = State()
@@ -72,5 +72,10 @@ class TaskRevokedError(Exception):
     pass
 
 
+class ResultChunkMissing(Exception):
+    """A chunk of a result stored in chunks is missing."""
+    pass
+
+
 class NotConfigured(UserWarning):
     """Celery has not been configured, as no config module has been found."""
@@ -81,6 +81,20 @@ class BaseAsyncResult(object):
         """Alias to :meth:`wait`."""
         return self.wait(timeout=timeout)
 
+    def stream(self, timeout=None):
+        """Wait for the task, and return an iterator over its result.
+
+        If the result is a string stored in chunks
+        (see :setting:`CELERY_RESULT_CHUNK_SIZE`), the chunks are
+        fetched lazily and yielded one at a time, otherwise the whole
+        result is yielded as a single item.
+
+        Takes the same arguments, and raises the same exceptions
+        as :meth:`wait`.
+
+        """
+        return self.backend.stream_result(self.task_id, timeout=timeout)
+
     def ready(self):
         """Returns :const:`True` if the task has been executed.
 
@@ -406,6 +420,10 @@ class EagerResult(BaseAsyncResult):
         elif self.status in states.PROPAGATE_STATES:
             raise self.result
 
+    def stream(self, timeout=None):
+        """Returns an iterator yielding the result."""
+        return iter([self.wait(timeout=timeout)])
+
     def revoke(self):
         self._status = states.REVOKED
 
@@ -422,7 +440,7 @@ class EagerResult(BaseAsyncResult):
     @property
     def state(self):
         """The tasks state."""
-        return self._state
+        return self._status
 
     @property
     def traceback(self):
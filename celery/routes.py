@@ -1,5 +1,5 @@
 from celery.exceptions import QueueNotFound
-from celery.utils import instantiate, firstmethod, mpromise
+from celery.utils import instantiate, firstmethod, mpromise, maybe_promise
 
 _first_route = firstmethod("route_for_task")
 
@@ -23,6 +23,15 @@ class MapRoute(object):
 
 
 class Router(object):
+    """Routes tasks to queues.
+
+    Routes returned by static routers (:class:`MapRoute`) are expanded
+    once per task name and cached, so only the other routers are
+    consulted every time a task is sent.  The cache is only valid for the
+    routes and queues the router was created with, see
+    :meth:`celery.app.amqp.AMQP.Router`.
+
+    """
 
     def __init__(self, routes=None, queues=None, create_missing=False,
             app=None):
@@ -35,17 +44,43 @@ class Router(object):
         self.queues = queues
         self.routes = routes
         self.create_missing = create_missing
+        self._cache = {}
+        self._queue_cache = {}
 
     def route(self, options, task, args=(), kwargs={}):
         # Expand "queue" keys in options.
         options = self.expand_destination(options)
         if self.routes:
-            route = self.lookup_route(task, args, kwargs)
+            route = self._route_for_task(task, args, kwargs)
             if route:
-                # Also expand "queue" keys in route.
-                return merge(options, self.expand_destination(route))
+                return merge(options, route)
         return options
 
+    def _route_for_task(self, task, args, kwargs):
+        """Find the expanded route for `task`, caching the answer of
+        static routers."""
+        try:
+            return self._cache[task]
+        except KeyError:
+            pass
+        cacheable = True
+        for router in self.routes:
+            router = maybe_promise(router)
+            if isinstance(router, MapRoute):
+                route = router.route_for_task(task)
+            else:
+                # Dynamic routers may return a different route
+                # for every call.
+                cacheable = False
+                route = _first_route([router], task, args, kwargs)
+            if route is not None:
+                # Also expand "queue" keys in route.
+                route = self.expand_destination(route)
+                break
+        if cacheable:
+            self._cache[task] = route
+        return route
+
     def expand_destination(self, route):
         # The route can simply be a queue name,
         # this is convenient for direct exchanges.
@@ -57,19 +92,27 @@ class Router(object):
             queue = route.pop("queue", None)
 
         if queue:
-            try:
-                dest = dict(self.queues[queue])
-            except KeyError:
-                if self.create_missing:
-                    dest = self.app.amqp.queues.add(queue, queue, queue)
-                else:
-                    raise QueueNotFound(
-                        "Queue '%s' is not defined in CELERY_QUEUES" % queue)
-            dest.setdefault("routing_key", dest.get("binding_key"))
-            return merge(dest, route)
+            return merge(self._expand_queue(queue), route)
 
         return route
 
+    def _expand_queue(self, queue):
+        try:
+            return self._queue_cache[queue]
+        except KeyError:
+            pass
+        try:
+            dest = dict(self.queues[queue])
+        except KeyError:
+            if self.create_missing:
+                dest = self.app.amqp.queues.add(queue, queue, queue)
+            else:
+                raise QueueNotFound(
+                    "Queue '%s' is not defined in CELERY_QUEUES" % queue)
+        dest.setdefault("routing_key", dest.get("binding_key"))
+        self._queue_cache[queue] = dest
+        return dest
+
     def lookup_route(self, task, args=None, kwargs=None):
         return _first_route(self.routes, task, args, kwargs)
 
@@ -9,12 +9,13 @@ from celery.serialization import pickle
 from celery.task.base import Task, PeriodicTask
 from celery.task.sets import TaskSet
 from celery.task.builtins import PingTask, ExecuteRemoteTask
-from celery.task.builtins import AsynchronousMapTask, _dmap
+from celery.task.builtins import AsynchronousMapTask, _dmap, _chunked_map
 from celery.task.control import discard_all
 from celery.task.http import HttpDispatchTask
 
 __all__ = ["Task", "TaskSet", "PeriodicTask", "discard_all",
-           "dmap", "dmap_async", "execute_remote", "HttpDispatchTask"]
+           "dmap", "dmap_async", "chunked_map", "chunked_starmap",
+           "execute_remote", "HttpDispatchTask"]
 
 
 def dmap(fun, args, timeout=None):
@@ -53,6 +54,58 @@ def dmap_async(fun, args, timeout=None):
     return AsynchronousMapTask.delay(pickle.dumps(fun), args, timeout=timeout)
 
 
+def chunked_map(fun, args, chunk_size=None, timeout=None,
+        chunk_runtime=None, window=None):
+    """Distribute ``map(fun, args)`` in chunks, and collect the results.
+
+    Sending one task for every element is wasteful when applying
+    the function takes little time, so the elements are sent in chunks,
+    each chunk being processed by a single task.
+
+    :param fun: A callable function or object, it must be picklable.
+    :param args: Iterable of the elements to apply `fun` to.
+    :keyword chunk_size: Number of elements in every chunk.  If not set
+        the size is chosen so that each chunk takes about `chunk_runtime`
+        seconds to process, based on the runtime of the chunks
+        completed so far.
+    :keyword timeout: Max time to wait for a chunk to complete,
+        in seconds.
+    :keyword chunk_runtime: Runtime to aim for when choosing the chunk
+        size, in seconds.  Default is
+        :data:`~celery.task.builtins.MAP_CHUNK_RUNTIME`.
+    :keyword window: Max number of chunks processed at the same time.
+        See :class:`~celery.task.sets.TaskSetStream`.
+
+    Returns the list of results, in the same order as `args`.
+
+    Example
+
+        >>> from celery.task import chunked_map
+        >>> chunked_map(math.sqrt, xrange(1000000))
+
+    """
+    return _chunked_map(fun, args, chunk_size=chunk_size, timeout=timeout,
+                        chunk_runtime=chunk_runtime, window=window)
+
+
+def chunked_starmap(fun, args, chunk_size=None, timeout=None,
+        chunk_runtime=None, window=None):
+    """Like :func:`chunked_map`, except every element in `args` is
+    a sequence of positional arguments to `fun`.
+
+    Example
+
+        >>> from celery.task import chunked_starmap
+        >>> import operator
+        >>> chunked_starmap(operator.add, [[2, 2], [4, 4], [8, 8]])
+        [4, 8, 16]
+
+    """
+    return _chunked_map(fun, args, star=True, chunk_size=chunk_size,
+                        timeout=timeout, chunk_runtime=chunk_runtime,
+                        window=window)
+
+
 def execute_remote(fun, *args, **kwargs):
     """Execute arbitrary function/object remotely.
 
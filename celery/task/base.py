@@ -33,7 +33,8 @@ extract_exec_options = mattrgetter("queue", "routing_key",
                                    "exchange", "immediate",
                                    "mandatory", "priority",
                                    "serializer", "delivery_mode",
-                                   "compression")
+                                   "compression",
+                                   "compression_threshold")
 _default_context = {"logfile": None,
                     "loglevel": None,
                     "id": None,
@@ -195,6 +196,15 @@ class BaseTask(object):
     #: :mod:`kombu.serialization.registry`.  Default is `"pickle"`.
     serializer = "pickle"
 
+    #: The compression method used for messages sent for this task.
+    #: Default is the :setting:`CELERY_MESSAGE_COMPRESSION` setting.
+    compression = None
+
+    #: Messages for this task smaller than this number of bytes are sent
+    #: uncompressed.  Default is the
+    #: :setting:`CELERY_MESSAGE_COMPRESSION_THRESHOLD` setting.
+    compression_threshold = None
+
     #: The result store backend used for this task.
     backend = None
 
@@ -375,8 +385,10 @@ class BaseTask(object):
                           executed after the expiration time.
 
         :keyword connection: Re-use existing broker connection instead
-                             of establishing a new one.  The `connect_timeout`
-                             argument is not respected if this is set.
+                             of one from the app's publisher pool
+                             (see :setting:`BROKER_POOL_LIMIT`).  The
+                             `connect_timeout` argument is not respected
+                             if this is set.
 
         :keyword connect_timeout: The timeout in seconds, before we give up
                                   on establishing a connection to the AMQP
@@ -419,8 +431,13 @@ class BaseTask(object):
                               to use.  Can be one of ``zlib``, ``bzip2``,
                               or any custom compression methods registered with
                               :func:`kombu.compression.register`. Defaults to
-                              the :setting:`CELERY_MESSAGE_COMPRESSION`
-                              setting.
+                              the :attr:`compression` attribute.
+
+        :keyword compression_threshold: Only compress the message if it is
+                                        at least this many bytes.
+                                        Defaults to the
+                                        :attr:`compression_threshold`
+                                        attribute.
 
         .. note::
             If the :setting:`CELERY_ALWAYS_EAGER` setting is set, it will
@@ -434,32 +451,52 @@ class BaseTask(object):
             return self.apply(args, kwargs, task_id=task_id)
 
         options.setdefault("compression",
-                           conf.CELERY_MESSAGE_COMPRESSION)
+                           self.compression or
+                                conf.CELERY_MESSAGE_COMPRESSION)
         options = dict(extract_exec_options(self), **options)
         options = router.route(options, self.name, args, kwargs)
         exchange = options.get("exchange")
         exchange_type = options.get("exchange_type")
         expires = expires or self.expires
 
-        publish = publisher or self.get_publisher(connection,
-                                                  exchange=exchange,
-                                                  exchange_type=exchange_type)
-        evd = None
-        if conf.CELERY_SEND_TASK_SENT_EVENT:
-            evd = self.app.events.Dispatcher(channel=publish.channel,
-                                             buffer_while_offline=False)
-
-        try:
-            task_id = publish.delay_task(self.name, args, kwargs,
-                                         task_id=task_id,
-                                         countdown=countdown,
-                                         eta=eta, expires=expires,
-                                         event_dispatcher=evd,
-                                         **options)
-        finally:
-            if not publisher:
-                publish.close()
-                publish.connection.close()
+        def _send(publish):
+            evd = None
+            if conf.CELERY_SEND_TASK_SENT_EVENT:
+                evd = self.app.events.Dispatcher(channel=publish.channel,
+                                                 buffer_while_offline=False)
+            return publish.delay_task(self.name, args, kwargs,
+                                      task_id=task_id,
+                                      countdown=countdown,
+                                      eta=eta, expires=expires,
+                                      event_dispatcher=evd,
+                                      **options)
+
+        # The app's publish buffer and publisher pool are only used when
+        # the task doesn't need to create its own publisher.
+        shared = (publisher is None and connection is None and
+                  not sets._overrides(self, BaseTask, "get_publisher"))
+        buffer = None
+        if shared:
+            buffer = self.app.publish_buffer
+        if buffer is not None:
+            # Sent in the background by the app's publish buffer.
+            task_id = buffer.put(self.name, args, kwargs, task_id=task_id,
+                                 countdown=countdown, eta=eta,
+                                 expires=expires, **options)
+        elif shared:
+            # Reuse a connection from the app's publisher pool.
+            task_id = self.app.pool.publish(_send,
+                                            connect_timeout=connect_timeout)
+        else:
+            publish = publisher or self.get_publisher(connection,
+                                                exchange=exchange,
+                                                exchange_type=exchange_type)
+            try:
+                task_id = _send(publish)
+            finally:
+                if not publisher:
+                    publish.close()
+                    publish.connection.close()
 
         return self.AsyncResult(task_id)
 
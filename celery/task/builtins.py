@@ -1,21 +1,51 @@
-from celery import conf
+import time
+
+from datetime import timedelta
+from itertools import islice
+
+from celery.app import app_or_default
 from celery.schedules import crontab
 from celery.serialization import pickle
 from celery.task.base import Task
-from celery.task.sets import TaskSet
+from celery.task.sets import TaskSet, TaskSetStream
+
+#: Default runtime to aim for when choosing the size of the chunks
+#: sent by :func:`celery.task.chunked_map`, in seconds.
+MAP_CHUNK_RUNTIME = 1.0
+
+#: Number of elements in the first chunk sent by
+#: :func:`celery.task.chunked_map`, used to measure the runtime
+#: of a single element.
+MAP_PROBE_SIZE = 10
+
+#: Max number of elements in a single chunk.
+MAP_MAX_CHUNK_SIZE = 10000
 
 
 class backend_cleanup(Task):
+    """Deletes expired results.  Returns the number of results
+    deleted."""
     name = "celery.backend_cleanup"
 
     def run(self):
-        self.backend.cleanup()
-
-if conf.TASK_RESULT_EXPIRES and \
-        backend_cleanup.name not in conf.CELERYBEAT_SCHEDULE:
-    conf.CELERYBEAT_SCHEDULE[backend_cleanup.name] = dict(
+        removed = self.backend.cleanup()
+        if removed:
+            self.get_logger().info("Deleted %s expired results." % (
+                                    removed, ))
+        return removed
+
+_conf = app_or_default().conf
+if _conf.CELERY_TASK_RESULT_EXPIRES and \
+        backend_cleanup.name not in _conf.CELERYBEAT_SCHEDULE:
+    if _conf.CELERY_RESULT_CLEANUP_INTERVAL:
+        _cleanup_schedule = timedelta(
+                seconds=_conf.CELERY_RESULT_CLEANUP_INTERVAL)
+    else:
+        _cleanup_schedule = crontab(minute="00", hour="04",
+                                    day_of_week="*")
+    _conf.CELERYBEAT_SCHEDULE[backend_cleanup.name] = dict(
             task=backend_cleanup.name,
-            schedule=crontab(minute="00", hour="04", day_of_week="*"))
+            schedule=_cleanup_schedule)
 
 
 DeleteExpiredTaskMetaTask = backend_cleanup         # FIXME remove in 3.0
@@ -37,6 +67,95 @@ def _dmap(fun, args, timeout=None):
     return ts.apply_async().join(timeout=timeout)
 
 
+class ChunkSizer(object):
+    """Chooses the size of chunks so that every chunk takes about
+    `runtime` seconds, based on the runtime measured for the chunks
+    completed so far."""
+
+    def __init__(self, runtime=MAP_CHUNK_RUNTIME, limit=MAP_MAX_CHUNK_SIZE):
+        self.runtime = runtime
+        self.limit = limit
+        self.items = 0
+        self.total = 0.0
+
+    def update(self, items, runtime):
+        self.items += items
+        self.total += runtime
+
+    @property
+    def chunk_size(self):
+        if not self.total:
+            return self.limit
+        size = int(self.runtime * self.items / self.total)
+        return max(1, min(size, self.limit))
+
+
+def _chunked_map(fun, args, star=False, chunk_size=None, timeout=None,
+        chunk_runtime=None, window=None):
+    pickled = pickle.dumps(fun)
+    args = iter(args)
+    results = []
+    sizer = None
+    if not chunk_size:
+        # Measure the runtime of the first few elements before
+        # choosing the size of the rest of the chunks.
+        sizer = ChunkSizer(chunk_runtime or MAP_CHUNK_RUNTIME)
+        probe = list(islice(args, MAP_PROBE_SIZE))
+        if not probe:
+            return results
+        values, runtime = ExecuteChunkTask.apply_async(
+                (pickled, probe, star)).get(timeout=timeout)
+        sizer.update(len(probe), runtime)
+        results.extend(values)
+
+    def subtasks():
+        while 1:
+            chunk = list(islice(args, chunk_size or sizer.chunk_size))
+            if not chunk:
+                break
+            yield ExecuteChunkTask.subtask((pickled, chunk, star))
+
+    stream = TaskSetStream(subtasks(), window=window,
+                           app=ExecuteChunkTask.app).apply_async(
+                                        timeout=timeout, ordered=True)
+    try:
+        for values, runtime in stream:
+            if sizer is not None:
+                sizer.update(len(values), runtime)
+            results.extend(values)
+    except:
+        stream.close()
+        raise
+    return results
+
+
+class ExecuteChunkTask(Task):
+    """Applies a function to every element in a chunk.
+
+    Used by :func:`celery.task.chunked_map` and
+    :func:`celery.task.chunked_starmap`.  Returns a tuple of the list of
+    results and the time it took to compute them, in seconds.
+
+    """
+    name = "celery.execute_chunk"
+
+    def run(self, ser_callable, chunk, star=False, **kwargs):
+        """
+        :param ser_callable: A pickled function or callable object.
+        :param chunk: List of elements to apply the function to.
+        :keyword star: If true the elements are tuples of positional
+            arguments, otherwise they are passed as the only argument.
+
+        """
+        fun = pickle.loads(ser_callable)
+        time_start = time.time()
+        if star:
+            results = [fun(*args) for args in chunk]
+        else:
+            results = [fun(arg) for arg in chunk]
+        return results, time.time() - time_start
+
+
 class AsynchronousMapTask(Task):
     """Task used internally by :func:`dmap_async` and
     :meth:`TaskSet.map_async`.  """
@@ -166,6 +166,27 @@ class Control(object):
                                          "rate_limit": rate_limit},
                               **kwargs)
 
+    def set_event_filter(self, event_types=None, sample_rates=None,
+            destination=None, **kwargs):
+        """Select the events sent by workers.
+
+        :keyword event_types: List of the event types to send (which can be
+            patterns like ``"task-*"``), events of all types are sent
+            if not set.
+        :keyword sample_rates: Mapping of event types to the fraction of
+            the events of that type to send.
+        :keyword destination: If set, a list of the hosts to send the
+            command to, when empty broadcast to all workers.
+
+        See :meth:`broadcast` for supported keyword arguments, and
+        :meth:`celery.events.EventDispatcher.set_filter` for details.
+
+        """
+        return self.broadcast("set_event_filter", destination=destination,
+                              arguments={"event_types": event_types,
+                                         "sample_rates": sample_rates},
+                              **kwargs)
+
     def broadcast(self, command, arguments=None, destination=None,
             connection=None, connect_timeout=None, reply=False, timeout=1,
             limit=None, callback=None, channel=None):
@@ -206,5 +227,6 @@ broadcast = _default_control.broadcast
 rate_limit = _default_control.rate_limit
 ping = _default_control.ping
 revoke = _default_control.revoke
+set_event_filter = _default_control.set_event_filter
 discard_all = _default_control.discard_all
 inspect = _default_control.inspect
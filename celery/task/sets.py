@@ -1,12 +1,22 @@
+import time
 import warnings
 
+from collections import deque
+from itertools import islice
 from UserList import UserList
 
 from celery import registry
+from celery import states
 from celery.app import app_or_default
 from celery.datastructures import AttributeDict
+from celery.exceptions import TimeoutError
 from celery.utils import gen_unique_id
 
+#: Options to :meth:`~celery.task.base.BaseTask.apply_async` that can not
+#: be used when the subtasks are sent in bulk.
+BULK_INCOMPATIBLE_OPTIONS = frozenset(["publisher", "connection",
+                                       "connect_timeout", "queues"])
+
 TASKSET_DEPRECATION_TEXT = """\
 Using this invocation of TaskSet is deprecated and will be removed
 in Celery v2.4!
@@ -98,6 +108,67 @@ class subtask(AttributeDict):
         return registry.tasks[self.task]
 
 
+def _overrides(obj, base, attr):
+    """Returns true if the class of `obj` (or `obj` itself if it is a
+    class) replaces the method `attr` defined by `base`."""
+    if not isinstance(obj, type):
+        obj = type(obj)
+    return getattr(obj, attr).im_func is not getattr(base, attr).im_func
+
+
+def _send_bulk(app, tasks, publisher, taskset_id):
+    """Send `tasks` using a single call to
+    :meth:`~celery.app.amqp.TaskPublisher.delay_tasks`.
+
+    Subtasks using a task type or subtask class with a custom
+    `apply_async` method, or options that only make sense for a single
+    task, are sent separately by calling their `apply_async` method.
+
+    """
+    from celery.task.base import BaseTask, extract_exec_options
+    conf = app.conf
+    router = app.amqp.Router()
+    types = {}
+    defaults = {}
+    bulk = []
+    results = []
+    for task in tasks:
+        name = task.task
+        try:
+            type_ = types[name]
+        except KeyError:
+            type_ = types[name] = task.get_type()
+            if _overrides(type_, BaseTask, "apply_async"):
+                type_ = types[name] = None
+            else:
+                defaults[name] = dict(extract_exec_options(type_),
+                        compression=type_.compression or
+                                        conf.CELERY_MESSAGE_COMPRESSION)
+        if (type_ is None or type(task) is not subtask and
+                _overrides(task, subtask, "apply_async") or
+                task.options and
+                BULK_INCOMPATIBLE_OPTIONS.intersection(task.options)):
+            results.append(task.apply_async(taskset_id=taskset_id,
+                                            publisher=publisher))
+            continue
+        options = dict(defaults[name], **task.options)
+        options.pop("router", None)
+        options["task_id"] = options.get("task_id") or gen_unique_id()
+        options["expires"] = options.get("expires") or type_.expires
+        args, kwargs = task.args, task.kwargs
+        bulk.append((name, args, kwargs,
+                     router.route(options, name, args, kwargs)))
+        results.append(type_.AsyncResult(options["task_id"]))
+
+    event_dispatcher = None
+    if bulk and conf.CELERY_SEND_TASK_SENT_EVENT:
+        event_dispatcher = app.events.Dispatcher(channel=publisher.channel,
+                                                 buffer_while_offline=False)
+    publisher.delay_tasks(bulk, taskset_id=taskset_id,
+                          event_dispatcher=event_dispatcher)
+    return results
+
+
 class TaskSet(UserList):
     """A task containing several subtasks, making it possible
     to track how many, or when all of the tasks has been completed.
@@ -185,9 +256,13 @@ class TaskSet(UserList):
         taskset_id = gen_unique_id()
         publisher = self.Publisher(connection=connection)
         try:
-            results = [task.apply_async(taskset_id=taskset_id,
-                                        publisher=publisher)
-                            for task in self.tasks]
+            if hasattr(publisher, "delay_tasks"):
+                results = _send_bulk(self.app, self.tasks, publisher,
+                                     taskset_id)
+            else:
+                results = [task.apply_async(taskset_id=taskset_id,
+                                            publisher=publisher)
+                                for task in self.tasks]
         finally:
             publisher.close()
 
@@ -219,3 +294,174 @@ class TaskSet(UserList):
             "TaskSet.task_name is deprecated and will be removed in 1.4",
             DeprecationWarning)
         return self._task_name
+
+
+class TaskSetStream(object):
+    """Applies subtasks taken from an iterator, keeping at most
+    :attr:`window` of them in flight at a time.
+
+    Unlike :class:`TaskSet` the subtasks are never all held in memory,
+    so it can be used with an unbounded number of subtasks (e.g. one for
+    every row returned by a database cursor).  New subtasks are sent as
+    the ones in flight complete, and the return values are produced by
+    iterating over the stream.  The results are not kept after they have
+    been returned.
+
+    :param tasks: Iterable of :class:`subtask` instances.
+    :keyword window: Max number of subtasks sent but not yet completed.
+    :keyword interval: Time to sleep between polls for completed results,
+        in seconds.
+
+    Example::
+
+        >>> subtasks = (RefreshFeedTask.subtask(kwargs={"feed_url": url})
+        ...                 for url in feed_urls_from_database())
+        >>> stream = TaskSetStream(subtasks, window=1000).apply_async()
+        >>> for return_value in stream:
+        ...     print(return_value)
+
+    """
+
+    #: Max number of subtasks sent but not yet completed.
+    window = 100
+
+    #: Time to sleep between polls for completed results, in seconds.
+    interval = 0.1
+
+    #: Total number of subtasks sent.
+    sent = 0
+
+    #: Total number of results returned.
+    completed = 0
+
+    _publisher = None
+    _pending = None
+
+    def __init__(self, tasks, window=None, interval=None, app=None,
+            Publisher=None):
+        self.app = app_or_default(app)
+        self.tasks = iter(tasks)
+        self.window = window or self.window
+        if interval is not None:
+            self.interval = interval
+        self.Publisher = Publisher or self.app.amqp.TaskPublisher
+        self.taskset_id = gen_unique_id()
+        self._buffer = deque()
+
+    def apply_async(self, connection=None, connect_timeout=None,
+            timeout=None, propagate=True, ordered=False):
+        """Start sending the subtasks.
+
+        Returns the stream itself, iterate over it to get the return
+        values of the subtasks.
+
+        :keyword timeout: Max time to wait for the next result, in seconds.
+            :exc:`~celery.exceptions.TimeoutError` is raised if no
+            subtask completes in time.
+        :keyword propagate: Reraise the exception of failed subtasks,
+            if disabled the exception is returned instead.
+        :keyword ordered: Return the results in the order the subtasks
+            were taken from the iterator.  By default the results are
+            returned as soon as they are ready.
+
+        When all the results have been returned, the connection is
+        closed.  Use :meth:`close` if the stream is abandoned before that.
+
+        """
+        self.timeout = timeout
+        self.propagate = propagate
+        self.ordered = ordered
+        self._pending = deque()
+        if self.app.conf.CELERY_ALWAYS_EAGER:
+            return self
+        self._connection = connection
+        self._close_connection = not connection
+        if not connection:
+            self._connection = self.app.broker_connection(
+                                connect_timeout=connect_timeout)
+        self._publisher = self.Publisher(connection=self._connection)
+        return self
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self._pending is None:
+            raise ValueError("TaskSetStream.apply_async() not called")
+        if self._publisher is None and self.app.conf.CELERY_ALWAYS_EAGER:
+            return self._value(self.tasks.next().apply(
+                                        taskset_id=self.taskset_id))
+
+        time_start = time.time()
+        while not self._buffer:
+            self._fill()
+            if not self._pending:
+                self.close()
+                raise StopIteration()
+            self._buffer.extend(self._collect())
+            if not self._buffer:
+                if self.timeout is not None and \
+                        time.time() >= time_start + self.timeout:
+                    raise TimeoutError("The operation timed out.")
+                time.sleep(self.interval)
+        # Keep the window full while the caller processes the results.
+        self._fill()
+        self.completed += 1
+        return self._value(self._buffer.popleft())
+
+    def close(self):
+        """Stop sending subtasks and close the connection."""
+        self.tasks = iter(())
+        if self._publisher is not None:
+            self._publisher.close()
+            if self._close_connection:
+                self._connection.close()
+            self._publisher = None
+
+    def _fill(self):
+        space = self.window - len(self._pending)
+        if space > 0 and self._publisher is not None:
+            batch = list(islice(self.tasks, space))
+            if batch:
+                self._pending.extend(_send_bulk(self.app, batch,
+                                                self._publisher,
+                                                self.taskset_id))
+                self.sent += len(batch)
+
+    def _collect(self):
+        pending = self._pending
+        if self.ordered:
+            if _ready([pending[0]]):
+                return [pending.popleft()]
+            return []
+        ready = _ready(pending)
+        if ready:
+            done = dict((result.task_id, True) for result in ready)
+            self._pending = deque(result for result in pending
+                                    if result.task_id not in done)
+        return ready
+
+    def _value(self, result):
+        if self.propagate and result.state in states.PROPAGATE_STATES:
+            raise result.result
+        return result.result
+
+
+def _ready(results):
+    """Returns the results that are ready, asking every backend for the
+    state of all of its results at once if it supports it, and for
+    the state of every result otherwise."""
+    by_backend = {}
+    for result in results:
+        by_backend.setdefault(result.backend, []).append(result)
+
+    ready = []
+    for backend, results in by_backend.items():
+        if getattr(backend, "supports_bulk_reads", False):
+            metas = backend.get_many([result.task_id for result in results])
+            ready.extend([result for result in results
+                            if metas[result.task_id]["status"] in
+                                states.READY_STATES])
+        else:
+            ready.extend([result for result in results if result.ready()])
+    return ready
@@ -1,6 +1,19 @@
+import os
+import shutil
+import socket
+import tempfile
 import unittest2 as unittest
 
-from celery.app.amqp import MSG_OPTIONS, extract_msg_options
+from datetime import datetime
+
+from kombu import BrokerConnection
+from kombu.compat import Consumer
+
+from celery.app import amqp
+from celery.app.amqp import MSG_OPTIONS, PublisherPool, TaskPublisher
+from celery.app.amqp import MessageStats, PublishBuffer, extract_msg_options
+from celery.datastructures import AttributeDict
+from celery.exceptions import ImproperlyConfigured
 
 
 class TestMsgOptions(unittest.TestCase):
@@ -13,3 +26,454 @@ class TestMsgOptions(unittest.TestCase):
         result = extract_msg_options(testing)
         self.assertEqual(result["mandatory"], True)
         self.assertEqual(result["routing_key"], "foo.xuzzy")
+
+
+class RecordingPublisher(TaskPublisher):
+
+    #: Messages with these task args fail to send.
+    poison = ()
+
+    def __init__(self):
+        self.sent = []
+        self.declared = []
+
+    def send(self, message_data, exchange=None, **kwargs):
+        if tuple(message_data["args"]) in self.poison:
+            raise KeyError("poisoned")
+        self.sent.append((exchange, kwargs.get("routing_key"),
+                          message_data))
+
+    def _declare_exchange(self, exchange, exchange_type=None):
+        self.declared.append(exchange)
+
+
+class test_TaskPublisher(unittest.TestCase):
+
+    def test_delay_task(self):
+        publisher = RecordingPublisher()
+        task_id = publisher.delay_task("tasks.add", (2, 2), {},
+                                       taskset_id="ts", exchange="foo",
+                                       routing_key="foo.x", retries=3)
+        exchange, routing_key, message = publisher.sent[0]
+        self.assertEqual((exchange, routing_key), ("foo", "foo.x"))
+        self.assertEqual(message["id"], task_id)
+        self.assertEqual(message["taskset"], "ts")
+        self.assertEqual(message["retries"], 3)
+
+    def test_delay_tasks(self):
+        publisher = RecordingPublisher()
+        tasks = [("tasks.add", (i, i), {},
+                  {"exchange": ("a", "b")[i % 2], "routing_key": "x",
+                   "countdown": i % 2 and 10 or None})
+                        for i in range(6)]
+        task_ids = publisher.delay_tasks(tasks, taskset_id="ts")
+        self.assertEqual(len(task_ids), 6)
+        self.assertEqual(publisher.declared, ["a", "b"])
+        sent = publisher.sent
+        self.assertEqual([e for e, _, _ in sent], ["a"] * 3 + ["b"] * 3)
+        self.assertEqual([m["id"] for _, _, m in sent],
+                         task_ids[0::2] + task_ids[1::2])
+        self.assertTrue(all(m["taskset"] == "ts" for _, _, m in sent))
+        self.assertIsNone(sent[0][2]["eta"])
+        self.assertTrue(sent[-1][2]["eta"])
+
+    def test_delay_tasks_validates_before_sending(self):
+        publisher = RecordingPublisher()
+        tasks = [("tasks.add", (2, 2), {}, {}),
+                 ("tasks.add", "not a list", {}, {})]
+        self.assertRaises(ValueError, publisher.delay_tasks, tasks)
+        self.assertFalse(publisher.sent)
+
+
+class test_TaskPublisher_compression(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = BrokerConnection(transport="memory")
+        self.stats = MessageStats()
+        self.consumer = Consumer(self.connection, queue="c.compression",
+                                 exchange="c.compression",
+                                 routing_key="c.compression")
+
+    def tearDown(self):
+        self.consumer.close()
+        self.connection.close()
+
+    def Publisher(self, **kwargs):
+        return TaskPublisher(self.connection, exchange="c.compression",
+                             routing_key="c.compression", serializer="json",
+                             compression="zlib", stats=self.stats, **kwargs)
+
+    def test_threshold(self):
+        publisher = self.Publisher(compression_threshold=100)
+        publisher.send({"data": "x" * 1000})
+        publisher.send({"data": "x"})
+        message = self.consumer.fetch()
+        self.assertEqual(message.headers["compression"],
+                         "application/x-gzip")
+        self.assertEqual(message.payload, {"data": "x" * 1000})
+        message = self.consumer.fetch()
+        self.assertNotIn("compression", message.headers)
+        self.assertEqual(message.payload, {"data": "x"})
+
+        info = self.stats.info()
+        self.assertEqual(info["messages"], 2)
+        self.assertEqual(info["compressed"], 1)
+        self.assertGreater(info["bytes_uncompressed"], 1000)
+        self.assertLess(info["bytes_sent"], 100)
+        self.assertEqual(info["bytes_saved"],
+                         info["bytes_uncompressed"] - info["bytes_sent"])
+
+    def test_threshold_argument(self):
+        publisher = self.Publisher(compression_threshold=100)
+        publisher.send({"data": "x" * 50}, compression_threshold=10)
+        self.assertIn("compression", self.consumer.fetch().headers)
+
+    def test_not_compressed_if_larger(self):
+        publisher = self.Publisher()
+        publisher.send({"data": "x"})
+        self.assertNotIn("compression", self.consumer.fetch().headers)
+        self.assertEqual(self.stats.info()["bytes_saved"], 0)
+
+    def test_compression_level(self):
+        levels = []
+
+        def compress(body, level):
+            levels.append(level)
+            return body[:10]
+
+        prev = amqp.LEVEL_ENCODERS["application/x-gzip"]
+        amqp.LEVEL_ENCODERS["application/x-gzip"] = compress
+        try:
+            publisher = self.Publisher(compression_level=1)
+            publisher.send({"data": "x" * 1000})
+        finally:
+            amqp.LEVEL_ENCODERS["application/x-gzip"] = prev
+        self.assertEqual(levels, [1])
+        self.assertEqual(self.stats.info()["bytes_sent"], 10)
+        self.consumer.discard_all()
+
+
+class MockConnection(object):
+    connection_errors = (KeyError, )
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class MockPublisher(object):
+    closed = False
+    published = 0
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def close(self):
+        self.closed = True
+
+
+class MockAMQP(object):
+
+    def TaskPublisher(self, connection):
+        return MockPublisher(connection)
+
+
+class MockApp(object):
+    amqp = MockAMQP()
+
+    def broker_connection(self, connect_timeout=None):
+        return MockConnection()
+
+
+class test_PublisherPool(unittest.TestCase):
+
+    def test_reuse(self):
+        pool = PublisherPool(MockApp(), limit=2)
+        p1, p2, p3 = pool.acquire(), pool.acquire(), pool.acquire()
+        self.assertEqual(pool.stats()["in_use"], 3)
+        map(pool.release, [p1, p2, p3])
+        self.assertTrue(p3.closed)
+        self.assertFalse(p1.closed or p2.closed)
+        self.assertIs(pool.acquire(), p2)
+        stats = pool.stats()
+        self.assertEqual(stats["created"], 3)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_disabled(self):
+        pool = PublisherPool(MockApp(), limit=0)
+        p1 = pool.acquire()
+        pool.release(p1)
+        self.assertTrue(p1.closed)
+        self.assertIsNot(pool.acquire(), p1)
+
+    def test_idle_timeout(self):
+        pool = PublisherPool(MockApp(), limit=10, idle_timeout=60)
+        p1 = pool.acquire()
+        pool.release(p1)
+        pool._idle[0] = (p1, pool._idle[0][1] - 120)
+        self.assertIsNot(pool.acquire(), p1)
+        self.assertTrue(p1.closed)
+        self.assertEqual(pool.stats()["expired"], 1)
+
+    def test_publish(self):
+        pool = PublisherPool(MockApp(), limit=10)
+        p1 = pool.publish(lambda publisher: publisher)
+        self.assertIs(pool.publish(lambda publisher: publisher), p1)
+
+        def raises(publisher):
+            raise ValueError()
+        self.assertRaises(ValueError, pool.publish, raises)
+        self.assertFalse(p1.closed)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_publish_retries_closed_connection(self):
+        pool = PublisherPool(MockApp(), limit=10)
+        pool.release(pool.acquire())
+        used = []
+
+        def fails_once(publisher):
+            used.append(publisher)
+            if len(used) == 1:
+                raise KeyError("connection closed")
+            return 42
+        self.assertEqual(pool.publish(fails_once), 42)
+        self.assertTrue(used[0].closed)
+        self.assertFalse(used[1].closed)
+        stats = pool.stats()
+        self.assertEqual(stats["retried"], 1)
+        self.assertEqual(stats["discarded"], 1)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_publish_error_not_retried(self):
+        pool = PublisherPool(MockApp(), limit=10)
+        pool.release(pool.acquire())
+        used = []
+
+        def fails_publishing(publisher):
+            used.append(publisher)
+            publisher.published += 1
+            raise KeyError("connection lost")
+        self.assertRaises(KeyError, pool.publish, fails_publishing)
+        self.assertEqual(len(used), 1)
+        self.assertEqual(pool.stats()["retried"], 0)
+
+    def test_new_connection_not_retried(self):
+        pool = PublisherPool(MockApp(), limit=10)
+
+        def fails(publisher):
+            raise KeyError("connection refused")
+        self.assertRaises(KeyError, pool.publish, fails)
+        self.assertEqual(pool.stats()["retried"], 0)
+
+    def test_after_fork(self):
+        pool = PublisherPool(MockApp(), limit=10)
+        p1 = pool.acquire()
+        pool.release(p1)
+        pool._pid = -1
+        self.assertIsNot(pool.acquire(), p1)
+        self.assertFalse(p1.closed)
+
+    def test_close(self):
+        pool = PublisherPool(MockApp(), limit=10)
+        p1 = pool.acquire()
+        pool.release(p1)
+        pool.close()
+        self.assertTrue(p1.closed)
+        self.assertTrue(p1.connection.closed)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+
+class MockPool(object):
+
+    def __init__(self):
+        self.publisher = RecordingPublisher()
+        self.publisher.channel = None
+        self.fail = False
+
+    def publish(self, fun, connect_timeout=None):
+        if self.fail:
+            if self.fail is True:
+                raise KeyError("connection refused")
+            raise self.fail("connection refused")
+        return fun(self.publisher)
+
+
+class MockBufferApp(object):
+
+    def __init__(self):
+        self.pool = MockPool()
+        self.conf = AttributeDict(CELERY_SEND_TASK_SENT_EVENT=False,
+                                  CELERY_TASK_SERIALIZER="json")
+
+    @property
+    def sent(self):
+        return [message for _, _, message in self.pool.publisher.sent]
+
+
+class test_PublishBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.app = MockBufferApp()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def Buffer(self, **kwargs):
+        return PublishBuffer(self.app, interval=0.01, **kwargs)
+
+    def test_put_flush(self):
+        buffer = self.Buffer(max_size=10, batch_size=3)
+        ids = [buffer.put("tasks.add", (i, i), {}, routing_key="x")
+                    for i in range(7)]
+        self.assertEqual(len(buffer), 7)
+        self.assertFalse(self.app.sent)
+        self.assertEqual(buffer.flush(), 7)
+        self.assertEqual([m["id"] for m in self.app.sent], ids)
+        stats = buffer.stats()
+        self.assertEqual(stats["sent"], 7)
+        self.assertEqual(stats["depth"], 0)
+        self.assertGreaterEqual(stats["latency_max"], stats["latency_avg"])
+
+    def test_put_given_task_id_and_countdown(self):
+        buffer = self.Buffer()
+        self.assertEqual(buffer.put("tasks.add", (2, 2), task_id="id1",
+                                    countdown=60, expires=120), "id1")
+        buffer.flush()
+        message = self.app.sent[0]
+        self.assertGreater(message["eta"], datetime.now().isoformat())
+        self.assertGreater(message["expires"], message["eta"])
+
+    def test_put_validates_arguments(self):
+        buffer = self.Buffer()
+        self.assertRaises(ValueError, buffer.put, "tasks.add", "xxx")
+        self.assertRaises(ValueError, buffer.put, "tasks.add", (), "xxx")
+
+    def test_put_validates_serialization(self):
+        buffer = self.Buffer()
+        self.assertRaises(TypeError, buffer.put, "tasks.add", (object(), ))
+        self.assertEqual(len(buffer), 0)
+        buffer.put("tasks.add", (object(), ), serializer="pickle")
+        self.assertEqual(len(buffer), 1)
+
+    def test_send_error_dropped_after_retries(self):
+        buffer = self.Buffer(batch_size=3, max_retries=1)
+        ids = [buffer.put("tasks.add", (i, i)) for i in range(3)]
+        self.app.pool.publisher.poison = [(1, 1)]
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 3)
+        # Then sent one by one, dropping the task that fails.
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.stats()["dropped"], 1)
+        # The tasks sent before the error in a batch are sent again.
+        sent = [m["id"] for m in self.app.sent]
+        self.assertEqual(sent.count(ids[0]), 3)
+        self.assertNotIn(ids[1], sent)
+        self.assertEqual(sent[-1], ids[2])
+
+    def test_connection_error_retried(self):
+        buffer = self.Buffer(max_retries=1,
+                             connection_errors=(socket.error, ))
+        buffer.put("tasks.add", (2, 2))
+        self.app.pool.fail = socket.error
+        for i in range(5):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.stats()["dropped"], 0)
+        self.app.pool.fail = False
+        self.assertEqual(buffer.flush(), 1)
+
+    def test_send_error_retried(self):
+        buffer = self.Buffer(batch_size=2)
+        ids = [buffer.put("tasks.add", (i, i)) for i in range(3)]
+        self.app.pool.fail = True
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.stats()["errors"], 1)
+        self.app.pool.fail = False
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual([m["id"] for m in self.app.sent], ids)
+
+    def test_overflow_drop(self):
+        buffer = self.Buffer(max_size=2, overflow="drop")
+        [buffer.put("tasks.add", (i, i)) for i in range(5)]
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(buffer.stats()["dropped"], 3)
+
+    def test_overflow_journal(self):
+        journal = os.path.join(self.tmpdir, "journal")
+        buffer = self.Buffer(max_size=2, batch_size=2, overflow="journal",
+                             journal=journal)
+        ids = [buffer.put("tasks.add", (i, i)) for i in range(5)]
+        self.assertEqual(buffer.stats()["journaled"], 3)
+        self.assertEqual(buffer.flush(), 5)
+        self.assertEqual([m["id"] for m in self.app.sent], ids)
+        self.assertFalse(os.listdir(self.tmpdir))
+
+        # Tasks left in the journal by a process that is no longer
+        # running are sent, journals of running processes are not.
+        [buffer.put("tasks.add", (i, i)) for i in range(5)]
+        own = "%s.%d" % (journal, os.getpid())
+        os.rename(own, "%s.%d" % (journal, os.getppid()))
+        other = self.Buffer(overflow="journal", journal=journal)
+        self.assertEqual(other.flush(), 0)
+        os.rename("%s.%d" % (journal, os.getppid()),
+                  "%s.%d" % (journal, self.dead_pid()))
+        self.assertEqual(other.flush(), 3)
+        self.assertFalse(os.listdir(self.tmpdir))
+
+    def dead_pid(self):
+        pid = os.fork()
+        if not pid:
+            os._exit(0)
+        os.waitpid(pid, 0)
+        return pid
+
+    def test_journal_per_process(self):
+        journal = os.path.join(self.tmpdir, "journal")
+        buffer = self.Buffer(max_size=1, overflow="journal",
+                             journal=journal)
+        [buffer.put("tasks.add", (i, i)) for i in range(3)]
+        self.assertEqual(os.listdir(self.tmpdir),
+                         ["journal.%d" % (os.getpid(), )])
+        pid = os.fork()
+        if not pid:
+            # The child never sends or removes the parent's journal.
+            ok = False
+            try:
+                buffer.put("tasks.add", (3, 3))
+                ok = buffer.flush() == 2 and \
+                        os.path.getsize("%s.%d" % (journal, os.getppid()))
+            finally:
+                os._exit(not ok)
+        self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        self.assertEqual(buffer.flush(), 3)
+
+    def test_overflow_block(self):
+        buffer = self.Buffer(max_size=2, batch_size=1)
+        buffer.start()
+        try:
+            [buffer.put("tasks.add", (i, i)) for i in range(10)]
+        finally:
+            buffer.stop()
+        self.assertEqual(len(self.app.sent), 10)
+        self.assertEqual(len(buffer), 0)
+
+    def test_stop_flushes(self):
+        buffer = self.Buffer(batch_size=100)
+        buffer.start()
+        [buffer.put("tasks.add", (i, i)) for i in range(5)]
+        buffer.stop()
+        self.assertEqual(len(self.app.sent), 5)
+        # Tasks put after the buffer is stopped are sent right away.
+        buffer.put("tasks.add", (2, 2))
+        self.assertEqual(len(self.app.sent), 6)
+
+    def test_invalid_overflow(self):
+        self.assertRaises(ImproperlyConfigured, self.Buffer,
+                          overflow="xxx")
+        self.assertRaises(ImproperlyConfigured, self.Buffer,
+                          overflow="journal")
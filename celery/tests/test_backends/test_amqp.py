@@ -0,0 +1,79 @@
+import time
+import unittest2 as unittest
+
+from celery import states
+from celery.backends.amqp import AMQPBackend
+from celery.utils import gen_unique_id
+
+
+class MemoryAMQPBackend(AMQPBackend):
+    """AMQP backend reading results from a dict instead of the broker."""
+
+    def __init__(self, *args, **kwargs):
+        super(MemoryAMQPBackend, self).__init__(*args, **kwargs)
+        self.published = {}
+        self.polled = []
+
+    def poll(self, task_id):
+        self.polled.append(task_id)
+        meta = self.published.pop(task_id, None)
+        if meta is not None:
+            self._cache[task_id] = meta
+            return meta
+        return self._cache.get(task_id) or {"status": states.PENDING,
+                                            "result": None}
+
+
+class test_AMQPBackend_meta(unittest.TestCase):
+
+    def setUp(self):
+        self.b = MemoryAMQPBackend(serializer="pickle", persistent=False)
+
+    def publish(self, status, result=None, traceback=None):
+        task_id = gen_unique_id()
+        self.b.published[task_id] = {"status": status, "result": result,
+                                     "traceback": traceback}
+        return task_id
+
+    def test_get_status(self):
+        tid = self.publish(states.SUCCESS, 42)
+        self.assertEqual(self.b.get_status(tid), states.SUCCESS)
+        self.assertEqual(self.b.get_status(gen_unique_id()), states.PENDING)
+
+    def test_get_traceback(self):
+        tid = self.publish(states.FAILURE, KeyError("foo"), "Traceback")
+        self.assertEqual(self.b.get_traceback(tid), "Traceback")
+
+    def test_get_task_meta_join_chunks(self):
+        tid = self.publish(states.SUCCESS, 42)
+        meta = self.b.get_task_meta(tid, join_chunks=False)
+        self.assertEqual(meta["result"], 42)
+
+    def test_get_many(self):
+        done = self.publish(states.SUCCESS, 42)
+        pending = gen_unique_id()
+        metas = self.b.get_many([done, pending])
+        self.assertEqual(metas[done]["result"], 42)
+        self.assertEqual(metas[pending]["status"], states.PENDING)
+
+        # ready results are read from the local cache.
+        self.b.polled[:] = []
+        self.assertEqual(self.b.get_many([done])[done]["result"], 42)
+
+    def test_consumed_results_kept(self):
+        conf = self.b.app.conf
+        prev = conf.CELERY_RESULT_CACHE_MAX_BYTES, conf.CELERY_RESULT_CACHE_TTL
+        conf.CELERY_RESULT_CACHE_MAX_BYTES = 10
+        conf.CELERY_RESULT_CACHE_TTL = 0.01
+        try:
+            b = MemoryAMQPBackend(serializer="pickle", persistent=False)
+        finally:
+            (conf.CELERY_RESULT_CACHE_MAX_BYTES,
+             conf.CELERY_RESULT_CACHE_TTL) = prev
+        tid = gen_unique_id()
+        b.published[tid] = {"status": states.SUCCESS, "result": "x" * 100,
+                            "traceback": None}
+        self.assertEqual(b.get_result(tid), "x" * 100)
+        time.sleep(0.02)
+        self.assertEqual(b.get_status(tid), states.SUCCESS)
+        self.assertFalse(self.b.polled)
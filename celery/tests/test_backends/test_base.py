@@ -1,4 +1,6 @@
 import sys
+import threading
+import time
 import types
 import unittest2 as unittest
 
@@ -9,7 +11,9 @@ from celery.serialization import get_pickleable_exception as gpe
 
 from celery import states
 from celery.backends.base import BaseBackend, KeyValueStoreBackend
-from celery.backends.base import BaseDictBackend
+from celery.backends.base import BaseDictBackend, COMPRESSED_MAGIC
+from celery.backends.base import ResultBuffer
+from celery.exceptions import ImproperlyConfigured, ResultChunkMissing
 from celery.utils import gen_unique_id
 
 
@@ -107,7 +111,7 @@ class KVBackend(KeyValueStoreBackend):
 
     def __init__(self, *args, **kwargs):
         self.db = {}
-        super(KVBackend, self).__init__(KeyValueStoreBackend)
+        super(KVBackend, self).__init__(KeyValueStoreBackend, **kwargs)
 
     def get(self, key):
         return self.db.get(key)
@@ -115,6 +119,9 @@ class KVBackend(KeyValueStoreBackend):
     def set(self, key, value):
         self.db[key] = value
 
+    def delete(self, key):
+        self.db.pop(key, None)
+
 
 class DictBackend(BaseDictBackend):
 
@@ -181,6 +188,339 @@ class test_KeyValueStoreBackend(unittest.TestCase):
     def test_restore_missing_taskset(self):
         self.assertIsNone(self.b.restore_taskset("xxx-nonexistant"))
 
+    def test_get_many(self):
+        ids = [gen_unique_id() for i in range(3)]
+        self.b.mark_as_done(ids[0], 0)
+        self.b.mark_as_done(ids[1], 1)
+        self.b.get_result(ids[0])
+        metas = self.b.get_many(ids)
+        self.assertEqual(metas[ids[0]]["result"], 0)
+        self.assertEqual(metas[ids[1]]["result"], 1)
+        self.assertEqual(metas[ids[2]]["status"], states.PENDING)
+        self.assertEqual(self.b.cache_stats()["hits"], 1)
+        self.assertIn(ids[1], self.b._cache)
+
+
+class test_BaseDictBackend_cache(unittest.TestCase):
+
+    def test_caches_success_only(self):
+        b = KVBackend()
+        ok, failed = gen_unique_id(), gen_unique_id()
+        b.mark_as_done(ok, 42)
+        b.mark_as_failure(failed, KeyError("foo"))
+        b.get_result(ok)
+        b.get_result(failed)
+        self.assertIn(ok, b._cache)
+        self.assertNotIn(failed, b._cache)
+        b.get_result(ok)
+        self.assertEqual(b.cache_stats()["hits"], 1)
+
+    def test_cache_states(self):
+        b = KVBackend()
+        b.cache_states = states.READY_STATES
+        failed = gen_unique_id()
+        b.mark_as_failure(failed, KeyError("foo"))
+        b.get_result(failed)
+        self.assertIn(failed, b._cache)
+
+
+class test_KeyValueStoreBackend_serialization(unittest.TestCase):
+
+    def test_json_serializer(self):
+        b = KVBackend(serializer="json")
+        tid = gen_unique_id()
+        b.mark_as_done(tid, {"foo": [1, 2, 3]})
+        self.assertEqual(b.get_result(tid), {"foo": [1, 2, 3]})
+        self.assertTrue(b.db[b.get_key_for_task(tid)].startswith("{"))
+
+    def test_json_exception(self):
+        b = KVBackend(serializer="json")
+        tid = gen_unique_id()
+        b.mark_as_failure(tid, KeyError("foo"))
+        self.assertEqual(b.get_status(tid), states.FAILURE)
+        exc = b.get_result(tid)
+        self.assertIsInstance(exc, Exception)
+        self.assertEqual(exc.__class__.__name__, "KeyError")
+        self.assertIn("foo", str(exc))
+
+    def test_unknown_serializer(self):
+        self.assertRaises(ImproperlyConfigured, KVBackend,
+                          serializer="xxx-unknown")
+
+    def test_compression_threshold(self):
+        b = KVBackend(serializer="json", compression="zlib",
+                      compression_threshold=100)
+        small, large = gen_unique_id(), gen_unique_id()
+        b.mark_as_done(small, "x")
+        b.mark_as_done(large, "x" * 1000)
+        self.assertFalse(b.db[b.get_key_for_task(small)].startswith(
+                            COMPRESSED_MAGIC))
+        stored = b.db[b.get_key_for_task(large)]
+        self.assertTrue(stored.startswith(COMPRESSED_MAGIC))
+        self.assertLess(len(stored), 1000)
+        self.assertEqual(b.get_result(small), "x")
+        self.assertEqual(b.get_result(large), "x" * 1000)
+
+    def test_compression_marker_not_serialized(self):
+        b = KVBackend(serializer="pickle", compression="zlib",
+                      compression_threshold=0)
+        for value in ("\x00", 0, "", [None], "x" * 1000):
+            tid = gen_unique_id()
+            b.mark_as_done(tid, value)
+            self.assertEqual(b.get_result(tid), value)
+        self.assertRaises(ValueError, b.decode,
+                          COMPRESSED_MAGIC + "\xff" + "zlib\x00")
+
+    def test_compressed_taskset(self):
+        b = KVBackend(compression="bzip2", compression_threshold=0)
+        tid = gen_unique_id()
+        b.save_taskset(tid, range(100))
+        self.assertEqual(b.restore_taskset(tid), range(100))
+
+
+class test_KeyValueStoreBackend_chunks(unittest.TestCase):
+
+    def setUp(self):
+        self.b = KVBackend(chunk_size=10)
+
+    def test_string_result(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, "x" * 25)
+        self.assertEqual(self.b.get(self.b.get_key_for_chunk(tid, 2)), "xxxxx")
+        meta = self.b.get_task_meta(tid, join_chunks=False)
+        self.assertEqual(meta["chunks"],
+                         {"count": 3, "size": 25, "encoded": False})
+        self.assertEqual(self.b.get_result(tid), "x" * 25)
+        self.assertEqual(list(self.b.stream_result(tid)),
+                         ["x" * 10, "x" * 10, "x" * 5])
+
+    def test_encoded_result(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, range(100))
+        self.assertTrue(self.b.get_task_meta(tid,
+                                join_chunks=False)["chunks"]["encoded"])
+        self.assertEqual(self.b.get_result(tid), range(100))
+        self.assertEqual(list(self.b.stream_result(tid)), [range(100)])
+
+    def test_small_result(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, "x")
+        self.assertNotIn("chunks", self.b.get_task_meta(tid))
+        self.assertEqual(list(self.b.stream_result(tid)), ["x"])
+
+    def test_failure_not_chunked(self):
+        tid = gen_unique_id()
+        self.b.mark_as_failure(tid, KeyError("x" * 100))
+        self.assertNotIn("chunks", self.b.get_task_meta(tid))
+        self.assertRaises(KeyError, self.b.stream_result, tid)
+
+    def test_disabled(self):
+        b = KVBackend()
+        tid = gen_unique_id()
+        b.mark_as_done(tid, "x" * 25)
+        self.assertEqual(len(b.db), 1)
+
+    def test_get_many(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, "x" * 25)
+        self.assertEqual(self.b.get_many([tid])[tid]["result"], "x" * 25)
+
+    def test_forget(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, "x" * 25)
+        self.b.forget(tid)
+        self.assertFalse(self.b.db)
+
+    def test_missing_chunk(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, "x" * 25)
+        self.b.delete(self.b.get_key_for_chunk(tid, 1))
+        self.assertRaises(ResultChunkMissing, self.b.get_result, tid)
+
+
+class test_ResultBuffer(unittest.TestCase):
+
+    def test_flush(self):
+        written = []
+        buffer = ResultBuffer(written.extend, max_size=10)
+        buffer.put("id1", 1, states.STARTED)
+        buffer.put("id2", 2, states.SUCCESS)
+        buffer.put("id1", 3, states.SUCCESS)
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.get("id1"), ("id1", 3, states.SUCCESS, None))
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(written, [("id1", 3, states.SUCCESS, None),
+                                   ("id2", 2, states.SUCCESS, None)])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_discard(self):
+        buffer = ResultBuffer(lambda results: None)
+        buffer.put("id1", 1, states.SUCCESS)
+        buffer.discard("id1")
+        self.assertIsNone(buffer.get("id1"))
+
+    def test_flush_error_keeps_results(self):
+
+        def failing(results):
+            raise KeyError("foo")
+
+        buffer = ResultBuffer(failing)
+        buffer.put("id1", 1, states.SUCCESS)
+        self.assertEqual(buffer.flush(), 0)
+        self.assertTrue(buffer.get("id1"))
+
+    def test_flush_error_never_drops(self):
+        failing = [True]
+        written = []
+
+        def flush(results):
+            if failing:
+                raise KeyError("foo")
+            written.extend(results)
+
+        buffer = ResultBuffer(flush, max_size=2)
+        buffer.put("id1", 1, states.SUCCESS)
+        for i in range(10):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 1)
+        failing[:] = []
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(written, [("id1", 1, states.SUCCESS, None)])
+
+    def test_put_when_full_writes_through(self):
+        stored = []
+
+        def failing(results):
+            raise KeyError("foo")
+
+        def store(task_id, result, status, traceback):
+            if result < 0:
+                raise KeyError(result)
+            stored.append(task_id)
+
+        buffer = ResultBuffer(failing, max_size=2, store=store)
+        buffer.put("id1", 1, states.SUCCESS)
+        buffer.put("id2", 2, states.SUCCESS)
+        self.assertEqual(buffer.flush(), 0)
+        # Full: replacing a buffered result is fine, new results
+        # are written synchronously.
+        buffer.put("id1", 3, states.SUCCESS)
+        buffer.put("id3", 3, states.SUCCESS)
+        self.assertEqual(stored, ["id3"])
+        self.assertIsNone(buffer.get("id3"))
+        self.assertEqual(buffer.get("id1"), ("id1", 3, states.SUCCESS, None))
+        # Errors writing through are raised to the caller.
+        self.assertRaises(KeyError, buffer.put, "id4", -1, states.SUCCESS)
+        self.assertEqual(len(buffer), 2)
+
+        written = []
+        buffer = ResultBuffer(written.extend, max_size=1)
+        buffer.put("id1", 1, states.SUCCESS)
+        buffer.put("id2", 2, states.SUCCESS)
+        self.assertEqual(written, [("id2", 2, states.SUCCESS, None)])
+
+    def test_flushes_are_serialized(self):
+        written = []
+        entered = threading.Event()
+        proceed = threading.Event()
+
+        def slow(results):
+            entered.set()
+            proceed.wait()
+            written.extend(results)
+
+        buffer = ResultBuffer(slow)
+        buffer.put("id1", 1, states.STARTED)
+        t = threading.Thread(target=buffer.flush)
+        t.start()
+        entered.wait()
+        buffer.put("id1", 2, states.SUCCESS)
+        t2 = threading.Thread(target=buffer.flush)
+        t2.start()
+        time.sleep(0.1)
+        # The second flush waits for the first to complete.
+        self.assertEqual(len(buffer), 1)
+        proceed.set()
+        t.join()
+        t2.join()
+        self.assertEqual(written, [("id1", 1, states.STARTED, None),
+                                   ("id1", 2, states.SUCCESS, None)])
+
+    def test_flushes_when_full(self):
+        written = []
+        buffer = ResultBuffer(written.extend, max_size=2, max_latency=30)
+        buffer.start()
+        try:
+            buffer.put("id1", 1, states.SUCCESS)
+            buffer.put("id2", 2, states.SUCCESS)
+            for i in range(100):
+                if written:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(len(written), 2)
+        finally:
+            buffer.stop()
+
+    def test_flushes_on_age(self):
+        written = []
+        buffer = ResultBuffer(written.extend, max_size=100, max_latency=0.1)
+        buffer.start()
+        try:
+            buffer.put("id1", 1, states.SUCCESS)
+            for i in range(100):
+                if written:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(len(written), 1)
+        finally:
+            buffer.stop()
+
+    def test_stop_flushes(self):
+        written = []
+        buffer = ResultBuffer(written.extend, max_size=100, max_latency=30)
+        buffer.start()
+        buffer.put("id1", 1, states.SUCCESS)
+        buffer.stop()
+        self.assertEqual(len(written), 1)
+        self.assertFalse(buffer.isAlive())
+
+
+class test_BaseDictBackend_write_behind(unittest.TestCase):
+
+    def test_store_result_is_buffered(self):
+        b = KVBackend(buffer_size=100, buffer_latency=30)
+        try:
+            tid = gen_unique_id()
+            b.mark_as_done(tid, 42)
+            self.assertFalse(b.db)
+            self.assertEqual(b.get_status(tid), states.SUCCESS)
+            self.assertEqual(b.get_result(tid), 42)
+            self.assertEqual(b.flush_buffer(), 1)
+            self.assertIn(b.get_key_for_task(tid), b.db)
+            self.assertEqual(b.get_result(tid), 42)
+        finally:
+            b.buffer.stop()
+
+    def test_forget_discards_buffered(self):
+        b = KVBackend(buffer_size=100, buffer_latency=30)
+        try:
+            tid = gen_unique_id()
+            b.mark_as_done(tid, 42)
+            b.forget(tid)
+            self.assertEqual(b.flush_buffer(), 0)
+            self.assertEqual(b.get_status(tid), states.PENDING)
+        finally:
+            b.buffer.stop()
+
+    def test_disabled(self):
+        b = KVBackend(buffer_size=0)
+        self.assertIsNone(b.buffer)
+        self.assertEqual(b.flush_buffer(), 0)
+        tid = gen_unique_id()
+        b.mark_as_done(tid, 42)
+        self.assertIn(b.get_key_for_task(tid), b.db)
+
 
 class test_KeyValueStoreBackend_interface(unittest.TestCase):
 
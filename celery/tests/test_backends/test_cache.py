@@ -31,6 +31,14 @@ class test_CacheBackend(unittest.TestCase):
         self.assertEqual(tb.get_status(tid), states.SUCCESS)
         self.assertEqual(tb.get_result(tid), 42)
 
+    def test_get_many(self):
+        tb = CacheBackend(backend="memory://")
+        tid, missing = gen_unique_id(), gen_unique_id()
+        tb.mark_as_done(tid, 42)
+        metas = tb.get_many([tid, missing])
+        self.assertEqual(metas[tid]["result"], 42)
+        self.assertEqual(metas[missing]["status"], states.PENDING)
+
     def test_is_pickled(self):
         tb = CacheBackend(backend="memory://")
 
@@ -2,12 +2,17 @@ import unittest2 as unittest
 
 from datetime import datetime
 
+from sqlalchemy import create_engine
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.exc import IntegrityError
+
 from celery.exceptions import ImproperlyConfigured
 
 from celery import states
 from celery.app import app_or_default
 from celery.backends.database import DatabaseBackend
-from celery.db.models import Task, TaskSet
+from celery.db.models import Task, TaskChunk, TaskSet
+from celery.db.session import upgrade_results
 from celery.result import AsyncResult
 from celery.utils import gen_unique_id
 
@@ -131,11 +136,200 @@ class test_DatabaseBackend(unittest.TestCase):
         s.commit()
         s.close()
 
-        tb.cleanup()
+        self.assertEqual(tb.cleanup(), 20)
         s2 = tb.ResultSession()
         self.assertEqual(s2.query(Task).count(), 0)
         self.assertEqual(s2.query(TaskSet).count(), 0)
 
+    def test_cleanup_in_batches(self):
+        tb = DatabaseBackend()
+        tb.cleanup()
+        expired = [gen_unique_id() for i in range(10)]
+        for tid in expired:
+            tb.mark_as_done(tid, 42)
+        s = tb.ResultSession()
+        for t in s.query(Task).all():
+            t.date_done = datetime.now() - tb.result_expires * 2
+        s.commit()
+        s.close()
+        fresh = gen_unique_id()
+        tb.mark_as_done(fresh, 42)
+
+        self.assertEqual(tb.cleanup(batch_size=3, pause=0), 10)
+        s2 = tb.ResultSession()
+        try:
+            self.assertEqual([t.task_id for t in s2.query(Task).all()],
+                             [fresh])
+        finally:
+            s2.close()
+        tb.forget(fresh)
+
+    def test_cleanup_without_batches(self):
+        tb = DatabaseBackend()
+        tb.cleanup()
+        for i in range(5):
+            tb.mark_as_done(gen_unique_id(), 42)
+        s = tb.ResultSession()
+        for t in s.query(Task).all():
+            t.date_done = datetime.now() - tb.result_expires * 2
+        s.commit()
+        s.close()
+
+        self.assertEqual(tb.cleanup(batch_size=0, pause=0), 5)
+        self.assertEqual(tb.cleanup(batch_size=-1, pause=0), 0)
+
+    def test_chunked_result(self):
+        tb = DatabaseBackend(chunk_size=10)
+        tid = gen_unique_id()
+        tb.mark_as_done(tid, "x" * 25)
+        tb.mark_as_done(tid, "y" * 15)
+        self.assertEqual(tb.get_task_meta(tid, join_chunks=False)["chunks"],
+                         {"count": 2, "size": 15, "encoded": False})
+        self.assertEqual(tb.get_result(tid), "y" * 15)
+        self.assertEqual(list(AsyncResult(tid, backend=tb).stream()),
+                         ["y" * 10, "y" * 5])
+
+        other = gen_unique_id()
+        tb.mark_as_done(other, {"foo": "x" * 100})
+        self.assertEqual(tb.get_result(other), {"foo": "x" * 100})
+
+        tb.forget(tid)
+        tb.forget(other)
+        s = tb.ResultSession()
+        try:
+            self.assertFalse(s.query(TaskChunk).filter(
+                        TaskChunk.task_id.in_([tid, other])).count())
+        finally:
+            s.close()
+
+    def test_chunks_replaced_by_later_state(self):
+        tb = DatabaseBackend(chunk_size=10)
+        tid = gen_unique_id()
+        tb.mark_as_done(tid, "x" * 25)
+        tb.mark_as_done(tid, "y" * 5)
+        self.assertEqual(tb.get_result(tid), "y" * 5)
+        s = tb.ResultSession()
+        try:
+            self.assertFalse(s.query(TaskChunk).filter(
+                        TaskChunk.task_id == tid).count())
+        finally:
+            s.close()
+        tb.forget(tid)
+
+    def test_chunked_result_encoded_once(self):
+        tb = DatabaseBackend(chunk_size=100)
+        encoded = []
+        encode = tb.encode
+        tb.encode = lambda data: encoded.append(data) or encode(data)
+        small, large = gen_unique_id(), gen_unique_id()
+        tb._store_many([(small, {"foo": 1}, states.SUCCESS, None),
+                        (large, {"foo": "x" * 500}, states.SUCCESS, None)])
+        self.assertEqual(len(encoded), 2)
+        self.assertEqual(tb.get_result(small), {"foo": 1})
+        self.assertEqual(tb.get_result(large), {"foo": "x" * 500})
+        tb.forget(small)
+        tb.forget(large)
+
+    def test_failed_store_leaves_no_chunks(self):
+        tb = DatabaseBackend(chunk_size=10)
+        tid = gen_unique_id()
+
+        def failing(*args, **kwargs):
+            raise KeyError("foo")
+        tb._upsert = failing
+
+        self.assertRaises(KeyError, tb.mark_as_done, tid, "x" * 25)
+        s = tb.ResultSession()
+        try:
+            self.assertFalse(s.query(TaskChunk).filter(
+                        TaskChunk.task_id == tid).count())
+        finally:
+            s.close()
+
+    def test_store_many(self):
+        tb = DatabaseBackend()
+        tid1, tid2 = gen_unique_id(), gen_unique_id()
+        tb.mark_as_started(tid1)
+        tb._store_many([(tid1, 42, states.SUCCESS, None),
+                        (tid2, 84, states.SUCCESS, None)])
+        self.assertEqual(tb.get_result(tid1), 42)
+        self.assertEqual(tb.get_result(tid2), 84)
+
+    def test_missing_task_not_inserted(self):
+        tb = DatabaseBackend()
+        tid = gen_unique_id()
+        self.assertEqual(tb.get_status(tid), states.PENDING)
+        s = tb.ResultSession()
+        try:
+            self.assertEqual(s.query(Task).filter(
+                                Task.task_id == tid).count(), 0)
+        finally:
+            s.close()
+
+    def test_store_result_updates_existing(self):
+        tb = DatabaseBackend()
+        tid = gen_unique_id()
+        tb.mark_as_started(tid)
+        tb.mark_as_done(tid, 42)
+        s = tb.ResultSession()
+        try:
+            self.assertEqual(s.query(Task).filter(
+                                Task.task_id == tid).count(), 1)
+        finally:
+            s.close()
+        self.assertEqual(tb.get_result(tid), 42)
+
+    def test_store_result_retries_on_IntegrityError(self):
+        tb = DatabaseBackend()
+        tid = gen_unique_id()
+        upsert = tb._upsert
+        raised = []
+
+        def _upsert(session, *args, **kwargs):
+            if not raised:
+                raised.append(True)
+                raise IntegrityError("INSERT", {}, KeyError("duplicate"))
+            return upsert(session, *args, **kwargs)
+
+        tb._upsert = _upsert
+        tb.mark_as_done(tid, 42)
+        self.assertTrue(raised)
+        self.assertEqual(tb.get_result(tid), 42)
+
+    def test_save_taskset_twice(self):
+        tb = DatabaseBackend()
+        tid = gen_unique_id()
+        tb.save_taskset(tid, {"foo": "bar"})
+        tb.save_taskset(tid, {"foo": "baz"})
+        self.assertEqual(tb.restore_taskset(tid), {"foo": "baz"})
+
+    def test_upgrade(self):
+        engine = create_engine("sqlite://")
+        engine.execute("""CREATE TABLE celery_taskmeta (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id VARCHAR(255), status VARCHAR(50), result BLOB,
+            date_done DATETIME, traceback TEXT)""")
+        engine.execute("""CREATE TABLE celery_tasksetmeta (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            taskset_id VARCHAR(255), result BLOB, date_done DATETIME)""")
+        for task_id, status in (("a", "STARTED"), ("a", "SUCCESS"),
+                                ("b", "SUCCESS")):
+            engine.execute("INSERT INTO celery_taskmeta (task_id, status) "
+                           "VALUES (?, ?)", task_id, status)
+
+        created = upgrade_results(engine)
+        self.assertEqual(len(created), 4)
+        indexes = Inspector.from_engine(engine).get_indexes(
+                        "celery_taskmeta")
+        self.assertTrue([index for index in indexes
+                            if index["column_names"] == ["task_id"]
+                                and index["unique"]])
+        rows = engine.execute("SELECT task_id, status FROM celery_taskmeta "
+                              "ORDER BY task_id").fetchall()
+        self.assertEqual([tuple(row) for row in rows],
+                         [("a", "SUCCESS"), ("b", "SUCCESS")])
+        self.assertFalse(upgrade_results(engine))
+
     def test_Task__repr__(self):
         self.assertIn("foo", repr(Task("foo")))
 
@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest2 as unittest
+
+from celery import states
+from celery.backends import sqlite
+from celery.backends.sqlite import SQLiteBackend
+from celery.exceptions import ImproperlyConfigured
+from celery.utils import gen_unique_id
+
+
+class SomeClass(object):
+
+    def __init__(self, data):
+        self.data = data
+
+
+class test_SQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "results.sqlite")
+        self.b = SQLiteBackend(path=self.path)
+
+    def tearDown(self):
+        self.b.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_no_sqlite3_raises_ImproperlyConfigured(self):
+        prev, sqlite.sqlite3 = sqlite.sqlite3, None
+        try:
+            self.assertRaises(ImproperlyConfigured, SQLiteBackend)
+        finally:
+            sqlite.sqlite3 = prev
+
+    def test_wal_mode(self):
+        mode = self.b.open().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_mark_as_done(self):
+        tid = gen_unique_id()
+        self.assertEqual(self.b.get_status(tid), states.PENDING)
+        self.assertIsNone(self.b.get_result(tid))
+
+        self.b.mark_as_done(tid, 42)
+        self.assertEqual(self.b.get_status(tid), states.SUCCESS)
+        self.assertEqual(self.b.get_result(tid), 42)
+
+    def test_is_pickled(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, {"foo": "baz", "bar": SomeClass(12345)})
+        rindb = self.b.get_result(tid)
+        self.assertEqual(rindb.get("foo"), "baz")
+        self.assertEqual(rindb.get("bar").data, 12345)
+
+    def test_mark_as_failure(self):
+        tid = gen_unique_id()
+        try:
+            raise KeyError("foo")
+        except KeyError, exception:
+            self.b.mark_as_failure(tid, exception)
+        self.assertEqual(self.b.get_status(tid), states.FAILURE)
+        self.assertIsInstance(self.b.get_result(tid), KeyError)
+
+    def test_store_result_twice(self):
+        tid = gen_unique_id()
+        self.b.mark_as_started(tid)
+        self.b.mark_as_done(tid, 42)
+        self.assertEqual(self.b.get_result(tid), 42)
+        self.assertEqual(self.b.open().execute(
+                "SELECT COUNT(*) FROM celery_results").fetchone()[0], 1)
+
+    def test_save_restore_taskset(self):
+        tid = gen_unique_id()
+        self.b.save_taskset(tid, ["a", "b"])
+        self.assertEqual(self.b.restore_taskset(tid), ["a", "b"])
+        self.assertIsNone(self.b.restore_taskset(gen_unique_id()))
+
+    def test_forget(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, 42)
+        self.b.forget(tid)
+        self.assertEqual(self.b.get_status(tid), states.PENDING)
+
+    def test_get_many(self):
+        ids = [gen_unique_id() for i in range(sqlite.MAX_VARIABLES + 10)]
+        self.b._store_many([(tid, i, states.SUCCESS, None)
+                                for i, tid in enumerate(ids[:-1])])
+        metas = self.b.get_many(ids, cache=False)
+        self.assertEqual(len(metas), len(ids))
+        self.assertEqual(metas[ids[0]]["result"], 0)
+        self.assertEqual(metas[ids[-2]]["result"], len(ids) - 2)
+        self.assertEqual(metas[ids[-1]]["status"], states.PENDING)
+
+    def test_persistent_across_instances(self):
+        tid = gen_unique_id()
+        self.b.mark_as_done(tid, 42)
+        other = SQLiteBackend(path=self.path)
+        try:
+            self.assertEqual(other.get_result(tid), 42)
+        finally:
+            other.close()
+
+    def test_connection_per_process(self):
+        conn = self.b.open()
+        self.assertIs(self.b.open(), conn)
+        self.b._local.pid = -1
+        self.assertIsNot(self.b.open(), conn)
+
+    def test_concurrent_writers(self):
+        ids = [gen_unique_id() for i in range(200)]
+        errors = []
+
+        def write(part):
+            try:
+                for tid in part:
+                    self.b.mark_as_done(tid, tid)
+                self.b.close()
+            except Exception, exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=write, args=(ids[i::4], ))
+                        for i in range(4)]
+        map(threading.Thread.start, threads)
+        map(threading.Thread.join, threads)
+        self.assertFalse(errors)
+        metas = self.b.get_many(ids, cache=False)
+        self.assertTrue(all(metas[tid]["result"] == tid for tid in ids))
+
+    def test_cleanup(self):
+        self.b.expires = 60
+        for i in range(10):
+            self.b.mark_as_done(gen_unique_id(), i)
+        self.b.save_taskset(gen_unique_id(), [])
+        recent = gen_unique_id()
+        self.b.mark_as_done(recent, 42)
+        self.b.open().execute(
+                "UPDATE celery_results SET date_done = ? WHERE key != ?",
+                (time.time() - 120, self.b.get_key_for_task(recent)))
+        self.assertEqual(self.b.cleanup(batch_size=3, pause=0), 11)
+        self.assertEqual(self.b.get_result(recent), 42)
+        self.assertEqual(self.b.cleanup(), 0)
+
+    def test_cleanup_never_expires(self):
+        self.b.expires = None
+        self.b.mark_as_done(gen_unique_id(), 42)
+        self.assertEqual(self.b.cleanup(), 0)
+
+    def test_cleanup_without_batches(self):
+        self.b.expires = 60
+        for i in range(10):
+            self.b.mark_as_done(gen_unique_id(), i)
+        self.b.open().execute("UPDATE celery_results SET date_done = ?",
+                              (time.time() - 120, ))
+        self.assertEqual(self.b.cleanup(batch_size=0, pause=0), 10)
+
+    def test_chunked_result(self):
+        b = SQLiteBackend(path=self.path, chunk_size=1024)
+        tid = gen_unique_id()
+        b.mark_as_done(tid, "x" * 4000)
+        self.assertEqual(self.b.get_result(tid), "x" * 4000)
+        self.assertEqual(len(list(b.stream_result(tid))), 4)
+        b.forget(tid)
+        self.assertEqual(self.b.open().execute(
+                "SELECT COUNT(*) FROM celery_results").fetchone()[0], 0)
+        b.close()
@@ -1,8 +1,10 @@
 import sys
+import time
 import unittest2 as unittest
 from Queue import Queue
 
 from celery.datastructures import PositionQueue, ExceptionInfo, LocalCache
+from celery.datastructures import LRUCache
 from celery.datastructures import LimitedSet, SharedCounter, consume_queue
 from celery.datastructures import AttributeDict
 
@@ -143,6 +145,85 @@ class test_LocalCache(unittest.TestCase):
         self.assertListEqual(x.keys(), slots[limit:])
 
 
+class test_LRUCache(unittest.TestCase):
+
+    def test_expires(self):
+        limit = 100
+        x = LRUCache(limit=limit)
+        slots = list(range(limit * 2))
+        for i in slots:
+            x[i] = i
+        self.assertListEqual(x.keys(), slots[limit:])
+        self.assertEqual(x.evictions, limit)
+
+    def test_least_recently_used(self):
+        x = LRUCache(limit=3)
+        x[1], x[2], x[3] = 1, 2, 3
+        self.assertEqual(x[1], 1)
+        x[4] = 4
+        self.assertListEqual(x.keys(), [3, 1, 4])
+
+    def test_max_bytes(self):
+        x = LRUCache(limit=100, max_bytes=10, sizeof=len)
+        x["a"] = "x" * 4
+        x["b"] = "x" * 4
+        x["c"] = "x" * 4
+        self.assertListEqual(x.keys(), ["b", "c"])
+        self.assertEqual(x.bytes, 8)
+        x["b"] = "x" * 2
+        self.assertEqual(x.bytes, 6)
+        x["d"] = "x" * 11
+        self.assertNotIn("d", x)
+        self.assertEqual(x.pop("c"), "x" * 4)
+        self.assertEqual(x.bytes, 2)
+
+    def test_default_sizeof(self):
+        x = LRUCache(limit=100, max_bytes=10000)
+        x["a"] = {"result": "x" * 100}
+        self.assertGreater(x.bytes, 100)
+
+    def test_ttl(self):
+        x = LRUCache(limit=10, ttl=10)
+        x["a"] = 1
+        self.assertEqual(x["a"], 1)
+        x.data["a"] = (1, time.time() - 1, 0)
+        self.assertIsNone(x.get("a"))
+        self.assertEqual(x.expirations, 1)
+        self.assertNotIn("a", x)
+
+    def test_ttl_contains(self):
+        x = LRUCache(limit=10, max_bytes=1000, ttl=10)
+        x["a"] = 1
+        self.assertIn("a", x)
+        value, _, size = x.data["a"]
+        x.data["a"] = (value, time.time() - 1, size)
+        self.assertNotIn("a", x)
+        self.assertEqual(x.expirations, 1)
+        self.assertEqual(len(x), 0)
+        self.assertEqual(x.bytes, 0)
+
+    def test_stats(self):
+        x = LRUCache(limit=1)
+        x["a"] = 1
+        x.get("a")
+        x.get("b")
+        x["b"] = 2
+        self.assertDictContainsSubset({"hits": 1, "misses": 1,
+                                       "evictions": 1, "items": 1},
+                                      x.stats())
+
+    def test_pop_clear(self):
+        x = LRUCache(limit=10)
+        x["a"] = 1
+        self.assertIsNone(x.pop("b", None))
+        self.assertRaises(KeyError, x.pop, "b")
+        del x["a"]
+        self.assertFalse(len(x))
+        x["a"] = 1
+        x.clear()
+        self.assertFalse(len(x))
+
+
 class test_AttributeDict(unittest.TestCase):
 
     def test_getattr__setattr(self):
@@ -1,3 +1,4 @@
+import time
 import unittest2 as unittest
 
 from celery import events
@@ -7,9 +8,11 @@ class MockProducer(object):
 
     def __init__(self, *args, **kwargs):
         self.sent = []
+        self.routing_keys = []
 
     def publish(self, msg, *args, **kwargs):
         self.sent.append(msg)
+        self.routing_keys.append(kwargs.get("routing_key"))
 
     def close(self):
         pass
@@ -39,6 +42,100 @@ class TestEventDispatcher(unittest.TestCase):
         eventer.send("World War II", ended=True)
         self.assertTrue(producer.has_event("World War II"))
 
+    def test_event_types(self):
+        producer = MockProducer()
+        eventer = events.EventDispatcher(object(), enabled=False,
+                                         event_types=["task-failed",
+                                                      "worker-*"])
+        eventer.publisher = producer
+        eventer.enabled = True
+        eventer.send("task-succeeded", uuid="1")
+        eventer.send("task-failed", uuid="1")
+        eventer.send("worker-heartbeat")
+        self.assertEqual([e["type"] for e in producer.sent],
+                         ["task-failed", "worker-heartbeat"])
+        self.assertFalse(eventer.should_send("task-received"))
+
+        eventer.set_filter()
+        self.assertTrue(eventer.should_send("task-received"))
+        eventer.enabled = False
+        self.assertFalse(eventer.should_send("task-received"))
+
+    def test_sample_rates(self):
+        eventer = events.EventDispatcher(object(), enabled=False,
+                                         sample_rates={"task-succeeded": 0.2,
+                                                       "task-received": 0.5,
+                                                       "task-sent": 0})
+        eventer.enabled = True
+        ids = map(str, range(1000))
+        succeeded = [i for i in ids if eventer.should_send("task-succeeded",
+                                                           i)]
+        received = [i for i in ids if eventer.should_send("task-received",
+                                                          i)]
+        self.assertTrue(100 < len(succeeded) < 300)
+        self.assertTrue(400 < len(received) < 600)
+        # same decision every time, and a sampled task has all the
+        # events sampled at a higher rate.
+        self.assertEqual(succeeded, [i for i in ids
+                            if eventer.should_send("task-succeeded", i)])
+        self.assertTrue(set(succeeded).issubset(received))
+        self.assertFalse(eventer.should_send("task-sent", "1"))
+        self.assertTrue(eventer.should_send("task-failed", "1"))
+
+        sent = [eventer.should_send("worker-heartbeat") for i in range(100)]
+        self.assertTrue(all(sent))
+
+    def test_send_batch(self):
+        producer = MockProducer()
+        eventer = events.EventDispatcher(object(), enabled=False,
+                                         batch_size=3)
+        eventer.publisher = producer
+        eventer.enabled = True
+        eventer.send("task-received", uuid=1)
+        eventer.send("worker-heartbeat")
+        self.assertFalse(producer.sent)
+        eventer.send("task-started", uuid=1)
+        self.assertEqual(producer.routing_keys, ["task.batch",
+                                                 "worker.batch"])
+        batch = producer.sent[0]
+        self.assertEqual(batch["type"], "batch")
+        self.assertEqual([e["type"] for e in batch["events"]],
+                         ["task-received", "task-started"])
+        self.assertEqual(batch["events"][0]["hostname"], eventer.hostname)
+
+        eventer.send("task-succeeded", uuid=1)
+        eventer.flush_batch()
+        self.assertEqual(len(producer.sent), 3)
+        eventer.flush_batch()
+        self.assertEqual(len(producer.sent), 3)
+
+    def test_batch_flushed_after_interval(self):
+        producer = MockProducer()
+        eventer = events.EventDispatcher(object(), enabled=False,
+                                         batch_size=100,
+                                         batch_interval=0.01)
+        eventer.publisher = producer
+        eventer.enabled = True
+        eventer.send("task-received", uuid=1)
+        time.sleep(0.02)
+        self.assertFalse(producer.sent)
+        # Sent by the thread sending the next event.
+        eventer.send("task-started", uuid=1)
+        self.assertEqual(len(producer.sent[0]["events"]), 2)
+
+    def test_buffer_while_offline(self):
+        producer = MockProducer()
+        producer.publish = lambda *args, **kwargs: 1 / 0
+        eventer = events.EventDispatcher(object(), enabled=False,
+                                         batch_size=1)
+        eventer.publisher = producer
+        eventer.enabled = True
+        eventer.send("task-received", uuid=1)
+        self.assertEqual(len(eventer._outbound_buffer), 1)
+        eventer.publisher = MockProducer()
+        eventer.flush()
+        self.assertEqual(eventer.publisher.routing_keys, ["task.batch"])
+
 
 class TestEventReceiver(unittest.TestCase):
 
@@ -56,6 +153,17 @@ class TestEventReceiver(unittest.TestCase):
         r._receive(message, object())
         self.assertTrue(got_event[0])
 
+    def test_process_batch(self):
+        got = []
+        r = events.EventReceiver(object(), handlers={"*": got.append})
+        r._receive({"type": "batch",
+                    "events": [{"type": "task-received", "uuid": 1},
+                               {"type": "task-started", "uuid": 1}]},
+                   object())
+        self.assertEqual([e["type"] for e in got],
+                         ["task-received", "task-started"])
+        self.assertTrue(all(e["timestamp"] for e in got))
+
     def test_catch_all_event(self):
 
         message = {"type": "world-war"}
@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import unittest2 as unittest
+
+from celery import states
+from celery.events import Event
+from celery.events import archive
+from celery.events.archive import EventArchive, ArchiveCamera
+from celery.events.state import State
+from celery.exceptions import ImproperlyConfigured
+from celery.utils import gen_unique_id
+
+
+class test_EventArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "events.sqlite")
+        self.a = EventArchive(path=self.path, partition_size=100,
+                              retention=1000)
+
+    def tearDown(self):
+        self.a.close()
+        shutil.rmtree(self.tmpdir)
+
+    def task(self, timestamp, name="tasks.add", hostname="w1",
+            failed=False):
+        uuid = gen_unique_id()
+        received = Event("task-received", uuid=uuid, name=name,
+                         hostname=hostname, args="(2, 2)", kwargs="{}",
+                         timestamp=timestamp)
+        if failed:
+            return [received, Event("task-failed", uuid=uuid,
+                                    hostname=hostname, exception="KeyError()",
+                                    timestamp=timestamp + 1)]
+        return [received, Event("task-succeeded", uuid=uuid,
+                                hostname=hostname, result="4", runtime=0.1,
+                                timestamp=timestamp + 1)]
+
+    def test_no_sqlite3_raises_ImproperlyConfigured(self):
+        prev, archive.sqlite3 = archive.sqlite3, None
+        try:
+            self.assertRaises(ImproperlyConfigured, EventArchive)
+        finally:
+            archive.sqlite3 = prev
+
+    def test_store_and_query(self):
+        events = self.task(1000)
+        self.assertEqual(self.a.store(events), 2)
+        received, succeeded = self.a.query()
+        self.assertEqual(received, events[0])
+        self.assertEqual(succeeded["result"], "4")
+        self.assertEqual(succeeded["name"], "tasks.add")
+        self.assertEqual(succeeded["uuid"], events[1]["uuid"])
+        self.assertEqual(self.a.store([]), 0)
+
+    def test_partitions(self):
+        for timestamp in 1050, 1150, 1250:
+            self.a.store(self.task(timestamp))
+        self.a.store(self.task(1060))
+        self.assertEqual(self.a.partitions(), [1000, 1100, 1200])
+        events = self.a.query(start=1100, end=1200)
+        self.assertEqual([e["timestamp"] for e in events], [1150, 1151])
+        events = self.a.query(start=1051)
+        self.assertEqual([e["timestamp"] for e in events],
+                         [1051, 1060, 1061, 1150, 1151, 1250, 1251])
+
+    def test_query_filters(self):
+        events = []
+        for i in range(10):
+            events.extend(self.task(1000 + i * 10,
+                                    name=i % 2 and "tasks.mul" or "tasks.add",
+                                    hostname="w%d" % (i % 3, ),
+                                    failed=not i % 5))
+        self.a.store(events)
+        self.assertEqual(len(self.a.query(name="tasks.mul")), 10)
+        self.assertEqual(len(self.a.query(hostname="w0")), 8)
+        failed = self.a.query(state=states.FAILURE)
+        self.assertEqual([e["timestamp"] for e in failed], [1001, 1051])
+        self.assertEqual(self.a.query(type="task-failed"), failed)
+        self.assertEqual(len(self.a.query(uuid=events[0]["uuid"])), 2)
+        self.assertEqual(len(self.a.query(name="tasks.add",
+                                          state=states.SUCCESS)), 4)
+
+    def test_query_limit_reverse(self):
+        for timestamp in range(1000, 1400, 20):
+            self.a.store(self.task(timestamp))
+        events = self.a.query(limit=3)
+        self.assertEqual([e["timestamp"] for e in events],
+                         [1000, 1001, 1020])
+        events = self.a.query(limit=3, reverse=True)
+        self.assertEqual([e["timestamp"] for e in events],
+                         [1381, 1380, 1361])
+        events = self.a.query(type="task-received", limit=7, reverse=True)
+        self.assertEqual([e["timestamp"] for e in events],
+                         [1380, 1360, 1340, 1320, 1300, 1280, 1260])
+
+    def test_expire(self):
+        for timestamp in 1000, 1500, 2050:
+            self.a.store(self.task(timestamp))
+        self.assertEqual(self.a.expire(now=2100), 1)
+        self.assertEqual(self.a.partitions(), [1500, 2000])
+        self.assertEqual(self.a.expire(now=2100), 0)
+        self.a.store(self.task(1010))
+        self.assertEqual(len(self.a.query(end=1100)), 2)
+
+    def test_worker_events(self):
+        self.a.store([Event("worker-online", hostname="w1",
+                            timestamp=1000)])
+        event, = self.a.query(hostname="w1")
+        self.assertEqual(event, {"type": "worker-online", "hostname": "w1",
+                                 "timestamp": 1000})
+
+
+class test_ArchiveCamera(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "events.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_capture(self):
+        state = State()
+        cam = ArchiveCamera(state, path=self.path)
+        uuid = gen_unique_id()
+        state.event(Event("task-received", uuid=uuid, name="tasks.add",
+                          hostname="w1"))
+        state.event(Event("task-started", uuid=uuid, hostname="w1"))
+        cam.capture()
+        self.assertFalse(state.take_events())
+        self.assertEqual(len(cam.archive.query(name="tasks.add")), 2)
+        state.event(Event("task-succeeded", uuid=uuid, hostname="w1"))
+        cam.cancel()
+        self.assertEqual(len(cam.archive.query(uuid=uuid)), 3)
+        self.assertEqual(len(state.tasks), 1)
+        cam.on_cleanup()
+        cam.archive.close()
+
+    def test_capture_store_error(self):
+        state = State()
+        cam = ArchiveCamera(state, path=self.path)
+        cam.logger = None
+        store = cam.archive.store
+
+        def failing(events):
+            raise KeyError("foo")
+        cam.archive.store = failing
+
+        state.event(Event("worker-online", hostname="w1"))
+        cam.capture()
+        state.event(Event("worker-heartbeat", hostname="w1"))
+        cam.archive.store = store
+        cam.capture()
+        self.assertEqual([e["type"] for e in cam.archive.query()],
+                         ["worker-online", "worker-heartbeat"])
+        cam.cancel()
+        cam.archive.close()
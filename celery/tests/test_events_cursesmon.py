@@ -0,0 +1,124 @@
+import unittest2 as unittest
+
+from celery import states
+from celery.events import Event
+from celery.events import cursesmon
+from celery.events.state import State
+from celery.utils import gen_unique_id
+
+
+class MockWindow(object):
+
+    def __init__(self, size=(40, 120)):
+        self.size = size
+        self.lines = {}
+        self.erased = 0
+        self.keys = []
+
+    def getmaxyx(self):
+        return self.size
+
+    def getkey(self):
+        if not self.keys:
+            raise Exception("no input")
+        return self.keys.pop(0)
+
+    def addstr(self, y, x, text, attr=0):
+        self.lines[y] = text
+
+    def erase(self):
+        self.erased += 1
+        self.lines.clear()
+
+    def bkgd(self, *args):
+        pass
+
+    def border(self):
+        pass
+
+    def hline(self, *args):
+        pass
+
+    def refresh(self):
+        pass
+
+
+class MockCurses(object):
+    A_NORMAL = A_BOLD = A_DIM = A_UNDERLINE = A_STANDOUT = 0
+    ACS_HLINE = 0
+
+    def color_pair(self, n):
+        return 0
+
+    def __getattr__(self, key):
+        return getattr(cursesmon.curses, key)
+
+
+class test_CursesMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.prev, cursesmon.curses = cursesmon.curses, MockCurses()
+        self.state = State()
+        self.mon = cursesmon.CursesMonitor(self.state)
+        self.mon.win = MockWindow()
+        self.mon.state_colors = {}
+
+    def tearDown(self):
+        cursesmon.curses = self.prev
+
+    def received(self, n=1):
+        ids = [gen_unique_id() for i in range(n)]
+        for uuid in ids:
+            self.state.event(Event("task-received", uuid=uuid,
+                                   name="tasks.add", hostname="w1"))
+        return ids
+
+    def test_redraws_only_changed_rows(self):
+        ids = self.received(30)
+        self.mon.draw()
+        win = self.mon.win
+        self.assertEqual(win.erased, 1)
+        self.assertEqual(self.mon._visible, list(reversed(ids))[:20])
+        self.assertIn(ids[-1], win.lines[4])
+
+        win.lines.clear()
+        self.mon.redraw()
+        self.assertFalse([y for y in win.lines if 4 <= y < 24])
+
+        self.state.event(Event("task-started", uuid=ids[-1],
+                               hostname="w1"))
+        self.mon.redraw()
+        self.assertIn(states.STARTED, win.lines[4])
+        self.assertNotIn(5, win.lines)
+        self.assertEqual(win.erased, 1)
+
+    def test_small_screen(self):
+        self.received(30)
+        self.mon.win = MockWindow(size=(15, 120))
+        self.mon.draw()
+        self.assertEqual(len(self.mon._visible), 5)
+
+    def test_needs_redraw(self):
+        mon = self.mon
+        self.assertTrue(mon.needs_redraw())
+        self.received()
+        mon.draw()
+        now = mon._last_draw
+        self.assertFalse(mon.needs_redraw(now + 1))
+        self.assertTrue(mon.needs_redraw(now + mon.idle_refresh))
+        self.received()
+        self.assertFalse(mon.needs_redraw(now + 0.1))
+        self.assertTrue(mon.needs_redraw(now + mon.refresh_interval))
+        # Slow redraws are throttled.
+        mon._draw_time = 0.2
+        self.assertFalse(mon.needs_redraw(now + 1))
+        self.assertTrue(mon.needs_redraw(now + 2))
+
+    def test_keypress_redraws_screen(self):
+        ids = self.received(3)
+        self.mon.draw()
+        self.mon.win.keys = ["J"]
+        self.mon.draw()
+        self.assertEqual(self.mon.win.erased, 2)
+        self.assertEqual(self.mon.selected_task, ids[-2])
+        self.assertIn(ids[-2], self.mon.win.lines[5])
@@ -0,0 +1,118 @@
+import random
+import unittest2 as unittest
+
+from celery import states
+from celery.events.metrics import Aggregate, Metrics
+from celery.events.metrics import RuntimeSketch, WindowCounter
+
+
+class test_RuntimeSketch(unittest.TestCase):
+
+    def assertAccurate(self, estimate, value, accuracy=0.01):
+        self.assertLessEqual(abs(estimate - value), value * accuracy)
+
+    def test_empty(self):
+        sketch = RuntimeSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        self.assertEqual(sketch.info(), {"count": 0})
+
+    def test_quantiles(self):
+        values = [random.uniform(0.001, 100) for i in range(10000)]
+        sketch = RuntimeSketch()
+        map(sketch.add, values)
+        values.sort()
+        for q in 0.0, 0.5, 0.9, 0.99, 1.0:
+            self.assertAccurate(sketch.quantile(q),
+                                values[int(q * (len(values) - 1))])
+        info = sketch.info()
+        self.assertEqual(info["count"], 10000)
+        self.assertEqual(info["min"], values[0])
+        self.assertEqual(info["max"], values[-1])
+        self.assertAlmostEqual(info["mean"], sum(values) / len(values))
+        self.assertLess(len(sketch.buckets), 1000)
+
+    def test_zero(self):
+        sketch = RuntimeSketch()
+        for value in 0, 0, 0, 1:
+            sketch.add(value)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertAccurate(sketch.quantile(1.0), 1)
+
+    def test_merge(self):
+        a, b, both = RuntimeSketch(), RuntimeSketch(), RuntimeSketch()
+        for i in range(1, 1000):
+            (i % 3 and a or b).add(i / 10.0)
+            both.add(i / 10.0)
+        a.merge(b)
+        self.assertEqual(a.buckets, both.buckets)
+        self.assertEqual(a.info(), both.info())
+
+    def test_merge_different_accuracy(self):
+        self.assertRaises(ValueError,
+                          RuntimeSketch(0.01).merge, RuntimeSketch(0.02))
+
+
+class test_WindowCounter(unittest.TestCase):
+
+    def test_counts(self):
+        counter = WindowCounter(window=900, resolution=1)
+        now = 10000
+        for i in range(1000):
+            counter.add(now - 999 + i, failed=not i % 10)
+        self.assertEqual(counter.counts(60, now), (55, 6))
+        succeeded, failed = counter.counts(900, now)
+        self.assertEqual(succeeded + failed, 900)
+
+    def test_memory_bounded(self):
+        counter = WindowCounter(window=900, resolution=5)
+        for i in range(10000):
+            counter.add(i)
+        self.assertEqual(len(counter.buckets), 900 / 5)
+
+    def test_rates(self):
+        counter = WindowCounter()
+        now = 10000
+        for i in range(60):
+            counter.add(now - i, failed=i < 15)
+        rates = counter.rates((60, 300), now)
+        self.assertAlmostEqual(rates[60]["succeeded"], 45 / 60.0)
+        self.assertAlmostEqual(rates[60]["failed"], 15 / 60.0)
+        self.assertAlmostEqual(rates[60]["failure_ratio"], 0.25)
+        self.assertAlmostEqual(rates[300]["succeeded"], 45 / 300.0)
+        self.assertEqual(WindowCounter().rates((60, ), now)[60],
+                         {"succeeded": 0.0, "failed": 0.0,
+                          "failure_ratio": 0.0})
+
+
+class test_Metrics(unittest.TestCase):
+
+    def test_on_task_event(self):
+        m = Metrics(windows=(60, ))
+        now = 10000
+        m.on_task_event("received", "tasks.add", "w1", now)
+        m.on_task_event("succeeded", "tasks.add", "w1", now, runtime=0.5)
+        m.on_task_event("failed", "tasks.mul", "w2", now)
+        m.on_task_event("succeeded", None, "w2", now, runtime=1.5)
+        m.on_task_event("unknown", "tasks.add", "w1", now)
+
+        info = m.info(now)
+        self.assertEqual(info["total"]["counts"], {states.RECEIVED: 1,
+                                                   states.SUCCESS: 2,
+                                                   states.FAILURE: 1})
+        self.assertEqual(info["total"]["runtime"]["count"], 2)
+        self.assertAlmostEqual(info["total"]["rates"][60]["failed"],
+                               1 / 60.0)
+        self.assertItemsEqual(info["types"], ["tasks.add", "tasks.mul"])
+        self.assertEqual(info["types"]["tasks.mul"]["counts"],
+                         {states.FAILURE: 1})
+        self.assertEqual(info["workers"]["w2"]["counts"],
+                         {states.SUCCESS: 1, states.FAILURE: 1})
+        self.assertEqual(info["workers"]["w2"]["runtime"]["max"], 1.5)
+
+        m.clear()
+        self.assertFalse(m.info(now)["types"])
+        self.assertFalse(m.total.counts)
+
+    def test_Aggregate_windows(self):
+        self.assertEqual(Aggregate().window.window, 900)
+        self.assertEqual(Aggregate(windows=(10, 30)).window.window, 30)
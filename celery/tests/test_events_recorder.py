@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest2 as unittest
+
+from celery.events import Event
+from celery.events import recorder
+from celery.events.recorder import Recorder, read_events, replay
+from celery.events.snapshot import Polaroid
+from celery.events.state import State
+from celery.utils import gen_unique_id
+
+from celery.tests.utils import execute_context, override_stdouts
+
+
+class MockCamera(Polaroid):
+    shots = []
+
+    def install(self):
+        pass
+
+    def on_shutter(self, state):
+        self.shots.append(len(state.tasks))
+
+
+class test_Recorder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "events.rec")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def record(self, events, block_size=None):
+        r = Recorder(self.path, block_size=block_size)
+        map(r.on_event, events)
+        r.close()
+        return r
+
+    def task_events(self, n):
+        events = []
+        for i in range(n):
+            uuid = gen_unique_id()
+            events.append(Event("task-received", uuid=uuid, name="add",
+                                hostname="w1", args="(%d, %d)" % (i, i)))
+            events.append(Event("task-succeeded", uuid=uuid,
+                                hostname="w1", result=repr(i * 2),
+                                runtime=0.1))
+        return events
+
+    def test_record_and_read(self):
+        events = self.task_events(50)
+        r = self.record(events, block_size=30)
+        self.assertEqual(r.event_count, 100)
+        self.assertEqual(list(read_events(self.path)), events)
+
+    def test_append(self):
+        first, second = self.task_events(5), self.task_events(5)
+        self.record(first)
+        self.record(second)
+        self.assertEqual(list(read_events(self.path)), first + second)
+
+    def test_compact(self):
+        self.record(self.task_events(1000))
+        self.assertLess(os.path.getsize(self.path), 2000 * 100)
+
+    def test_truncated_block_ignored(self):
+        events = self.task_events(10)
+        self.record(events, block_size=10)
+        size = os.path.getsize(self.path)
+        self.record(self.task_events(10))
+        fh = open(self.path, "r+b")
+        try:
+            fh.truncate(size + 10)
+        finally:
+            fh.close()
+        self.assertEqual(list(read_events(self.path)), events)
+
+    def test_flush_pending_only(self):
+        r = Recorder(self.path, block_size=10)
+        r.flush()
+        self.assertEqual(os.path.getsize(self.path), 0)
+        r.on_event(Event("worker-online", hostname="w1"))
+        self.assertEqual(os.path.getsize(self.path), 0)
+        r.flush()
+        self.assertTrue(os.path.getsize(self.path))
+        r.close()
+
+    def test_flush_interval(self):
+        r = Recorder(self.path, block_size=10, flush_interval=60)
+        r.on_event(Event("worker-online", hostname="w1"))
+        r.on_event(Event("worker-heartbeat", hostname="w1"))
+        self.assertEqual(os.path.getsize(self.path), 0)
+        r._first_pending -= 120
+        r.on_event(Event("worker-heartbeat", hostname="w1"))
+        self.assertEqual(len(list(read_events(self.path))), 3)
+        r.close()
+
+    def test_term_handler(self):
+        import signal
+        prev = signal.getsignal(signal.SIGTERM)
+        try:
+            recorder.install_recorder_term_handler()
+            handler = signal.getsignal(signal.SIGTERM)
+            self.assertRaises(SystemExit, handler, signal.SIGTERM, None)
+        finally:
+            signal.signal(signal.SIGTERM, prev)
+
+    def test_replay_into_state(self):
+        self.record(self.task_events(20))
+        state = State()
+        self.assertEqual(replay(self.path, state.event), 40)
+        self.assertEqual(len(state.tasks), 20)
+        self.assertEqual(state.event_count, 40)
+
+    def test_replay_speed(self):
+        now = time.time()
+        self.record([Event("worker-heartbeat", hostname="w1",
+                           timestamp=now + i * 0.1) for i in range(3)])
+        seen = []
+        time_start = time.time()
+        replay(self.path, seen.append, speed=2.0)
+        self.assertGreaterEqual(time.time() - time_start, 0.09)
+        self.assertEqual(len(seen), 3)
+
+    def test_evreplay_camera(self):
+        self.record(self.task_events(10))
+        MockCamera.shots = []
+
+        def with_override_stdouts(outs):
+            stdout, stderr = outs
+            self.assertEqual(recorder.evreplay(self.path,
+                            camera=MockCamera.__module__ + ".MockCamera"),
+                             20)
+            self.assertIn("evreplay: 20 events", stderr.getvalue())
+
+        execute_context(override_stdouts(), with_override_stdouts)
+        self.assertEqual(MockCamera.shots, [10])
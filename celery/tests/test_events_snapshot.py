@@ -0,0 +1,107 @@
+import threading
+import unittest2 as unittest
+
+from celery.events import Event
+from celery.events.snapshot import Polaroid
+from celery.events.state import State, Snapshot
+from celery.utils import gen_unique_id
+
+
+class MockCamera(Polaroid):
+
+    def __init__(self, *args, **kwargs):
+        super(MockCamera, self).__init__(*args, **kwargs)
+        self.shots = []
+
+    def on_shutter(self, state):
+        self.shots.append(state)
+
+
+class test_Polaroid(unittest.TestCase):
+
+    def received(self, state, n=1):
+        for i in range(n):
+            state.event(Event("task-received", uuid=gen_unique_id(),
+                              name="tasks.add", hostname="w1"))
+
+    def test_capture(self):
+        state = State()
+        cam = MockCamera(state)
+        self.received(state)
+        cam.capture()
+        self.assertIs(cam.shots[0], state)
+
+    def test_capture_incremental(self):
+        state = State()
+        cam = MockCamera(state)
+        cam.incremental = True
+        self.received(state, 3)
+        cam.capture()
+        self.received(state, 2)
+        cam.capture()
+        first, second = cam.shots
+        self.assertIsInstance(first, Snapshot)
+        self.assertEqual(len(first.tasks), 3)
+        self.assertEqual(len(second.tasks), 2)
+        self.assertEqual(second.event_count, 2)
+
+    def test_incremental_rate_limited(self):
+        state = State()
+        cam = MockCamera(state, maxrate="1/m")
+        cam.incremental = True
+        self.received(state, 2)
+        cam.capture()
+        self.received(state, 1)
+        cam.capture()                       # rate limited.
+        cam.maxrate = None
+        self.received(state, 1)
+        cam.capture()
+        self.assertEqual([len(shot.tasks) for shot in cam.shots], [2, 2])
+        self.assertEqual(cam.shots[1].event_count, 2)
+
+    def test_incremental_shutter_error(self):
+        state = State()
+
+        class FailingCamera(MockCamera):
+            incremental = True
+            fail = True
+
+            def on_shutter(self, snapshot):
+                if self.fail:
+                    raise KeyError("foo")
+                super(FailingCamera, self).on_shutter(snapshot)
+
+        cam = FailingCamera(state)
+        self.received(state, 2)
+        self.assertRaises(KeyError, cam.capture)
+        self.received(state, 1)
+        cam.fail = False
+        cam.capture()
+        self.assertEqual(len(cam.shots[0].tasks), 3)
+        self.assertEqual(cam.shots[0].event_count, 3)
+
+    def test_incremental_does_not_block_events(self):
+        state = State()
+        processed = threading.Event()
+
+        class SlowCamera(Polaroid):
+            incremental = True
+
+            def on_shutter(self, snapshot):
+                # Events are processed while the camera runs.
+                thread = threading.Thread(target=self.received)
+                thread.start()
+                processed.wait(5)
+                self.tasks = len(snapshot.tasks)
+
+            def received(self):
+                state.event(Event("task-received", uuid=gen_unique_id(),
+                                  name="tasks.add", hostname="w1"))
+                processed.set()
+
+        cam = SlowCamera(state)
+        self.received(state, 2)
+        cam.capture()
+        self.assertTrue(processed.isSet())
+        self.assertEqual(cam.tasks, 2)
+        self.assertEqual(len(state.tasks), 3)
@@ -1,11 +1,14 @@
-from time import time
+import pickle
 import unittest2 as unittest
 
+from time import time
+
 from itertools import count
 
 from celery import states
 from celery.events import Event
-from celery.events.state import State, Worker, Task, HEARTBEAT_EXPIRE
+from celery.events.state import State, Worker, Task, TaskIndex, Snapshot
+from celery.events.state import HEARTBEAT_EXPIRE
 from celery.utils import gen_unique_id
 
 
@@ -85,6 +88,15 @@ class test_Worker(unittest.TestCase):
         worker.on_heartbeat(timestamp=None)
         self.assertEqual(worker.heartbeats, [])
 
+    def test_extra_fields(self):
+        worker = Worker(hostname="foo", sw_ver="2.2")
+        self.assertEqual(worker.sw_ver, "2.2")
+        self.assertEqual(worker["hostname"], "foo")
+        self.assertFalse(worker.visited)
+        self.assertRaises(AttributeError, getattr, worker, "xxx")
+        self.assertRaises(KeyError, worker.__getitem__, "xxx")
+        self.assertIsNone(worker.get("xxx"))
+
 
 class test_Task(unittest.TestCase):
 
@@ -111,6 +123,40 @@ class test_Task(unittest.TestCase):
         self.assertItemsEqual(["args", "kwargs"],
                               task.info(["args", "kwargs"]).keys())
 
+    def test_fields(self):
+        task = Task(uuid="abcdefg", name="tasks.add", foo="bar")
+        self.assertFalse(hasattr(task, "__dict__"))
+        self.assertEqual(task.state, states.PENDING)
+        self.assertIsNone(task.result)
+        self.assertEqual(task["name"], "tasks.add")
+        self.assertEqual(task.foo, "bar")
+        self.assertIn("foo", task)
+        self.assertIn("result", task)
+        self.assertNotIn("xxx", task)
+        task.update(states.STARTED, time(), {"bar": "baz", "retries": 3})
+        self.assertEqual(task.bar, "baz")
+        self.assertEqual(task.retries, 3)
+        self.assertEqual(dict(task)["foo"], "bar")
+        self.assertEqual(dict(task)["state"], states.STARTED)
+
+    def test_merge(self):
+        task = Task(uuid="abcdefg")
+        task.on_started(timestamp=time())
+        task.on_received(timestamp=time() - 10, name="tasks.add",
+                         args="(2, 2)", kwargs="{}", retries=0, eta=None,
+                         expires=None)
+        self.assertEqual(task.state, states.STARTED)
+        self.assertEqual(task.name, "tasks.add")
+        self.assertEqual(task.args, "(2, 2)")
+
+    def test_pickle(self):
+        task = Task(uuid="abcdefg", name="tasks.add", foo="bar")
+        for protocol in (0, 2):
+            copy = pickle.loads(pickle.dumps(task, protocol))
+            self.assertEqual(copy.uuid, "abcdefg")
+            self.assertEqual(copy.foo, "bar")
+            self.assertEqual(copy.state, states.PENDING)
+
     def test_ready(self):
         task = Task(uuid="abcdefg",
                     name="tasks.add")
@@ -120,6 +166,29 @@ class test_Task(unittest.TestCase):
         self.assertTrue(task.ready)
 
 
+class test_TaskIndex(unittest.TestCase):
+
+    def test_order(self):
+        index = TaskIndex()
+        for key, timestamp in (("a", 1), ("b", 3), ("c", 2), ("d", 0),
+                               ("e", 3)):
+            index.add(key, timestamp)
+        self.assertEqual(list(index), ["d", "a", "c", "b", "e"])
+        self.assertEqual(list(reversed(index)), ["e", "b", "c", "a", "d"])
+        index.add("d", 10)
+        index.add("b", 3)
+        self.assertEqual(list(index), ["a", "c", "b", "e", "d"])
+        index.discard("c")
+        index.discard("xxx")
+        self.assertEqual(list(index), ["a", "b", "e", "d"])
+        index.add("f", None)
+        self.assertEqual(list(index), ["f", "a", "b", "e", "d"])
+        index.discard("f")
+        self.assertEqual(len(index), 4)
+        self.assertIn("a", index)
+        self.assertNotIn("c", index)
+
+
 class test_State(unittest.TestCase):
 
     def test_repr(self):
@@ -143,6 +212,23 @@ class test_State(unittest.TestCase):
         self.assertTrue(r.state.alive_workers())
         self.assertTrue(r.state.workers["utest1"].alive)
 
+    def test_worker_load(self):
+        s = State()
+        s.event(Event("worker-heartbeat", hostname="utest1"))
+        self.assertEqual(s.workers["utest1"].load, {})
+        s.event(Event("worker-heartbeat", hostname="utest1", active=2,
+                      reserved=5, pool=4, loadavg=[0.5, 0.4, 0.3],
+                      processed=10))
+        worker = s.workers["utest1"]
+        self.assertEqual(worker.load, {"active": 2, "reserved": 5,
+                                       "pool": 4, "loadavg": [0.5, 0.4, 0.3],
+                                       "processed": 10})
+        # task events count as heartbeats, but don't change the load.
+        s.event(Event("task-received", uuid=gen_unique_id(),
+                      hostname="utest1", name="task1"))
+        self.assertEqual(worker.active, 2)
+        self.assertEqual(worker.copy().load, worker.load)
+
     def test_task_states(self):
         r = ev_task_states(State())
 
@@ -238,6 +324,99 @@ class test_State(unittest.TestCase):
         r.state.clear(False)
         self.assertFalse(r.state.tasks)
 
+    def test_metrics(self):
+        r = ev_snapshot(State())
+        r.play()
+        ev_task_states(r.state).play()
+        metrics = r.state.metrics()
+        self.assertEqual(metrics["total"]["counts"][states.RECEIVED], 21)
+        self.assertEqual(metrics["types"]["task1"]["counts"],
+                         {states.RECEIVED: 11, states.STARTED: 1,
+                          states.REVOKED: 1, states.RETRY: 1,
+                          states.FAILURE: 1, states.SUCCESS: 1})
+        self.assertEqual(metrics["types"]["task2"]["counts"],
+                         {states.RECEIVED: 10})
+        self.assertEqual(metrics["workers"]["utest1"]["runtime"]["count"], 1)
+        self.assertAlmostEqual(
+                metrics["workers"]["utest1"]["runtime"]["p50"], 0.1234,
+                places=2)
+        self.assertEqual(metrics["total"]["rates"][60]["failure_ratio"], 0.5)
+
+        r.state.clear(False)
+        self.assertTrue(r.state.metrics()["types"])
+        r.state.clear_metrics()
+        self.assertFalse(r.state.metrics()["types"])
+
+    def test_snapshot(self):
+        r = ev_snapshot(State())
+        r.play()
+        snap = r.state.snapshot()
+        self.assertIsInstance(snap, Snapshot)
+        self.assertEqual(len(snap.tasks), 20)
+        self.assertEqual(len(snap.workers), 3)
+        self.assertEqual(snap.event_count, 23)
+        self.assertEqual(snap.task_count, 20)
+        self.assertEqual(len(snap.tasks_by_type("task1")), 10)
+
+        # Only changes since the last snapshot.
+        self.assertFalse(r.state.snapshot().tasks)
+        uuid = snap.tasks_by_timestamp(1)[0][0]
+        r.state.event(Event("task-started", uuid=uuid, hostname="utest1"))
+        r.state.event(Event("worker-heartbeat", hostname="utest3"))
+        snap2 = r.state.snapshot()
+        self.assertEqual(snap2.tasks.keys(), [uuid])
+        self.assertItemsEqual(snap2.workers.keys(), ["utest1", "utest3"])
+        self.assertEqual(snap2.event_count, 2)
+        self.assertEqual(snap2.task_count, 0)
+        self.assertIs(snap2.tasks[uuid].worker, snap2.workers["utest1"])
+
+        # Snapshots are copies, not changed by later events.
+        self.assertEqual(snap.tasks[uuid].state, states.RECEIVED)
+        r.state.event(Event("task-succeeded", uuid=uuid, hostname="utest1",
+                            result="4"))
+        self.assertEqual(snap2.tasks[uuid].state, states.STARTED)
+        self.assertIsNot(snap2.workers["utest1"].heartbeats,
+                         r.state.workers["utest1"].heartbeats)
+
+        r.state.snapshot(clear_after=True)
+        self.assertFalse(r.state.event_count)
+        self.assertFalse(r.state.workers)
+        self.assertFalse(r.state.snapshot().event_count)
+
+    def test_snapshot_evicted(self):
+        s = State(max_tasks_in_memory=5)
+        s.snapshot()
+        for i in range(10):
+            s.event(Event("task-received", uuid=gen_unique_id(),
+                          hostname="utest1", name="task1"))
+        self.assertEqual(len(s._changed_tasks), 5)
+        self.assertEqual(len(s.snapshot().tasks), 5)
+
+    def test_event_log(self):
+        s = State()
+        s.event(Event("worker-online", hostname="utest1"))
+        self.assertEqual(s.take_events(), [])
+        s.log_events()
+        events = [Event("worker-online", hostname="utest1"),
+                  Event("task-received", uuid=gen_unique_id(),
+                        hostname="utest1", name="task1")]
+        map(s.event, events)
+        self.assertEqual(s.take_events(), events)
+        self.assertEqual(s.take_events(), [])
+
+    def test_event_log_bounded(self):
+        s = State()
+        s.log_events(max_events=3)
+        events = [Event("worker-heartbeat", hostname="utest1", n=i)
+                    for i in range(5)]
+        map(s.event, events[:2])
+        taken = s.take_events()
+        map(s.event, events[2:])
+        # Events put back go first, and the oldest are dropped.
+        s.return_events(taken)
+        self.assertEqual(s.take_events(), events[2:])
+        self.assertEqual(s.dropped_events, 2)
+
     def test_task_types(self):
         r = ev_snapshot(State())
         r.play()
@@ -254,6 +433,55 @@ class test_State(unittest.TestCase):
         self.assertEqual(len(r.state.tasks_by_type("task1")), 10)
         self.assertEqual(len(r.state.tasks_by_type("task2")), 10)
 
+    def test_indexes_ordered_by_time(self):
+        s = State()
+        ids = [gen_unique_id() for i in range(10)]
+        for i, uuid in enumerate(ids):
+            s.event(Event("task-received", uuid=uuid, hostname="utest1",
+                          name=("task1", "task2")[i % 2], timestamp=i))
+        # events arriving out of order.
+        s.event(Event("task-started", uuid=ids[1], hostname="utest2",
+                      timestamp=5.5))
+        s.event(Event("task-succeeded", uuid=ids[0], hostname="utest2",
+                      timestamp=20))
+
+        self.assertEqual([uuid for uuid, _ in s.tasks_by_timestamp(4)],
+                         [ids[0], ids[9], ids[8], ids[7]])
+        self.assertEqual([uuid for uuid, _ in s.tasks_by_type("task2", 3)],
+                         [ids[9], ids[7], ids[1]])
+        self.assertEqual([uuid for uuid, _ in s.tasks_by_type("task1", 2)],
+                         [ids[0], ids[8]])
+        self.assertEqual([uuid for uuid, _ in s.tasks_by_worker("utest2")],
+                         [ids[0], ids[1]])
+        self.assertEqual(len(s.tasks_by_worker("utest1")), 8)
+        self.assertEqual([uuid for uuid, _ in
+                            s.tasks_by_state(states.STARTED)], [ids[1]])
+        self.assertEqual([uuid for uuid, _ in
+                            s.tasks_by_state(states.SUCCESS)], [ids[0]])
+        self.assertEqual(len(s.tasks_by_state(states.RECEIVED)), 8)
+        self.assertEqual(s.tasks_by_state(states.FAILURE), [])
+        self.assertEqual(s.tasks_by_worker("xxx"), [])
+
+        s.clear()
+        self.assertEqual(len(s.tasks_by_timestamp()), 9)
+        self.assertEqual(s.tasks_by_state(states.SUCCESS), [])
+        self.assertItemsEqual(s.task_types(), ["task1", "task2"])
+        s.clear(False)
+        self.assertEqual(s.tasks_by_timestamp(), [])
+        self.assertEqual(s.task_types(), [])
+
+    def test_evicted_tasks_unindexed(self):
+        s = State(max_tasks_in_memory=5)
+        for i in range(10):
+            s.event(Event("task-received", uuid=str(i), hostname="utest1",
+                          name="task%s" % (i, ), timestamp=i))
+        self.assertEqual(len(s.tasks), 5)
+        self.assertEqual([uuid for uuid, _ in s.tasks_by_timestamp()],
+                         ["9", "8", "7", "6", "5"])
+        self.assertEqual(len(s.tasks_by_worker("utest1")), 5)
+        self.assertEqual(s.task_types(),
+                         ["task5", "task6", "task7", "task8", "task9"])
+
     def test_alive_workers(self):
         r = ev_snapshot(State())
         r.play()
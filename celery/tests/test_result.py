@@ -109,6 +109,13 @@ class TestAsyncResult(unittest.TestCase):
         self.assertRaises(KeyError, nok_res.get)
         self.assertIsInstance(nok2_res.result, KeyError)
 
+    def test_stream(self):
+        self.assertEqual(list(AsyncResult(self.task1["id"]).stream()),
+                         ["the"])
+        self.assertRaises(KeyError, AsyncResult(self.task3["id"]).stream)
+        self.assertRaises(TimeoutError,
+                          AsyncResult(self.task4["id"]).stream, timeout=0.1)
+
     def test_get_timeout(self):
         res = AsyncResult(self.task4["id"])             # has RETRY status
         self.assertRaises(TimeoutError, res.get, timeout=0.1)
@@ -305,3 +312,7 @@ class TestEagerResult(unittest.TestCase):
     def test_revoke(self):
         res = RaisingTask.apply(args=[3, 3])
         self.assertFalse(res.revoke())
+
+    def test_stream(self):
+        res = RaisingTask.apply(args=[3, 3])
+        self.assertRaises(KeyError, res.stream)
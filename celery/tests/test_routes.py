@@ -2,7 +2,7 @@ import unittest2 as unittest
 
 from celery import routes
 from celery.app import app_or_default
-from celery.utils import maybe_promise
+from celery.utils import maybe_promise, mpromise
 from celery.utils.functional import wraps
 from celery.exceptions import QueueNotFound
 
@@ -106,6 +106,90 @@ class test_lookup_route(unittest.TestCase):
         self.assertEqual(router.route({}, "celery.poza"), {})
 
 
+class CountingRouter(object):
+
+    def __init__(self, route=None):
+        self.calls = 0
+        self.answer = route
+
+    def route_for_task(self, task, args=None, kwargs=None):
+        self.calls += 1
+        if self.answer is not None:
+            return dict(self.answer)
+
+
+class test_route_cache(unittest.TestCase):
+
+    @with_queues(foo=a_queue, bar=b_queue)
+    def test_static_routes_cached(self):
+        R = routes.prepare(({"celery.ping": {"queue": "foo"}}, ))
+        router = routes.Router(R, app_or_default().conf.CELERY_QUEUES)
+        first = router.route({}, "celery.ping")
+        self.assertDictContainsSubset(a_queue, first)
+        self.assertIn("celery.ping", router._cache)
+        first["exchange"] = "changed"
+        self.assertDictContainsSubset(a_queue,
+                                      router.route({}, "celery.ping"))
+        self.assertEqual(router.route({}, "celery.poza"), {})
+        self.assertIsNone(router._cache["celery.poza"])
+
+    @with_queues(foo=a_queue, bar=b_queue)
+    def test_dynamic_router_consulted_every_time(self):
+        dynamic = CountingRouter({"queue": "bar"})
+        R = routes.prepare(({"celery.ping": {"queue": "foo"}}, dynamic))
+        router = routes.Router(R, app_or_default().conf.CELERY_QUEUES)
+        for i in range(3):
+            self.assertDictContainsSubset(a_queue,
+                                          router.route({}, "celery.ping"))
+            self.assertDictContainsSubset(b_queue,
+                                          router.route({}, "celery.xaza"))
+        self.assertEqual(dynamic.calls, 3)
+        self.assertIn("celery.ping", router._cache)
+        self.assertNotIn("celery.xaza", router._cache)
+
+    @with_queues(foo=a_queue, bar=b_queue)
+    def test_promised_static_route(self):
+        R = [mpromise(routes.MapRoute, {"celery.ping": {"queue": "foo"}})]
+        router = routes.Router(R, app_or_default().conf.CELERY_QUEUES)
+        self.assertDictContainsSubset(a_queue,
+                                      router.route({}, "celery.ping"))
+        self.assertIn("celery.ping", router._cache)
+
+    @with_queues(foo=a_queue, bar=b_queue)
+    def test_app_router_shared(self):
+        amqp = app_or_default().amqp
+        router = amqp.Router()
+        self.assertIs(amqp.Router(), router)
+        self.assertIsNot(amqp.Router(queues={"foo": a_queue}), router)
+        amqp.flush_routes()
+        self.assertIsNot(amqp.Router(), router)
+
+    def test_app_router_replaced_when_settings_change(self):
+        app = app_or_default()
+        router = app.amqp.Router()
+        prev_routes = app.conf.CELERY_ROUTES
+        app.conf.CELERY_ROUTES = routes.prepare(
+                                    {"celery.ping": {"queue": "foo"}})
+        try:
+            other = app.amqp.Router()
+            self.assertIsNot(other, router)
+            self.assertIs(other.routes, app.conf.CELERY_ROUTES)
+        finally:
+            app.conf.CELERY_ROUTES = prev_routes
+            app.amqp.flush_routes()
+
+    def test_app_router_replaced_by_equal_settings(self):
+        app = app_or_default()
+        router = app.amqp.Router()
+        prev_queues = app.conf.CELERY_QUEUES
+        app.conf.CELERY_QUEUES = dict(prev_queues)
+        try:
+            self.assertIsNot(app.amqp.Router(), router)
+        finally:
+            app.conf.CELERY_QUEUES = prev_queues
+            app.amqp.flush_routes()
+
+
 class test_prepare(unittest.TestCase):
 
     def test_prepare(self):
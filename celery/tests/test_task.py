@@ -198,6 +198,15 @@ class TestTaskRetries(unittest.TestCase):
         self.assertEqual(RetryTask.iterations, 2)
 
 
+class CompressedTask(task.Task):
+    name = "c.unittest.compressed_task"
+    compression = "zlib"
+    compression_threshold = 1000
+
+    def run(self, data):
+        return data
+
+
 class MockPublisher(object):
     _declared = False
 
@@ -345,6 +354,27 @@ class TestCeleryTasks(unittest.TestCase):
         publisher = t1.get_publisher()
         self.assertTrue(publisher.exchange)
 
+    def test_compression(self):
+        consumer = CompressedTask.get_consumer()
+        consumer.discard_all()
+        try:
+            CompressedTask.apply_async(args=["x" * 5000])
+            message = consumer.fetch()
+            self.assertEqual(message.headers.get("compression"),
+                             "application/x-gzip")
+            self.assertEqual(message.payload["args"], ["x" * 5000])
+
+            CompressedTask.apply_async(args=["x"])
+            self.assertIsNone(consumer.fetch().headers.get("compression"))
+
+            CompressedTask.apply_async(args=["x"], compression_threshold=0,
+                                       compression="bzip2")
+            self.assertEqual(consumer.fetch().headers.get("compression"),
+                             "application/x-bz2")
+        finally:
+            consumer.discard_all()
+            consumer.connection.close()
+
     def test_get_publisher(self):
         from celery.app import amqp
         old_pub = amqp.TaskPublisher
@@ -360,6 +390,27 @@ class TestCeleryTasks(unittest.TestCase):
         finally:
             amqp.TaskPublisher = old_pub
 
+    def test_apply_async_custom_publisher(self):
+        used = []
+
+        class CustomPublisherTask(task.Task):
+            name = "c.unittest.t.custom_publisher"
+
+            @classmethod
+            def get_publisher(self, *args, **kwargs):
+                publisher = super(CustomPublisherTask,
+                                  self).get_publisher(*args, **kwargs)
+                used.append(publisher)
+                return publisher
+
+        consumer = CustomPublisherTask.get_consumer()
+        try:
+            CustomPublisherTask.apply_async()
+            self.assertEqual(len(used), 1)
+        finally:
+            consumer.discard_all()
+            consumer.connection.close()
+
     def test_update_state(self):
 
         @task_dec
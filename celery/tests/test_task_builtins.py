@@ -1,9 +1,14 @@
 import unittest2 as unittest
 
-from celery.task.builtins import ExecuteRemoteTask
+from celery.task import builtins
+from celery.task.builtins import ExecuteRemoteTask, ExecuteChunkTask
+from celery.task.builtins import ChunkSizer
+from celery.task import chunked_map, chunked_starmap
 from celery.task.builtins import PingTask, DeleteExpiredTaskMetaTask
 from celery.serialization import pickle
 
+from celery.tests.utils import AMQPStreamBackend, MockPublisher
+
 
 def some_func(i):
     return i * i
@@ -23,7 +28,123 @@ class TestRemoteExecuteTask(unittest.TestCase):
                           100)
 
 
+class TestExecuteChunkTask(unittest.TestCase):
+
+    def test_execute_chunk(self):
+        results, runtime = ExecuteChunkTask.apply(
+                            args=[pickle.dumps(some_func), [1, 2, 3]]).get()
+        self.assertEqual(results, [1, 4, 9])
+        self.assertGreaterEqual(runtime, 0)
+
+    def test_execute_chunk_star(self):
+        results, _ = ExecuteChunkTask.apply(
+                            args=[pickle.dumps(pow), [(2, 3), (3, 2)],
+                                  True]).get()
+        self.assertEqual(results, [8, 9])
+
+
+class TestChunkedMap(unittest.TestCase):
+
+    def setUp(self):
+        self.conf = ExecuteChunkTask.app.conf
+        self.prev = self.conf.CELERY_ALWAYS_EAGER
+        self.conf.CELERY_ALWAYS_EAGER = True
+
+    def tearDown(self):
+        self.conf.CELERY_ALWAYS_EAGER = self.prev
+
+    def test_chunked_map(self):
+        self.assertEqual(chunked_map(abs, xrange(-100, 0)),
+                         range(100, 0, -1))
+        self.assertEqual(chunked_map(abs, xrange(-100, 0), chunk_size=7),
+                         range(100, 0, -1))
+        self.assertEqual(chunked_map(abs, []), [])
+
+    def test_chunked_starmap(self):
+        self.assertEqual(chunked_starmap(pow, zip(xrange(50), [2] * 50)),
+                         [x * x for x in xrange(50)])
+
+
+class ChunkBackend(AMQPStreamBackend):
+
+    def poll(self, task_id):
+        if self.queue:
+            done, (ser_callable, chunk, star) = self.queue.pop()
+            self._cache[done] = {"status": "SUCCESS",
+                                 "result": ExecuteChunkTask.apply(
+                                    (ser_callable, chunk, star)).get(),
+                                 "traceback": None}
+        return self._cache.get(task_id) or {"status": "PENDING",
+                                            "result": None}
+
+
+class ChunkPublisher(MockPublisher):
+
+    def delay_tasks(self, tasks, taskset_id=None, event_dispatcher=None):
+        tasks = list(tasks)
+        for _, args, _, options in tasks:
+            ExecuteChunkTask.backend.queue.insert(0,
+                                        (options["task_id"], args))
+        return super(ChunkPublisher, self).delay_tasks(tasks, taskset_id,
+                                                       event_dispatcher)
+
+
+class ChunkStream(builtins.TaskSetStream):
+
+    def __init__(self, *args, **kwargs):
+        kwargs["Publisher"] = ChunkPublisher
+        kwargs["interval"] = 0
+        super(ChunkStream, self).__init__(*args, **kwargs)
+
+    def apply_async(self, **kwargs):
+        kwargs["connection"] = object()
+        return super(ChunkStream, self).apply_async(**kwargs)
+
+
+class TestChunkedMapNonBulkBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.prev = ExecuteChunkTask.backend, builtins.TaskSetStream
+        ExecuteChunkTask.backend = ChunkBackend()
+        builtins.TaskSetStream = ChunkStream
+
+    def tearDown(self):
+        ExecuteChunkTask.backend, builtins.TaskSetStream = self.prev
+
+    def test_chunked_map(self):
+        self.assertEqual(chunked_map(abs, xrange(-100, 0), chunk_size=7,
+                                     window=3),
+                         range(100, 0, -1))
+
+    def test_chunked_starmap(self):
+        self.assertEqual(chunked_starmap(pow, zip(xrange(50), [2] * 50),
+                                         chunk_size=9),
+                         [x * x for x in xrange(50)])
+
+
+class TestChunkSizer(unittest.TestCase):
+
+    def test_chunk_size(self):
+        sizer = ChunkSizer(runtime=1.0, limit=1000)
+        self.assertEqual(sizer.chunk_size, 1000)
+        sizer.update(10, 0.1)
+        self.assertEqual(sizer.chunk_size, 100)
+        sizer.update(10, 0.3)
+        self.assertEqual(sizer.chunk_size, 50)
+        sizer.update(1, 100.0)
+        self.assertEqual(sizer.chunk_size, 1)
+        sizer = ChunkSizer(runtime=1.0, limit=1000)
+        sizer.update(10, 1e-6)
+        self.assertEqual(sizer.chunk_size, 1000)
+
+
 class TestDeleteExpiredTaskMetaTask(unittest.TestCase):
 
     def test_run(self):
         DeleteExpiredTaskMetaTask.apply()
+
+    def test_scheduled(self):
+        from celery.app import app_or_default
+        schedule = app_or_default().conf.CELERYBEAT_SCHEDULE
+        entry = schedule[DeleteExpiredTaskMetaTask.name]
+        self.assertEqual(entry["task"], DeleteExpiredTaskMetaTask.name)
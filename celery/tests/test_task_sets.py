@@ -3,10 +3,13 @@ import unittest2 as unittest
 import simplejson
 
 from celery.app import app_or_default
+from celery.backends.base import KeyValueStoreBackend
+from celery.exceptions import TimeoutError
 from celery.task import Task
-from celery.task.sets import subtask, TaskSet
+from celery.task.sets import subtask, TaskSet, TaskSetStream
 
 from celery.tests.utils import execute_context
+from celery.tests.utils import AMQPStreamBackend, MockPublisher
 from celery.tests.compat import catch_warnings
 
 
@@ -25,6 +28,62 @@ class MockTask(Task):
         return (args, kwargs, options)
 
 
+class BulkTask(Task):
+    name = "tasks.bulk"
+    exchange = "bulk"
+    routing_key = "bulk.x"
+
+    def run(self, x, y, **kwargs):
+        return x + y
+
+
+class StreamBackend(KeyValueStoreBackend):
+    """Completes one of the tasks sent every time it is polled."""
+
+    def __init__(self, *args, **kwargs):
+        super(StreamBackend, self).__init__(*args, **kwargs)
+        self.db = {}
+        self.queue = []
+        self.max_in_flight = 0
+
+    def get(self, key):
+        return self.db.get(key)
+
+    def set(self, key, value):
+        self.db[key] = value
+
+    def delete(self, key):
+        self.db.pop(key, None)
+
+    def _get_many_meta(self, task_ids):
+        self.max_in_flight = max(self.max_in_flight, len(self.queue))
+        if self.queue:
+            task_id, (x, y) = self.queue.pop()
+            if x < 0:
+                self.mark_as_failure(task_id, KeyError(x))
+            else:
+                self.mark_as_done(task_id, x + y)
+        return super(StreamBackend, self)._get_many_meta(task_ids)
+
+
+class StreamTask(Task):
+    name = "tasks.stream"
+    backend = StreamBackend()
+
+    def run(self, x, y, **kwargs):
+        return x + y
+
+
+class StreamPublisher(MockPublisher):
+
+    def delay_tasks(self, tasks, taskset_id=None, event_dispatcher=None):
+        tasks = list(tasks)
+        for _, args, _, options in tasks:
+            StreamTask.backend.queue.insert(0, (options["task_id"], args))
+        return super(StreamPublisher, self).delay_tasks(tasks, taskset_id,
+                                                        event_dispatcher)
+
+
 class test_subtask(unittest.TestCase):
 
     def test_behaves_like_type(self):
@@ -161,6 +220,43 @@ class test_TaskSet(unittest.TestCase):
         ts.apply_async()
         self.assertEqual(applied[0], 3)
 
+    def test_apply_async_bulk(self):
+        publishers = []
+
+        def Publisher(connection=None):
+            publishers.append(MockPublisher(connection))
+            return publishers[-1]
+
+        applied = [0]
+
+        class mocksubtask(subtask):
+
+            def apply_async(self, *args, **kwargs):
+                applied[0] += 1
+                return "custom"
+
+        ts = TaskSet([BulkTask.subtask((i, i)) for i in (2, 4)] +
+                     [BulkTask.subtask((8, 8), options={"task_id": "id8",
+                                                        "countdown": 10})] +
+                     [mocksubtask(BulkTask, (16, 16))],
+                     Publisher=Publisher)
+        res = ts.apply_async(connection=object())
+        self.assertEqual(applied[0], 1)
+        publisher = publishers[0]
+        self.assertTrue(publisher.closed)
+        tasks, taskset_id = publisher.bulk[0]
+        self.assertEqual(taskset_id, res.taskset_id)
+        self.assertEqual(len(tasks), 3)
+        name, args, kwargs, options = tasks[2]
+        self.assertEqual((name, args), ("tasks.bulk", (8, 8)))
+        self.assertEqual(options["exchange"], "bulk")
+        self.assertEqual(options["routing_key"], "bulk.x")
+        self.assertEqual(options["countdown"], 10)
+        self.assertEqual([r.task_id for r in res.subtasks[:3]],
+                         [o["task_id"] for _, _, _, o in tasks])
+        self.assertEqual(res.subtasks[2].task_id, "id8")
+        self.assertEqual(res.subtasks[3], "custom")
+
     def test_apply(self):
 
         applied = [0]
@@ -174,3 +270,70 @@ class test_TaskSet(unittest.TestCase):
                         for i in (2, 4, 8)])
         ts.apply()
         self.assertEqual(applied[0], 3)
+
+
+class test_TaskSetStream(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = StreamTask.backend = StreamBackend()
+
+    def stream(self, values, **kwargs):
+        return TaskSetStream((StreamTask.subtask((i, i)) for i in values),
+                             interval=0, Publisher=StreamPublisher,
+                             **kwargs)
+
+    def test_window(self):
+        stream = self.stream(xrange(100), window=10)
+        connection = object()
+        results = list(stream.apply_async(connection=connection))
+        self.assertEqual(sorted(results), [i * 2 for i in xrange(100)])
+        self.assertEqual(stream.sent, 100)
+        self.assertEqual(stream.completed, 100)
+        self.assertEqual(self.backend.max_in_flight, 10)
+        self.assertIsNone(stream._publisher)
+
+    def test_ordered(self):
+        stream = self.stream(xrange(30), window=5)
+        self.assertEqual(list(stream.apply_async(connection=object(),
+                                                 ordered=True)),
+                         [i * 2 for i in xrange(30)])
+
+    def test_propagate(self):
+        stream = self.stream([1, -1, 2], window=1).apply_async(
+                                connection=object(), ordered=True)
+        self.assertEqual(stream.next(), 2)
+        self.assertRaises(KeyError, stream.next)
+        self.assertEqual(stream.next(), 4)
+
+        stream = self.stream([-1], window=1).apply_async(
+                                connection=object(), propagate=False)
+        self.assertIsInstance(stream.next(), KeyError)
+
+    def test_timeout(self):
+        self.backend._get_many_meta = lambda task_ids: dict(
+                    (task_id, {"status": "PENDING"}) for task_id in task_ids)
+        stream = self.stream([1]).apply_async(connection=object(),
+                                              timeout=0.01)
+        self.assertRaises(TimeoutError, stream.next)
+        stream.close()
+        self.assertIsNone(stream._publisher)
+
+    def test_not_started(self):
+        self.assertRaises(ValueError, self.stream([1]).next)
+
+    def test_backend_without_bulk_reads(self):
+        self.backend = StreamTask.backend = AMQPStreamBackend()
+        stream = self.stream(xrange(20), window=5)
+        self.assertEqual(list(stream.apply_async(connection=object(),
+                                                 ordered=True)),
+                         [i * 2 for i in xrange(20)])
+
+    def test_respects_ALWAYS_EAGER(self):
+        app = app_or_default()
+        app.conf.CELERY_ALWAYS_EAGER = True
+        try:
+            stream = TaskSetStream(StreamTask.subtask((i, i))
+                                        for i in (2, 4))
+            self.assertEqual(list(stream.apply_async()), [4, 8])
+        finally:
+            app.conf.CELERY_ALWAYS_EAGER = False
@@ -14,6 +14,7 @@ from celery.decorators import periodic_task as periodic_task_dec
 from celery.serialization import pickle
 from celery.utils import gen_unique_id
 from celery.worker import WorkController
+from celery.worker import state
 from celery.worker.buckets import FastQueue
 from celery.worker.job import TaskRequest
 from celery.worker.consumer import Consumer as MainConsumer
@@ -68,6 +69,9 @@ class MockEventDispatcher(object):
     def send(self, event, *args, **kwargs):
         self.sent.append(event)
 
+    def should_send(self, type, uuid=None):
+        return True
+
     def close(self):
         self.closed = True
 
@@ -217,6 +221,29 @@ class test_Consumer(unittest.TestCase):
         self.assertIsNone(l.connection)
         self.assertIsNone(l.task_consumer)
 
+    def test_load_summary(self):
+        l = MyKombuConsumer(self.ready_queue, self.eta_schedule, self.logger,
+                           send_events=False, pool=PlaceHolder())
+        l.pool.num_processes = 4
+        active, waiting = object(), object()
+        state.reserved_requests.update([active, waiting])
+        state.active_requests.add(active)
+        try:
+            summary = l.load_summary()
+            self.assertEqual(summary["active"], 1)
+            self.assertEqual(summary["reserved"], 1)
+            self.assertEqual(summary["pool"], 4)
+            self.assertEqual(len(summary["loadavg"] or (0, 0, 0)), 3)
+            self.assertEqual(summary["processed"],
+                             sum(state.total_count.values()))
+            state.total_count["tasks.load_summary"] += 3
+            self.assertEqual(l.load_summary()["processed"], 3)
+            self.assertEqual(l.load_summary()["processed"], 0)
+        finally:
+            state.reserved_requests.clear()
+            state.active_requests.clear()
+            state.total_count.pop("tasks.load_summary", None)
+
     def test_close_connection(self):
         l = MyKombuConsumer(self.ready_queue, self.eta_schedule, self.logger,
                            send_events=False)
@@ -465,6 +492,29 @@ class test_Consumer(unittest.TestCase):
         self.assertTrue(called_back[0])
         self.assertEqual(l.iterations, 1)
 
+    def test_mainloop_flushes_event_batch(self):
+        l = MyKombuConsumer(self.ready_queue, self.eta_schedule, self.logger,
+                           send_events=False)
+        l.event_dispatcher = MockEventDispatcher()
+        l.event_dispatcher.batch_size = 10
+        l.event_dispatcher.batch_interval = 0.5
+        flushed = []
+        l.event_dispatcher.flush_batch = lambda: flushed.append(1)
+        timeouts = []
+
+        class Connection(object):
+
+            def drain_events(self, timeout=None):
+                timeouts.append(timeout)
+                if len(timeouts) == 1:
+                    raise socket.timeout()
+                return True
+
+        l.connection = Connection()
+        self.assertTrue(l._mainloop().next())
+        self.assertEqual(timeouts, [0.5, 0.5])
+        self.assertEqual(flushed, [1])
+
 
 class test_WorkController(unittest.TestCase):
 
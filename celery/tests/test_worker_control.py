@@ -7,6 +7,7 @@ from kombu import pidbox
 
 from celery.utils.timer2 import Timer
 
+from celery import events
 from celery.app import app_or_default
 from celery.datastructures import AttributeDict
 from celery.decorators import task
@@ -86,6 +87,30 @@ class test_ControlPanel(unittest.TestCase):
         self.assertEqual(consumer.event_dispatcher.enabled, True)
         self.assertIn("worker-online", consumer.event_dispatcher.sent)
 
+    def test_set_event_filter(self):
+        consumer = Consumer()
+        consumer.event_dispatcher = events.EventDispatcher(object(),
+                                                           enabled=False)
+        panel = self.create_panel(consumer=consumer)
+        reply = panel.handle("set_event_filter", arguments=dict(
+                        event_types=["task-*"],
+                        sample_rates={"task-succeeded": 0.1}))
+        self.assertEqual(reply["event_types"], ("task-*", ))
+        consumer.event_dispatcher.enabled = True
+        self.assertFalse(consumer.event_dispatcher.should_send(
+                            "worker-heartbeat"))
+        self.assertTrue(consumer.event_dispatcher.should_send(
+                            "task-failed", "id"))
+
+        reply = panel.handle("set_event_filter", arguments=dict(
+                        sample_rates={"task-succeeded": "x"}))
+        self.assertIn("error", reply)
+        self.assertEqual(consumer.event_dispatcher.event_types, ("task-*", ))
+
+        panel.handle("set_event_filter")
+        self.assertTrue(consumer.event_dispatcher.should_send(
+                            "worker-heartbeat"))
+
     def test_dump_tasks(self):
         info = "\n".join(self.panel.handle("dump_tasks"))
         self.assertIn("mytask", info)
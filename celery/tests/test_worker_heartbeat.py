@@ -7,14 +7,16 @@ class MockDispatcher(object):
 
     def __init__(self):
         self.sent = []
+        self.fields = []
 
-    def send(self, msg):
+    def send(self, msg, **fields):
         self.sent.append(msg)
+        self.fields.append(fields)
 
 
 class MockDispatcherRaising(object):
 
-    def send(self, msg):
+    def send(self, msg, **fields):
         if msg == "worker-offline":
             raise Exception("foo")
 
@@ -43,6 +45,20 @@ class TestHeart(unittest.TestCase):
         for i in range(10):
             heart.run()
 
+    def test_interval(self):
+        self.assertEqual(Heart(MockDispatcher()).bpm, 0.5)
+        self.assertEqual(Heart(MockDispatcher(), interval=30).bpm, 2)
+
+    def test_stats(self):
+        eventer = MockDispatcher()
+        heart = Heart(eventer, interval=1, stats=lambda: {"active": 3})
+        heart._shutdown.set()
+        heart.run()
+        self.assertEqual(eventer.sent, ["worker-online", "worker-heartbeat",
+                                        "worker-offline"])
+        self.assertEqual(eventer.fields[1], {"active": 3})
+        self.assertEqual(eventer.fields[0], {})
+
     def test_run_stopped_is_set_even_if_send_breaks(self):
         eventer = MockDispatcherRaising()
         heart = Heart(eventer, interval=1)
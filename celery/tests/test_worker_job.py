@@ -105,12 +105,16 @@ class test_WorkerTaskTrace(unittest.TestCase):
 
 class MockEventDispatcher(object):
 
-    def __init__(self):
+    def __init__(self, filtered=()):
         self.sent = []
+        self.filtered = filtered
 
-    def send(self, event):
+    def send(self, event, **fields):
         self.sent.append(event)
 
+    def should_send(self, type, uuid=None):
+        return type not in self.filtered
+
 
 class test_TaskRequest(unittest.TestCase):
 
@@ -124,6 +128,13 @@ class test_TaskRequest(unittest.TestCase):
         tw.send_event("task-frobulated")
         self.assertIn("task-frobulated", tw.eventer.sent)
 
+    def test_wants_event(self):
+        tw = TaskRequest(mytask.name, gen_unique_id(), [1], {"f": "x"})
+        self.assertFalse(tw.wants_event("task-succeeded"))
+        tw.eventer = MockEventDispatcher(filtered=["task-succeeded"])
+        self.assertFalse(tw.wants_event("task-succeeded"))
+        self.assertTrue(tw.wants_event("task-failed"))
+
     def test_send_email(self):
         app = app_or_default()
         old_mail_admins = app.mail_admins
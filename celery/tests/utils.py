@@ -7,7 +7,10 @@ from StringIO import StringIO
 
 from nose import SkipTest
 
+from celery import states
 from celery.app import app_or_default
+from celery.app.amqp import TaskPublisher
+from celery.backends.amqp import AMQPBackend
 from celery.utils.functional import wraps
 
 
@@ -228,3 +231,40 @@ def override_stdouts():
 
     sys.stdout = sys.__stdout__ = prev_out
     sys.stderr = sys.__stderr__ = prev_err
+
+
+class MockPublisher(TaskPublisher):
+    """Records the tasks sent in bulk, without a broker."""
+    channel = None
+    closed = False
+
+    def __init__(self, connection=None):
+        self.bulk = []
+
+    def delay_tasks(self, tasks, taskset_id=None, event_dispatcher=None):
+        tasks = list(tasks)
+        self.bulk.append((tasks, taskset_id))
+        return [options["task_id"] for _, _, _, options in tasks]
+
+    def close(self):
+        self.closed = True
+
+
+class AMQPStreamBackend(AMQPBackend):
+    """Completes one of the tasks sent every time a result is polled,
+    without a broker."""
+
+    def __init__(self, *args, **kwargs):
+        super(AMQPStreamBackend, self).__init__(*args, **kwargs)
+        self.queue = []
+
+    def poll(self, task_id):
+        if self.queue:
+            done, (x, y) = self.queue.pop()
+            self._cache[done] = {"status": states.SUCCESS,
+                                 "result": x + y, "traceback": None}
+        return self._cache.get(task_id) or {"status": states.PENDING,
+                                            "result": None}
+
+    def get_many(self, task_ids, cache=True):
+        raise AssertionError("get_many() used by TaskSetStream")
@@ -70,6 +70,7 @@ up and running.
 
 from __future__ import generators
 
+import os
 import socket
 import sys
 import warnings
@@ -192,6 +193,7 @@ class Consumer(object):
 
     """
     _state = None
+    _last_total_count = None
 
     def __init__(self, ready_queue, eta_schedule, logger,
             init_callback=noop, send_events=False, hostname=None,
@@ -267,11 +269,12 @@ class Consumer(object):
 
         self.logger.info("Got task from broker: %s" % (task.shortinfo(), ))
 
-        self.event_dispatcher.send("task-received", uuid=task.task_id,
-                name=task.task_name, args=repr(task.args),
-                kwargs=repr(task.kwargs), retries=task.retries,
-                eta=task.eta and task.eta.isoformat(),
-                expires=task.expires and task.expires.isoformat())
+        if self.event_dispatcher.should_send("task-received", task.task_id):
+            self.event_dispatcher.send("task-received", uuid=task.task_id,
+                    name=task.task_name, args=repr(task.args),
+                    kwargs=repr(task.kwargs), retries=task.retries,
+                    eta=task.eta and task.eta.isoformat(),
+                    expires=task.expires and task.expires.isoformat())
 
         if task.eta:
             try:
@@ -420,20 +423,61 @@ class Consumer(object):
         # Flush events sent while connection was down.
         if self.event_dispatcher:
             self.event_dispatcher.flush()
+        conf = self.app.conf
         self.event_dispatcher = self.app.events.Dispatcher(self.connection,
-                                                hostname=self.hostname,
-                                                enabled=self.send_events)
+                            hostname=self.hostname,
+                            enabled=self.send_events,
+                            batch_size=conf.CELERYD_EVENT_BATCH_SIZE,
+                            batch_interval=conf.CELERYD_EVENT_BATCH_INTERVAL)
         self.restart_heartbeat()
 
         self._state = RUN
 
     def restart_heartbeat(self):
-        self.heart = Heart(self.event_dispatcher)
+        conf = self.app.conf
+        stats = None
+        if conf.CELERYD_HEARTBEAT_STATS:
+            stats = self.load_summary
+        self.heart = Heart(self.event_dispatcher,
+                           interval=conf.CELERYD_HEARTBEAT_INTERVAL,
+                           stats=stats)
         self.heart.start()
 
+    def load_summary(self):
+        """Summary of the load of the worker, sent with every heartbeat
+        if :setting:`CELERYD_HEARTBEAT_STATS` is enabled.
+
+        Returns the number of tasks executing (`active`), and received
+        but not yet started (`reserved`), the number of processes in the
+        pool, the load average of the host, and the number of tasks started
+        since the previous heartbeat (`processed`).
+
+        """
+        active = len(state.active_requests)
+        total = sum(state.total_count.values())
+        processed = total - (self._last_total_count or 0)
+        self._last_total_count = total
+        try:
+            loadavg = [round(load, 2) for load in os.getloadavg()]
+        except (AttributeError, OSError):
+            loadavg = None              # not available on this platform
+        return {"active": active,
+                "reserved": max(0, len(state.reserved_requests) - active),
+                "pool": getattr(self.pool, "num_processes", None),
+                "loadavg": loadavg,
+                "processed": processed}
+
     def _mainloop(self):
+        timeout = None
+        if self.event_dispatcher and self.event_dispatcher.batch_size:
+            # Events are only sent from this thread, so wake up to send
+            # the batch of events when there are no messages.
+            timeout = self.event_dispatcher.batch_interval
         while 1:
-            yield self.connection.drain_events()
+            try:
+                yield self.connection.drain_events(timeout=timeout)
+            except socket.timeout:
+                self.event_dispatcher.flush_batch()
 
     def _open_connection(self):
         """Open connection.  May retry opening the connection if configuration
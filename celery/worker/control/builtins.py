@@ -40,6 +40,32 @@ def disable_events(panel):
     return {"ok": "events already disabled"}
 
 
+@Panel.register
+def set_event_filter(panel, event_types=None, sample_rates=None, **kwargs):
+    """Select the events sent by the worker.
+
+    See :meth:`celery.events.EventDispatcher.set_filter`.
+
+    :keyword event_types: List of event types (or patterns) to send,
+        events of all types are sent if not set.
+    :keyword sample_rates: Mapping of event types to the fraction
+        of events of that type to send.
+
+    """
+    try:
+        for rate in (sample_rates or {}).values():
+            float(rate)
+    except (TypeError, ValueError), exc:
+        return {"error": "Invalid sample rate: %s" % (exc, )}
+    dispatcher = panel.consumer.event_dispatcher
+    dispatcher.set_filter(event_types, sample_rates)
+    panel.logger.warn("Event filter set by remote: types=%r rates=%r" % (
+                        event_types, sample_rates))
+    return {"ok": "event filter set",
+            "event_types": dispatcher.event_types,
+            "sample_rates": dispatcher.sample_rates}
+
+
 @Panel.register
 def heartbeat(panel):
     panel.logger.debug("Heartbeat requested by remote.")
@@ -9,16 +9,19 @@ class Heart(threading.Thread):
     :param eventer: Event dispatcher used to send the event.
     :keyword interval: Time in seconds between heartbeats.
                        Default is 2 minutes.
+    :keyword stats: Optional callable returning fields to send
+                    with every heartbeat.
 
     """
 
     #: Beats per minute.
     bpm = 0.5
 
-    def __init__(self, eventer, interval=None):
+    def __init__(self, eventer, interval=None, stats=None):
         super(Heart, self).__init__()
         self.eventer = eventer
-        self.bpm = interval and interval / 60.0 or self.bpm
+        self.bpm = interval and 60.0 / interval or self.bpm
+        self.stats = stats
         self._shutdown = threading.Event()
         self._stopped = threading.Event()
         self.setDaemon(True)
@@ -47,10 +50,13 @@ class Heart(threading.Thread):
 
             if not last_beat or now > last_beat + (60.0 / bpm):
                 last_beat = now
-                dispatch("worker-heartbeat")
+                if self.stats:
+                    dispatch("worker-heartbeat", **self.stats())
+                else:
+                    dispatch("worker-heartbeat")
             if self._shutdown.isSet():
                 break
-            sleep(1)
+            sleep(min(1.0, 60.0 / bpm))
 
         try:
             dispatch("worker-offline")
@@ -398,6 +398,12 @@ class TaskRequest(object):
         if self.eventer:
             self.eventer.send(type, **fields)
 
+    def wants_event(self, type):
+        """Returns :const:`True` if an event of this type would be sent
+        for this task."""
+        return bool(self.eventer) and \
+                self.eventer.should_send(type, self.task_id)
+
     def on_accepted(self):
         """Handler called when task is accepted by worker pool."""
         self.time_start = time.time()
@@ -431,8 +437,9 @@ class TaskRequest(object):
             self.acknowledge()
 
         runtime = time.time() - self.time_start
-        self.send_event("task-succeeded", uuid=self.task_id,
-                        result=repr(ret_value), runtime=runtime)
+        if self.wants_event("task-succeeded"):
+            self.send_event("task-succeeded", uuid=self.task_id,
+                            result=repr(ret_value), runtime=runtime)
 
         self.logger.info(self.success_msg.strip() % {
                 "id": self.task_id,
@@ -442,9 +449,10 @@ class TaskRequest(object):
 
     def on_retry(self, exc_info):
         """Handler called if the task should be retried."""
-        self.send_event("task-retried", uuid=self.task_id,
-                                        exception=repr(exc_info.exception.exc),
-                                        traceback=repr(exc_info.traceback))
+        if self.wants_event("task-retried"):
+            self.send_event("task-retried", uuid=self.task_id,
+                            exception=repr(exc_info.exception.exc),
+                            traceback=repr(exc_info.traceback))
 
         self.logger.info(self.retry_msg.strip() % {
                 "id": self.task_id,
@@ -468,9 +476,10 @@ class TaskRequest(object):
                 self.task.backend.mark_as_failure(self.task_id,
                                                   exc_info.exception)
 
-        self.send_event("task-failed", uuid=self.task_id,
-                                       exception=repr(exc_info.exception),
-                                       traceback=exc_info.traceback)
+        if self.wants_event("task-failed"):
+            self.send_event("task-failed", uuid=self.task_id,
+                            exception=repr(exc_info.exception),
+                            traceback=exc_info.traceback)
 
         context = {"hostname": self.hostname,
                    "id": self.task_id,
@@ -0,0 +1,70 @@
+"""Measure the cost of looking up results in the database backend as
+the result table grows, using SQLite.
+
+Usage::
+
+    $ python funtests/benchmarks/database.py [rows] [lookups]
+
+With the index on `task_id` the lookup cost should stay flat.
+
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from celery import Celery
+from celery import states
+from celery.backends.database import DatabaseBackend
+from celery.db.models import Task
+from celery.utils import gen_unique_id
+
+CHECKPOINTS = (10000, 100000, 1000000)
+CHUNK_SIZE = 10000
+
+
+def fill(backend, start, stop, task_ids):
+    table = Task.__table__
+    session = backend.ResultSession()
+    try:
+        for offset in xrange(start, stop, CHUNK_SIZE):
+            rows = [{"task_id": gen_unique_id(),
+                     "status": states.SUCCESS,
+                     "result": offset + i}
+                        for i in xrange(min(CHUNK_SIZE, stop - offset))]
+            session.execute(table.insert(), rows)
+            task_ids.extend(row["task_id"] for row in rows)
+        session.commit()
+    finally:
+        session.close()
+
+
+def bench_lookup(backend, task_ids, lookups):
+    sample = [random.choice(task_ids) for i in xrange(lookups)]
+    time_start = time.time()
+    for task_id in sample:
+        backend.get_task_meta(task_id, cache=False)
+    return (time.time() - time_start) / lookups
+
+
+def main(rows=CHECKPOINTS[-1], lookups=1000):
+    app = Celery()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        dburi = "sqlite:///%s" % (os.path.join(tmpdir, "results.db"), )
+        backend = DatabaseBackend(app=app, dburi=dburi)
+        task_ids = []
+        filled = 0
+        for checkpoint in [c for c in CHECKPOINTS if c < rows] + [rows]:
+            fill(backend, filled, checkpoint, task_ids)
+            filled = checkpoint
+            print("%8d rows: %.1f usec/lookup" % (
+                    filled, bench_lookup(backend, task_ids, lookups) * 1e6))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""Measure the number of `.delay()` calls per second, with and without
+the publisher pool.
+
+Usage::
+
+    $ CELERY_CONFIG_MODULE=funtests.config \
+        python funtests/benchmarks/delay.py [n]
+
+The tasks sent are discarded afterwards.
+
+"""
+import sys
+import time
+
+from celery.app import app_or_default
+
+
+app = app_or_default()
+
+
+@app.task(name="funtests.benchmarks.delay.add")
+def add(x, y):
+    return x + y
+
+
+def bench_delay(n):
+    time_start = time.time()
+    for i in xrange(n):
+        add.delay(i, i)
+    return time.time() - time_start
+
+
+def main(n=1000):
+    limit = app.conf.BROKER_POOL_LIMIT or 10
+    try:
+        for name, pool_limit in (("no pool", 0), ("pool", limit)):
+            app._pool = app.amqp.PublisherPool(limit=pool_limit)
+            elapsed = bench_delay(n)
+            print("%-10s %6d calls in %.3fs (%.1f calls/s)" % (
+                    name, n, elapsed, n / elapsed))
+            print("           %r" % (app.pool.stats(), ))
+            app.pool.close()
+    finally:
+        consumer = add.get_consumer()
+        consumer.discard_all()
+        consumer.connection.close()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""Measure the number of events per second stored by
+:class:`celery.events.archive.EventArchive`, and the time it takes
+to query them.
+
+Usage::
+
+    $ python funtests/benchmarks/event_archive.py [n] [batch_size]
+
+Stores the events of `n` tasks (received, started and succeeded)
+from 10 workers, in batches of `batch_size` events, in a temporary
+database.
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from celery.events import Event
+from celery.events.archive import EventArchive
+from celery.utils import gen_unique_id
+
+
+def main(n=30000, batch_size=5000):
+    hostnames = ["worker%d.example.com" % i for i in range(10)]
+    names = ["tasks.task%d" % i for i in range(20)]
+    events = []
+    now = time.time()
+    for i in xrange(n):
+        uuid = gen_unique_id()
+        hostname = hostnames[i % len(hostnames)]
+        timestamp = now + i * 0.001
+        events.extend([
+            Event("task-received", uuid=uuid, hostname=hostname,
+                  name=names[i % len(names)], args="(%d, %d)" % (i, i),
+                  kwargs="{}", retries=0, eta=None, expires=None,
+                  timestamp=timestamp),
+            Event("task-started", uuid=uuid, hostname=hostname,
+                  timestamp=timestamp),
+            Event("task-succeeded", uuid=uuid, hostname=hostname,
+                  result=repr(i * 2), runtime=0.001, timestamp=timestamp)])
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        archive = EventArchive(os.path.join(tmpdir, "events.sqlite"))
+        time_start = time.time()
+        for i in xrange(0, len(events), batch_size):
+            archive.store(events[i:i + batch_size])
+        elapsed = time.time() - time_start
+        print("store: %d events in %.3fs (%.1f events/s)" % (
+                len(events), elapsed, len(events) / elapsed))
+
+        time_start = time.time()
+        found = archive.query(name=names[0], hostname=hostnames[0],
+                              start=now, end=now + n * 0.001 / 2)
+        print("query: %d events in %.3fs" % (len(found),
+                                             time.time() - time_start))
+        archive.close()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
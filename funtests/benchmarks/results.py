@@ -0,0 +1,50 @@
+"""Compare result store throughput with and without the write-behind
+buffer, using the database backend with SQLite.
+
+Usage::
+
+    $ python funtests/benchmarks/results.py [n]
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from celery import Celery
+from celery import states
+from celery.backends.database import DatabaseBackend
+from celery.utils import gen_unique_id
+
+
+def bench_store(backend, n):
+    task_ids = [gen_unique_id() for i in xrange(n)]
+    time_start = time.time()
+    for task_id in task_ids:
+        backend.store_result(task_id, {"value": task_id}, states.SUCCESS)
+    backend.flush_buffer()
+    elapsed = time.time() - time_start
+    assert backend.get_status(task_ids[-1]) == states.SUCCESS
+    return elapsed
+
+
+def main(n=1000):
+    app = Celery()
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, buffer_size in (("sync", 0), ("buffered", 100)):
+            dburi = "sqlite:///%s" % (os.path.join(tmpdir, name + ".db"), )
+            backend = DatabaseBackend(app=app, dburi=dburi,
+                                      buffer_size=buffer_size)
+            elapsed = bench_store(backend, n)
+            print("%-10s %6d results in %.3fs (%.1f results/s)" % (
+                    name, n, elapsed, n / elapsed))
+            if backend.buffer is not None:
+                backend.buffer.stop()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""Measure the memory used for every task tracked by
+:class:`celery.events.state.State`.
+
+Usage::
+
+    $ python funtests/benchmarks/state_memory.py [n]
+
+Feeds the events of `n` tasks (received, started and succeeded)
+from 10 workers into a state, and reports the growth of the resident
+set size of the process.
+
+"""
+import gc
+import resource
+import sys
+import time
+
+from celery.events import Event
+from celery.events.state import State
+from celery.utils import gen_unique_id
+
+
+def rss():
+    """Returns the resident set size of this process in bytes."""
+    try:
+        statm = open("/proc/self/statm")
+    except IOError:
+        # Not Linux, only the peak is available (in kilobytes).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        return int(statm.read().split()[1]) * resource.getpagesize()
+    finally:
+        statm.close()
+
+
+def main(n=100000):
+    state = State(max_tasks_in_memory=n)
+    hostnames = ["worker%d.example.com" % i for i in range(10)]
+    events = []
+    for i in xrange(n):
+        uuid = gen_unique_id()
+        hostname = hostnames[i % len(hostnames)]
+        events.append([
+            Event("task-received", uuid=uuid, hostname=hostname,
+                  name="tasks.add", args="(%d, %d)" % (i, i), kwargs="{}",
+                  retries=0, eta=None, expires=None),
+            Event("task-started", uuid=uuid, hostname=hostname),
+            Event("task-succeeded", uuid=uuid, hostname=hostname,
+                  result=repr(i * 2), runtime=0.001)])
+
+    gc.collect()
+    before = rss()
+    time_start = time.time()
+    for task_events in events:
+        for event in task_events:
+            state.event(event)
+    elapsed = time.time() - time_start
+    gc.collect()
+    used = rss() - before
+    print("%d tasks: %.1f MB (%d bytes/task), %.1f events/s" % (
+            len(state.tasks), used / 1024.0 / 1024.0,
+            used / len(state.tasks), n * 3 / elapsed))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""Measure the time it takes to send a task set, sending the subtasks
+one at a time and in bulk.
+
+Usage::
+
+    $ CELERY_CONFIG_MODULE=funtests.config \
+        python funtests/benchmarks/taskset.py [n]
+
+The tasks sent are discarded afterwards.
+
+"""
+import sys
+import time
+
+from celery.app import app_or_default
+from celery.task.sets import TaskSet
+from celery.utils import gen_unique_id
+
+app = app_or_default()
+
+
+@app.task(name="funtests.benchmarks.taskset.add")
+def add(x, y):
+    return x + y
+
+
+def send_one_by_one(taskset):
+    taskset_id = gen_unique_id()
+    publisher = taskset.Publisher(connection=app.broker_connection())
+    try:
+        [task.apply_async(taskset_id=taskset_id, publisher=publisher)
+            for task in taskset.tasks]
+    finally:
+        publisher.close()
+        publisher.connection.close()
+
+
+def send_bulk(taskset):
+    taskset.apply_async()
+
+
+def main(n=10000):
+    taskset = TaskSet(add.subtask((i, i)) for i in xrange(n))
+    try:
+        for name, send in (("one by one", send_one_by_one),
+                           ("bulk", send_bulk)):
+            time_start = time.time()
+            send(taskset)
+            elapsed = time.time() - time_start
+            print("%-10s %6d tasks in %.3fs (%.1f tasks/s)" % (
+                    name, n, elapsed, n / elapsed))
+    finally:
+        consumer = add.get_consumer()
+        consumer.discard_all()
+        consumer.connection.close()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))